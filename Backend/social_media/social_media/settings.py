@@ -40,9 +40,14 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'social_media_app.authentication.CachedOAuth2Authentication',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'social_media_app.throttling.TokenBucketThrottle',
+    ),
+    # Số proxy tin cậy đứng trước Django: 0 = bỏ qua X-Forwarded-For (client tự đặt được), throttle ẩn danh theo
+    # REMOTE_ADDR. Chạy sau một nginx thì đặt 1 để lấy IP client từ header do nginx thêm vào.
+    'NUM_PROXIES': 0,
 }
 
 MIDDLEWARE = [
@@ -53,7 +58,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'oauth2_provider.middleware.OAuth2TokenMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 ]
 
@@ -171,6 +175,126 @@ OAUTH2_PROVIDER = {
     },
 }
 
+# Cache token đã kiểm tra của CachedOAuth2Authentication (authentication.py), riêng cho từng process.
+# Huỷ token/đổi mật khẩu xoá ngay trong process xử lý request đó; process khác chậm nhiều nhất TTL giây.
+AUTH_TOKEN_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,  # 0: tắt cache, mỗi request đọc token từ DB
+}
+
+# Cache dùng chung cho response cache (caching.py), search và throttle.
+# Chạy nhiều worker thì đổi sang backend dùng chung, ví dụ:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/var/tmp/social_media_cache'
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'social-media',
+    }
+}
+
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Ghi like kiểu write-behind (likebuffer.py): gom sự kiện trong bộ nhớ rồi ghi theo lô
+LIKE_WRITE_BEHIND = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL_MS': 500,
+    'MAX_EVENTS': 1000,
+    'LOG_DIR': os.path.join(BASE_DIR, 'var', 'like_events'),  # Log append-only để phát lại khi khởi động
+    'FSYNC': False,
+}
+
+# Kênh đẩy WebSocket (asgi.py, push.py): BROKER có thể thay bằng lớp pub/sub khác cùng giao diện
+PUSH = {
+    'BROKER': 'social_media_app.pubsub.InProcessBroker',
+    'QUEUE_SIZE': 100,  # Số tin tối đa chờ gửi cho mỗi kết nối, đầy thì bỏ tin cũ nhất
+}
+
+HASHTAG_TRENDING = {
+    'WINDOW_HOURS': 72,  # Cửa sổ trượt tính xu hướng
+    'HALF_LIFE_HOURS': 12,  # Sau mỗi nửa chu kỳ, một lượt dùng hashtag chỉ còn một nửa trọng số
+    'TOP_K': 20,
+}
+
+# Feed cá nhân hoá (timeline.py): điểm quan tâm theo danh mục/hashtag/tác giả, fan-out khi đăng bài
+TIMELINE = {
+    'WEIGHTS': {'post': 3, 'comment': 2, 'like': 1},
+    'MIN_SCORE': 1,  # Điểm tối thiểu để một nguồn được đẩy vào timeline của người dùng
+    'FANOUT_LIMIT': 5000,  # Nguồn có nhiều người quan tâm hơn thì fan-out khi đọc thay vì khi ghi
+    'MAX_ENTRIES': 1000,  # Số bài giữ lại trong mỗi timeline
+    'TRIM_EVERY': 100,  # Khi fan-out, mỗi người nhận được cắt timeline với xác suất 1/TRIM_EVERY
+}
+
+# Thông báo (notifications.py): sự kiện được gom theo lô trong thread nền rồi ghi bằng bulk_create.
+NOTIFICATIONS = {
+    'ASYNC': True,  # False: ghi ngay trong transaction của request, không qua hàng đợi
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_BATCH': 500,
+    'QUEUE_SIZE': 10000,  # Hàng đợi đầy thì bỏ sự kiện thay vì làm chậm request
+}
+
+# Giới hạn tần suất kiểu token bucket (throttling.py), theo user hoặc IP cho từng action.
+# 'N/period': nạp lại N token mỗi chu kỳ; BURST là dung lượng bucket (mặc định bằng N).
+# CacheBucketStore dùng CACHES[CACHE_ALIAS]; với RedisCache việc trừ token chạy nguyên tử bằng Lua.
+THROTTLE = {
+    'STORE': 'social_media_app.throttling.CacheBucketStore',
+    'CACHE_ALIAS': 'default',
+    'RATES': {
+        'signup': '5/hour',
+        'post': '10/min',
+        'comment': '20/min',
+        'like': '60/min',
+        'bid': '30/min',
+        'report': '10/hour',
+        'upload': '60/hour',
+    },
+    'BURST': {
+        'like': 20,
+    },
+}
+
+MODERATION = {
+    # Trọng số mỗi lý do báo cáo khi tính điểm ưu tiên trong hàng đợi kiểm duyệt
+    'REASON_WEIGHTS': {
+        'inappropriate_language': 3,
+        'spam': 2,
+        'no_payment_after_auction': 3,
+        'other': 1,
+    },
+    'AUTO_HIDE_SCORE': 30,  # Bài viết tự động bị ẩn (active=False) khi điểm báo cáo đạt ngưỡng này, 0 để tắt
+}
+
+# Ảnh tải lên được ghi thẳng ra file tạm trên đĩa thay vì giữ trong bộ nhớ; media.py chỉ việc đổi tên file.
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Xử lý ảnh (media.py): request chỉ nhận file, worker pool tạo các biến thể rồi đẩy lên STORAGE.
+MEDIA_PIPELINE = {
+    'ASYNC': True,  # False: tạo biến thể ngay trong request (dùng khi test)
+    'WORKERS': 2,
+    'STORAGE': 'social_media_app.media.LocalMediaStorage',  # Hoặc 'social_media_app.media.CloudinaryMediaStorage'
+    'INCOMING_DIR': None,  # Thư mục chứa ảnh gốc chờ xử lý, mặc định nằm trong thư mục tạm của hệ thống
+    'MAX_UPLOAD_SIZE': 10 * 1024 * 1024,
+    'MAX_PIXELS': 40_000_000,
+    'VARIANTS': {
+        'avatar': {'thumb': 64, 'small': 160, 'medium': 320},
+        'post': {'thumb': 320, 'medium': 960, 'large': 1600},
+    },
+    'FORMATS': ['webp', 'jpeg'],  # Định dạng đầu tiên là định dạng serializer trả về
+    'QUALITY': 80,
+    'CHUNK_SIZE': 1024 * 1024,  # Kích thước tối đa của một đoạn khi tải ảnh bài viết qua /uploads/
+    'SESSION_TTL_HOURS': 24,  # Phiên tải lên (và quyền gắn ảnh vào bài viết) hết hạn sau khoảng này
+    'MAX_POST_IMAGES': 10,
+    # /media/ do Django trả header, còn file do web server gửi:
+    #   'x-accel' (nginx):  location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+    #   'x-sendfile' (Apache mod_xsendfile, lighttpd), 'django': FileResponse, chỉ dùng khi phát triển
+    'SENDFILE_BACKEND': 'django',
+    'SENDFILE_PREFIX': '/protected-media/',
+    'CACHE_MAX_AGE': 365 * 24 * 3600,
+}
+
 STATIC_URL = '/static/'  # Đường dẫn URL được sử dụng để truy cập các tệp tin static từ frontend.
 STATIC_ROOT = os.path.join(BASE_DIR,
                            'staticfiles')  # Thư mục sẽ chứa tất cả các tệp tin static thu thập từ ứng dụng của bạn.
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Post, User, Comment, Like, PostStatistics, Report, Hashtag, Auction
+from .models import Category, Post, User, Comment, Like, PostStatistics, Report, Hashtag, Auction, AuctionState, \
+    Transaction
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 
@@ -27,6 +28,14 @@ class LikeAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'post__title')
 
 
+class TransactionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sender', 'receiver', 'amount', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('sender__username', 'receiver__username')
+    list_select_related = ('sender', 'receiver')
+    raw_id_fields = ('sender', 'receiver', 'auction')
+
+
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'avatar', 'is_staff')
     list_filter = ('is_staff',)
@@ -54,3 +63,5 @@ admin.site.register(PostStatistics)
 admin.site.register(Report, ReportAdmin)
 admin.site.register(Hashtag)
 admin.site.register(Auction)
+admin.site.register(AuctionState)
+admin.site.register(Transaction, TransactionAdmin)
@@ -1,6 +1,25 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
+def is_management_command():
+    # manage.py migrate/shell/test... không phát lại log like; runserver chỉ phát lại trong process con của autoreloader
+    if os.path.basename(sys.argv[0]) not in ('manage.py', 'django-admin'):
+        return False
+    if sys.argv[1:2] == ['runserver']:
+        return os.environ.get('RUN_MAIN') != 'true' and '--noreload' not in sys.argv
+    return True
+
+
 class SocialMediaAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'social_media_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .likebuffer import get_like_buffer
+
+        if not is_management_command():
+            get_like_buffer()  # Bật write-behind thì phát lại các sự kiện like chưa flush từ lần chạy trước
@@ -0,0 +1,122 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Auction, AuctionState, Post, Transaction
+from .pubsub import bids_topic, get_broker
+
+MAX_BID_ATTEMPTS = 50
+MAX_AMOUNT = Decimal('99999999.99')  # DecimalField(max_digits=10, decimal_places=2) của giá và giao dịch
+
+
+class BidRejected(Exception):
+    def __init__(self, message, state=None):
+        super().__init__(message)
+        self.message = message
+        self.state = state
+
+
+def to_amount(value):
+    try:
+        amount = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return amount if amount.is_finite() and 0 < amount <= MAX_AMOUNT else None
+
+
+def open_auction(post, starting_price, closes_at, min_increment=1, opens_at=None):
+    opens_at = opens_at or timezone.now()
+    if closes_at <= opens_at:
+        raise BidRejected('closes_at must be after opens_at')
+    try:
+        with transaction.atomic():
+            return AuctionState.objects.create(post=post, starting_price=starting_price, min_increment=min_increment,
+                                               opens_at=opens_at, closes_at=closes_at)
+    except IntegrityError:
+        raise BidRejected('An auction already exists for this post')
+
+
+def place_bid(post, user, amount):
+    # Compare-and-set trên AuctionState.version: không khoá bảng, request thua cuộc đọc lại trạng thái và thử lại
+    for _ in range(MAX_BID_ATTEMPTS):
+        state = AuctionState.objects.filter(post=post).first()
+        if state is None:
+            raise BidRejected('This post has no auction')
+
+        now = timezone.now()
+        if state.status != AuctionState.STATUS_OPEN or now < state.opens_at or now >= state.closes_at:
+            raise BidRejected('The auction is not open', state)
+        if user.pk == post.user_id:
+            raise BidRejected('The post owner cannot bid', state)
+        if amount < state.minimum_bid():
+            raise BidRejected('Bid must be at least %s' % state.minimum_bid(), state)
+
+        with transaction.atomic():
+            # Điều kiện trạng thái/hạn chót nằm trong UPDATE: bid chờ khoá trong lúc phiên đang đóng sẽ không khớp
+            updated = AuctionState.objects.filter(pk=state.pk, version=state.version, status=AuctionState.STATUS_OPEN,
+                                                  closes_at__gt=now).update(
+                current_price=amount, leader=user, version=F('version') + 1, bid_count=F('bid_count') + 1)
+            if updated:
+                bid = Auction.objects.create(post=post, participant=user, bid_price=amount)
+                state.current_price, state.leader, state.version = amount, user, state.version + 1
+                state.bid_count += 1
+                message = {'type': 'bid', 'post': post.pk, 'participant': user.pk, 'bid_price': str(amount),
+                           'bid_count': state.bid_count, 'version': state.version}
+                transaction.on_commit(lambda: get_broker().publish(bids_topic(post.pk), message))
+                return bid, state
+
+    raise BidRejected('The auction is too busy, please retry')
+
+
+def settle_auction(state_id, now=None):
+    # Một transaction cho mỗi phiên; SKIP LOCKED để nhiều worker chạy song song không giẫm lên nhau
+    now = now or timezone.now()
+    with transaction.atomic():
+        state = AuctionState.objects.select_for_update(skip_locked=True) \
+            .filter(pk=state_id, status=AuctionState.STATUS_OPEN, closes_at__lte=now).first()
+        if state is None:
+            return None  # Worker khác đang xử lý hoặc đã đóng phiên này
+
+        best = Auction.objects.filter(post_id=state.post_id).order_by('-bid_price', 'created_at', 'id').first()
+        settlement = None
+        if best is not None:
+            Auction.objects.filter(pk=best.pk).update(winner_id=best.participant_id)
+            owner_id = Post.objects.filter(pk=state.post_id).values_list('user_id', flat=True).first()
+            settlement = Transaction.objects.create(sender_id=best.participant_id, receiver_id=owner_id,
+                                                    amount=best.bid_price, status=Transaction.STATUS_PENDING,
+                                                    auction=state)
+
+        # Tăng version để compare-and-set của bid đọc trạng thái trước khi đóng không còn khớp
+        AuctionState.objects.filter(pk=state.pk).update(status=AuctionState.STATUS_CLOSED,
+                                                        version=F('version') + 1, updated_date=now.date())
+        state.status, state.version = AuctionState.STATUS_CLOSED, state.version + 1
+
+        message = {'type': 'closed', 'post': state.post_id,
+                   'winner': best.participant_id if best else None,
+                   'bid_price': str(best.bid_price) if best else None}
+        transaction.on_commit(lambda: get_broker().publish(bids_topic(state.post_id), message))
+    return state, settlement
+
+
+def close_due_auctions(batch_size=500, now=None):
+    now = now or timezone.now()
+    closed = settled = 0
+    last_closes_at, last_pk = None, 0
+    while True:
+        due = AuctionState.objects.filter(status=AuctionState.STATUS_OPEN, closes_at__lte=now) \
+            .order_by('closes_at', 'pk')
+        if last_closes_at is not None:
+            due = due.filter(closes_at__gte=last_closes_at).exclude(closes_at=last_closes_at, pk__lte=last_pk)
+        batch = list(due.values_list('pk', 'closes_at')[:batch_size])
+        if not batch:
+            break
+        last_pk, last_closes_at = batch[-1]
+
+        for state_id, _ in batch:
+            result = settle_auction(state_id, now)
+            if result is not None:
+                closed += 1
+                settled += result[1] is not None
+    return closed, settled
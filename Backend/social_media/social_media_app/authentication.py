@@ -0,0 +1,161 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.models import get_access_token_model, get_refresh_token_model
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+}
+
+INVALID_TOKEN = {'error': 'invalid_token', 'error_description': 'The access token is invalid.'}
+EXPIRED_TOKEN = {'error': 'invalid_token', 'error_description': 'The access token has expired.'}
+
+
+def get_auth_cache_setting(name):
+    return getattr(settings, 'AUTH_TOKEN_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class TokenCache:
+    # LRU có TTL trong bộ nhớ process: token -> AccessToken (kèm user, application) đã kiểm tra hợp lệ
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, access_token, ttl, generation, now=None):
+        now = time.monotonic() if now is None else now
+        ttl = min(ttl, self.ttl)
+        with self._lock:
+            # Có lần huỷ token/đổi mật khẩu xen giữa lúc đọc DB và lúc ghi cache: bản đọc được có thể đã cũ
+            if ttl <= 0 or self.max_entries <= 0 or generation != self.generation:
+                return
+            self._remove(key)
+            self._entries[key] = (now + ttl, access_token)
+            self._by_user.setdefault(access_token.user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, key):
+        with self._lock:
+            self.generation += 1
+            self._remove(key)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            self.generation += 1
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[1].user_id)
+        keys.discard(key)
+        if not keys:
+            del self._by_user[entry[1].user_id]
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(get_auth_cache_setting('MAX_ENTRIES'), get_auth_cache_setting('TTL'))
+    return _token_cache
+
+
+def get_bearer_token(request):
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) != 2 or parts[0].lower() != 'bearer':
+        return None
+    return parts[1]
+
+
+def detach(access_token):
+    # Mỗi request nhận bản sao riêng, view có sửa user/token cũng không làm bẩn bản trong cache
+    access_token = copy.copy(access_token)
+    if access_token.user_id is not None:
+        access_token.user = copy.copy(access_token.user)
+    return access_token
+
+
+def load_access_token(token):
+    # Trả về (AccessToken, None) hoặc (None, lỗi); trúng cache thì không có truy vấn nào
+    cache = get_token_cache()
+    access_token = cache.get(token)
+    if access_token is not None:
+        return detach(access_token), None
+
+    generation = cache.generation
+    access_token = get_access_token_model().objects.select_related('user', 'application').filter(token=token).first()
+    if access_token is None or (access_token.user_id is not None and not access_token.user.is_active):
+        return None, INVALID_TOKEN
+    if access_token.is_expired():
+        return None, EXPIRED_TOKEN
+    cache.set(token, access_token, (access_token.expires - timezone.now()).total_seconds(), generation)
+    return detach(access_token), None
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    # Chỉ đọc header Bearer (oauthlib còn parse cả body của request) và nhớ token đã kiểm tra trong TokenCache
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if token is None:
+            return None
+        access_token, error = load_access_token(token)
+        if access_token is None:
+            request.oauth2_error = error
+            return None
+        return access_token.user, access_token
+
+
+def revoke_access_token(access_token):
+    # Đăng xuất: huỷ cả refresh token đi kèm để client không lấy được access token mới
+    refresh_token = get_refresh_token_model().objects.filter(access_token_id=access_token.pk).first()
+    if refresh_token is not None:
+        refresh_token.revoke()
+    else:
+        access_token.revoke()
+
+
+def revoke_user_tokens(user):
+    with transaction.atomic():
+        get_refresh_token_model().objects.filter(user=user, revoked__isnull=True) \
+            .update(access_token=None, revoked=timezone.now())
+        get_access_token_model().objects.filter(user=user).delete()  # post_delete xoá từng token khỏi cache
@@ -0,0 +1,101 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'rc',
+}
+
+
+def get_cache_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_cache_setting('ALIAS')]
+
+
+def version_key(resource):
+    return '%s:v:%s' % (get_cache_setting('KEY_PREFIX'), resource)
+
+
+def get_versions(resources):
+    cache = get_cache()
+    keys = [version_key(r) for r in resources]
+    versions = cache.get_many(keys)
+    missing = {k: int(time.time() * 1000) for k in keys if k not in versions}
+    if missing:
+        # Khởi tạo theo thời gian để phiên bản không lặp lại sau khi cache bị xoá/evict
+        for key, value in missing.items():
+            if not cache.add(key, value, None):
+                value = cache.get(key, value)
+            versions[key] = value
+    return [versions[k] for k in keys]
+
+
+def bump(*resources):
+    cache = get_cache()
+    for resource in resources:
+        key = version_key(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+
+def invalidate(*resources):
+    # Đổi phiên bản sau khi transaction commit, tránh request khác cache lại dữ liệu cũ
+    transaction.on_commit(lambda: bump(*resources))
+
+
+def compute_etag(data):
+    return '"%s"' % hashlib.md5(JSONRenderer().render(data)).hexdigest()
+
+
+def cache_response(*resources, per_user=False, timeout=None, overlay=None):
+    # resources có thể chứa "{post_id}" để lấy từ query params, ví dụ 'comments:{post_id}'.
+    # overlay(view, request, data): ghi đè phần đổi liên tục (bộ đếm, liked) lên bản lấy từ cache,
+    # để những thay đổi đó không phải làm mất cache của cả danh sách
+    def decorator(func):
+        @wraps(func)
+        def wrapper(view, request, *args, **kwargs):
+            params = {k: v for k, v in {**request.query_params.dict(), **kwargs}.items() if str(v).isdigit()}
+            try:
+                names = [r.format(**params) for r in resources]
+            except KeyError:
+                return func(view, request, *args, **kwargs)
+
+            versions = get_versions(names)
+            raw = '|'.join([request.path, request.GET.urlencode(), str(request.user.pk if per_user else '')] +
+                           ['%s=%s' % pair for pair in zip(names, versions)])
+            key = '%s:r:%s' % (get_cache_setting('KEY_PREFIX'), hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is None:
+                response = func(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cached = (compute_etag(response.data), response.data)
+                cache.set(key, cached, timeout if timeout is not None else get_cache_setting('TIMEOUT'))
+            elif overlay is not None:
+                data = overlay(view, request, cached[1])
+                cached = (compute_etag(data), data)
+
+            etag, data = cached
+            if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            return Response(data, headers={'ETag': etag})
+
+        return wrapper
+
+    return decorator
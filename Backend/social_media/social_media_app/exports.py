@@ -0,0 +1,100 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Auction, Post, Transaction
+
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportSpec:
+    def __init__(self, model, columns, date_field, user_fields):
+        self.model = model
+        self.columns = columns  # (tên cột, đường dẫn field cho values_list)
+        self.date_field = date_field
+        self.user_fields = user_fields
+
+    def get_queryset(self, date_from=None, date_to=None, user_id=None):
+        queryset = self.model.objects.all()
+        if date_from is not None:
+            queryset = queryset.filter(**{'%s__gte' % self.date_field: self.to_bound(date_from)})
+        if date_to is not None:
+            queryset = queryset.filter(**{'%s__lt' % self.date_field: self.to_bound(date_to + timedelta(days=1))})
+        if user_id is not None:
+            condition = Q()
+            for field in self.user_fields:
+                condition |= Q(**{'%s_id' % field: user_id})
+            queryset = queryset.filter(condition)
+        return queryset.order_by('pk').values_list(*[path for _, path in self.columns])
+
+    def to_bound(self, day):
+        # So sánh trực tiếp với cột (không dùng __date) để vẫn dùng được index
+        if self.model._meta.get_field(self.date_field).get_internal_type() == 'DateTimeField':
+            return timezone.make_aware(datetime.combine(day, time.min))
+        return day
+
+
+EXPORTS = {
+    'transactions': ExportSpec(Transaction, [
+        ('id', 'id'), ('sender_id', 'sender_id'), ('sender', 'sender__username'),
+        ('receiver_id', 'receiver_id'), ('receiver', 'receiver__username'), ('amount', 'amount'),
+        ('status', 'status'), ('auction_id', 'auction_id'), ('created_at', 'created_at'),
+    ], 'created_at', ['sender', 'receiver']),
+    'auctions': ExportSpec(Auction, [
+        ('id', 'id'), ('post_id', 'post_id'), ('post_title', 'post__title'), ('participant_id', 'participant_id'),
+        ('participant', 'participant__username'), ('bid_price', 'bid_price'), ('winner_id', 'winner_id'),
+        ('created_at', 'created_at'),
+    ], 'created_at', ['participant']),
+    'posts': ExportSpec(Post, [
+        ('id', 'id'), ('user_id', 'user_id'), ('user', 'user__username'), ('title', 'title'),
+        ('category', 'category__name'), ('like_count', 'statistics__like_count'),
+        ('comment_count', 'statistics__comment_count'), ('active', 'active'), ('created_date', 'created_date'),
+    ], 'created_date', ['user']),
+}
+
+
+def csv_cell(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    # Ô bắt đầu bằng = + - @ bị Excel/LibreOffice hiểu là công thức (CSV injection): thêm ' ở đầu
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def stream_rows(spec, queryset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    # Generator: dòng tiêu đề được gửi ngay, sau đó mỗi lần yield một lô dòng.
+    # Đọc theo từng trang khoá chính (pk > id cuối) thay vì iterator(): MySQLdb/PyMySQL không có cursor phía server
+    # nên iterator() vẫn nạp cả kết quả vào bộ nhớ; mỗi trang là một truy vấn dùng index khoá chính
+    header = [name for name, _ in spec.columns]
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(header)
+
+        def encode(row):
+            return writer.writerow([csv_cell(value) for value in row])
+    else:
+        def encode(row):
+            return json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    last_pk = 0
+    while True:
+        page = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not page:
+            break
+        last_pk = page[-1][0]  # Cột đầu tiên của mọi export là id
+        yield ''.join(encode(row) for row in page)
@@ -0,0 +1,59 @@
+from django.db import transaction
+
+from .caching import invalidate
+from .models import Hashtag, Post
+from .search import schedule_index
+from .trending import record_hashtag_usage
+
+HASHTAG_MAX_LENGTH = Hashtag._meta.get_field('name').max_length
+
+
+def normalize_hashtag(name):
+    return str(name or '').strip().lstrip('#').strip().lower()[:HASHTAG_MAX_LENGTH]
+
+
+def normalize_hashtags(names):
+    seen = []
+    for name in names:
+        name = normalize_hashtag(name)
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def resolve_hashtags(names):
+    # Một truy vấn đọc, một INSERT IGNORE cho các tên còn thiếu, một truy vấn đọc lại id của chúng
+    names = normalize_hashtags(names)
+    if not names:
+        return []
+
+    found = {h.name: h for h in Hashtag.objects.filter(name__in=names)}
+    missing = [n for n in names if n not in found]
+    if missing:
+        Hashtag.objects.bulk_create([Hashtag(name=n) for n in missing], ignore_conflicts=True)
+        found.update({h.name: h for h in Hashtag.objects.filter(name__in=missing)})
+    return [found[n] for n in names if n in found]
+
+
+def attach_hashtags(post, names, replace=False, created=False):
+    Through = Post.hashtag.through
+    with transaction.atomic():
+        hashtags = resolve_hashtags(names)
+        ids = [h.pk for h in hashtags]
+
+        if replace and not created:
+            Through.objects.filter(post_id=post.pk).exclude(hashtag_id__in=ids).delete()
+
+        existing = set()
+        if not created:
+            existing = set(Through.objects.filter(post_id=post.pk, hashtag_id__in=ids)
+                           .values_list('hashtag_id', flat=True))
+        added = [h for h in hashtags if h.pk not in existing]
+        Through.objects.bulk_create([Through(post_id=post.pk, hashtag_id=h.pk) for h in added],
+                                    ignore_conflicts=True)
+        record_hashtag_usage(added, post.category_id)
+        if added or replace:
+            schedule_index(post)
+            invalidate('posts')
+
+    return hashtags
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LedgerEntry, Transaction, UserBalance
+
+
+class LedgerError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def post_transaction(tx, created_at=None):
+    # Ghi sổ cái và cập nhật số dư trong cùng một transaction; khoá hai dòng số dư theo thứ tự user_id để tránh deadlock
+    if tx.sender_id == tx.receiver_id:
+        raise LedgerError('Sender and receiver must be different users')
+
+    created_at = created_at or timezone.now()
+    with transaction.atomic():
+        UserBalance.objects.bulk_create([UserBalance(user_id=tx.sender_id), UserBalance(user_id=tx.receiver_id)],
+                                        ignore_conflicts=True)
+        list(UserBalance.objects.select_for_update().filter(user_id__in=[tx.sender_id, tx.receiver_id])
+             .order_by('user_id').values_list('user_id', flat=True))
+
+        UserBalance.objects.filter(user_id=tx.sender_id).update(
+            balance=F('balance') - tx.amount, total_sent=F('total_sent') + tx.amount)
+        UserBalance.objects.filter(user_id=tx.receiver_id).update(
+            balance=F('balance') + tx.amount, total_received=F('total_received') + tx.amount)
+        return LedgerEntry.objects.bulk_create([
+            LedgerEntry(user_id=tx.sender_id, transaction=tx, amount=-tx.amount, created_at=created_at),
+            LedgerEntry(user_id=tx.receiver_id, transaction=tx, amount=tx.amount, created_at=created_at),
+        ])
+
+
+def record_transaction(sender, receiver, amount):
+    # Chỉ tạo giao dịch chờ; số dư chỉ thay đổi khi người gửi xác nhận thanh toán (complete_transaction)
+    if sender.pk == receiver.pk:
+        raise LedgerError('You cannot send money to yourself')
+    return Transaction.objects.create(sender=sender, receiver=receiver, amount=amount,
+                                      status=Transaction.STATUS_PENDING)
+
+
+def complete_transaction(tx):
+    # Chuyển pending -> completed bằng UPDATE có điều kiện, nên một giao dịch chỉ được ghi sổ đúng một lần
+    with transaction.atomic():
+        updated = Transaction.objects.filter(pk=tx.pk, status=Transaction.STATUS_PENDING) \
+            .update(status=Transaction.STATUS_COMPLETED)
+        if not updated:
+            raise LedgerError('This transaction is not pending')
+        tx.status = Transaction.STATUS_COMPLETED
+        post_transaction(tx)
+    return tx
+
+
+def get_balance(user_id):
+    return UserBalance.objects.filter(user_id=user_id).first() or UserBalance(user_id=user_id)
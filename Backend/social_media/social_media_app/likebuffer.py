@@ -0,0 +1,303 @@
+import atexit
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có flock, nhận biết process còn sống bằng os.kill
+    fcntl = None
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Case, F, Value, When
+
+from .models import Like, Notification, Post, PostStatistics, StatsDirtyDay
+from .notifications import notify_many
+from .timeline import record_interactions
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL_MS': 500,
+    'MAX_EVENTS': 1000,
+    'LOG_DIR': None,
+    'FSYNC': False,
+}
+
+
+def get_buffer_setting(name):
+    return getattr(settings, 'LIKE_WRITE_BEHIND', {}).get(name, DEFAULTS[name])
+
+
+def create_likes(likes):
+    # Trả về các like thực sự được ghi. Đường đồng bộ (set_like) hoặc worker khác có thể vừa chèn cùng
+    # (user, post) sau lúc đọc: khi đó ghi lại từng dòng, dòng đã có chỉ được tính nếu nó đang bị bỏ like
+    if not likes:
+        return []
+    try:
+        with transaction.atomic():
+            return Like.objects.bulk_create(likes)
+    except IntegrityError:
+        pass
+    created = []
+    for like in likes:
+        try:
+            with transaction.atomic():
+                like.save(force_insert=True)
+            created.append(like)
+        except IntegrityError:
+            if Like.objects.filter(user_id=like.user_id, post_id=like.post_id, active=False).update(active=True):
+                created.append(like)
+    return created
+
+
+def apply_like_events(events):
+    # events: {(user_id, post_id): liked}; ghi theo lô, cộng dồn chênh lệch bộ đếm cho từng bài viết
+    if not events:
+        return 0
+
+    with transaction.atomic():
+        posts = dict(Post.objects.filter(pk__in={p for _, p in events}).values_list('pk', 'created_date'))
+        events = {key: liked for key, liked in events.items() if key[1] in posts}
+        existing = {(like.user_id, like.post_id): like for like in Like.objects.select_for_update().filter(
+            user_id__in={u for u, _ in events}, post_id__in={p for _, p in events})}
+
+        to_create, to_update, deltas, newly_liked = [], [], Counter(), []
+        for (user_id, post_id), liked in events.items():
+            like = existing.get((user_id, post_id))
+            if like is None:
+                if liked:
+                    to_create.append(Like(user_id=user_id, post_id=post_id))
+            elif like.active != liked:
+                like.active = liked
+                to_update.append(like)
+                deltas[post_id] += 1 if liked else -1
+                if liked:
+                    newly_liked.append((user_id, post_id))
+
+        Like.objects.bulk_update(to_update, ['active'])
+        created = create_likes(to_create)
+        first_liked = [(like.user_id, like.post_id) for like in created]
+        for like in created:
+            deltas[like.post_id] += 1
+        newly_liked += first_liked
+
+        changed = [post_id for post_id, delta in deltas.items() if delta]
+        PostStatistics.objects.bulk_create([PostStatistics(post_id=post_id) for post_id in changed],
+                                           ignore_conflicts=True)
+        by_delta = {}
+        for post_id in changed:
+            by_delta.setdefault(deltas[post_id], []).append(post_id)
+        for delta, post_ids in by_delta.items():
+            # Không để bộ đếm âm (cột unsigned): kẹp về 0 thay vì bỏ qua cả lần giảm
+            PostStatistics.objects.filter(post_id__in=post_ids).update(like_count=Case(
+                When(like_count__gte=-delta, then=F('like_count') + delta), default=Value(0)))
+
+        if changed:
+            StatsDirtyDay.objects.mark(*[posts[post_id] for post_id in changed])
+        record_interactions(newly_liked, 'like')
+        notify_many(Notification.VERB_LIKE, first_liked)  # Like lại sau khi bỏ like không báo lần nữa
+
+    return len(created) + len(to_update)
+
+
+class LikeBuffer:
+    # Gom sự kiện like/unlike trong bộ nhớ (sự kiện sau thắng), ghi log append-only để phát lại khi process chết
+    def __init__(self, log_dir, flush_interval_ms=500, max_events=1000, fsync=False):
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.fsync = fsync
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._unflushed_files = []
+        self._sequence = itertools.count(1)
+
+        os.makedirs(log_dir, exist_ok=True)
+        self.pid = os.getpid()
+        self._process_lock = self._hold_process_lock()
+        self._replay_orphans()
+        self._log = open(self._log_path(), 'a', encoding='utf-8')
+
+    def _hold_process_lock(self):
+        # Giữ flock trên likes.<pid>.lock suốt đời process; kernel tự nhả khi process chết nên không bị
+        # đánh lừa khi pid được dùng lại như os.kill(pid, 0)
+        lock = open(os.path.join(self.log_dir, 'likes.%d.lock' % self.pid), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                pass  # Một buffer khác trong cùng process đã giữ khoá
+        return lock
+
+    def close(self):
+        # Dùng trong process con sau fork: bỏ file đã kế thừa, không nhả khoá của process cha
+        self._log.close()
+        self._process_lock.close()
+
+    def _log_path(self, sequence=None):
+        if sequence is None:
+            return os.path.join(self.log_dir, 'likes.%d.log' % self.pid)
+        return os.path.join(self.log_dir, 'likes.%d.%d.flushing' % (self.pid, sequence))
+
+    def _replay_orphans(self):
+        def is_alive(pid):
+            if pid == self.pid:
+                return False  # File mang pid của mình chỉ có thể do process trước (đã chết) để lại
+            if fcntl is None:
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    return False
+                except PermissionError:
+                    pass
+                return True
+            try:
+                with open(os.path.join(self.log_dir, 'likes.%d.lock' % pid)) as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)  # Lấy được khoá: process đó đã chết
+            except FileNotFoundError:
+                return False
+            except BlockingIOError:
+                return True
+            return False
+
+        def sort_key(path):
+            parts = os.path.basename(path).split('.')
+            return int(parts[1]), parts[-1] == 'log', int(parts[2]) if parts[-1] == 'flushing' else 0
+
+        orphans = []
+        for path in glob.glob(os.path.join(self.log_dir, 'likes.*')):
+            if path.endswith('.lock'):
+                continue
+            try:
+                if not is_alive(int(os.path.basename(path).split('.')[1])):
+                    orphans.append(path)
+            except (IndexError, ValueError):
+                continue
+
+        for path in sorted(orphans, key=sort_key):
+            claimed = self._log_path(next(self._sequence))
+            try:
+                os.rename(path, claimed)  # Process khác đã nhận file này trước thì bỏ qua
+            except OSError:
+                continue
+            with open(claimed, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        user_id, post_id, liked = json.loads(line)
+                    except ValueError:
+                        continue  # Dòng ghi dở khi process chết
+                    self._pending[(user_id, post_id)] = liked
+            self._unflushed_files.append(claimed)
+
+        if self._pending:
+            logger.info('Replayed %d buffered like events', len(self._pending))
+            self._start_worker()
+
+    def add(self, user_id, post_id, liked):
+        with self._lock:
+            self._log.write(json.dumps([user_id, post_id, liked]) + '\n')
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._pending[(user_id, post_id)] = liked
+            size = len(self._pending)
+
+        self._start_worker()
+        if size >= self.max_events:
+            self._wakeup.set()
+
+    def get(self, user_id, post_id):
+        return self._pending.get((user_id, post_id))
+
+    def pending_for_user(self, user_id, post_ids):
+        with self._lock:
+            return {pk: self._pending[(user_id, pk)] for pk in post_ids if (user_id, pk) in self._pending}
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._log.close()
+                flushing = self._log_path(next(self._sequence))
+                os.replace(self._log_path(), flushing)
+                self._unflushed_files.append(flushing)
+                self._log = open(self._log_path(), 'a', encoding='utf-8')
+
+            try:
+                written = apply_like_events(batch)
+            except Exception:
+                with self._lock:
+                    # Trả lại các sự kiện chưa ghi được, không đè lên sự kiện mới hơn
+                    for key, liked in batch.items():
+                        self._pending.setdefault(key, liked)
+                raise
+
+            for path in self._unflushed_files:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._unflushed_files = []
+            return written
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='like-write-behind', daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Flushing buffered like events failed, retrying later')
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_like_buffer():
+    # Mỗi process một buffer, tạo khi dùng lần đầu: server fork sau khi import (gunicorn --preload) thì process con
+    # không dùng chung log và pid của process cha
+    global _buffer
+    if not get_buffer_setting('ENABLED'):
+        return None
+    if _buffer is None or _buffer.pid != os.getpid():
+        with _buffer_lock:
+            if _buffer is not None and _buffer.pid != os.getpid():
+                _buffer.close()
+                _buffer = None
+            if _buffer is None:
+                log_dir = get_buffer_setting('LOG_DIR') or os.path.join(settings.BASE_DIR, 'var', 'like_events')
+                _buffer = LikeBuffer(log_dir, get_buffer_setting('FLUSH_INTERVAL_MS'),
+                                     get_buffer_setting('MAX_EVENTS'), get_buffer_setting('FSYNC'))
+                atexit.unregister(_flush_at_exit)  # Process con kế thừa đăng ký của process cha
+                atexit.register(_flush_at_exit)
+    return _buffer
+
+
+def _flush_at_exit():
+    try:
+        if _buffer is not None and _buffer.pid == os.getpid() and _buffer._pending:
+            _buffer.flush()
+    except Exception:
+        logger.exception('Flushing buffered like events at exit failed; they will be replayed on next start')
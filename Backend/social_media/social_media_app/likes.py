@@ -0,0 +1,108 @@
+from django.db import IntegrityError, transaction
+
+from .likebuffer import get_like_buffer
+from .models import Like, Notification, PostStatistics
+from .notifications import notify
+from .timeline import record_interactions
+
+
+class LikedResolver:
+    # Trạng thái "đã like" của người dùng hiện tại, tra theo lô và nhớ trong phạm vi một request
+    def __init__(self, user):
+        self.user = user
+        self._liked = {}
+
+    def prime(self, post_ids):
+        missing = {pk for pk in post_ids if pk not in self._liked}
+        if not missing:
+            return
+
+        liked = set()
+        if self.user.is_authenticated:
+            liked = set(Like.objects.filter(user=self.user, active=True, post_id__in=missing)
+                        .values_list('post_id', flat=True))
+        for pk in missing:
+            self._liked[pk] = pk in liked
+        self._liked.update(self.buffered(missing))
+
+    def buffered(self, post_ids):
+        # Sự kiện like chưa flush (write-behind) của chính người dùng này được ưu tiên hơn DB
+        buffer = get_like_buffer()
+        if buffer is None or not self.user.is_authenticated:
+            return {}
+        return buffer.pending_for_user(self.user.pk, post_ids)
+
+    def overlay(self, post_id, liked):
+        return self.buffered([post_id]).get(post_id, liked)
+
+    def is_liked(self, post_id):
+        if post_id not in self._liked:
+            self.prime([post_id])
+        return self._liked[post_id]
+
+    def forget(self, post_id):
+        self._liked.pop(post_id, None)
+
+
+def get_liked_resolver(request):
+    resolver = getattr(request, '_liked_resolver', None)
+    if resolver is None:
+        resolver = request._liked_resolver = LikedResolver(request.user)
+    return resolver
+
+
+def set_like(user, post, liked):
+    buffer = get_like_buffer()
+    if buffer is not None:
+        buffer.add(user.pk, post.pk, liked)
+        return True
+
+    # Một câu UPDATE có điều kiện (hoặc INSERT) duy nhất: gọi lặp lại hay gọi đồng thời đều không đếm trùng
+    created = False
+    with transaction.atomic():
+        if liked:
+            changed = Like.objects.filter(user=user, post=post, active=False).update(active=True)
+            if not changed:
+                try:
+                    with transaction.atomic():
+                        Like.objects.create(user=user, post=post)
+                    changed = created = True
+                except IntegrityError:
+                    changed = 0  # Đã like từ trước
+        else:
+            changed = Like.objects.filter(user=user, post=post, active=True).update(active=False)
+
+        if changed:
+            PostStatistics.objects.increment(post, 'like_count', 1 if liked else -1)
+            if liked:
+                record_interactions([(user.pk, post.pk)], 'like')
+            if created:
+                notify(Notification.VERB_LIKE, post.pk, user.pk)  # Like lại sau khi bỏ like không báo lần nữa
+    return bool(changed)
+
+
+def toggle_like(user, post):
+    buffer = get_like_buffer()
+    if buffer is not None:
+        liked = not LikedResolver(user).is_liked(post.pk)
+        buffer.add(user.pk, post.pk, liked)
+        return liked
+
+    with transaction.atomic():
+        like = Like.objects.select_for_update().filter(user=user, post=post).only('active').first()
+        liked = not like.active if like else True
+        set_like(user, post, liked)
+    return liked
+
+
+def get_like_count(post, user=None):
+    count = PostStatistics.objects.filter(post=post).values_list('like_count', flat=True).first() or 0
+
+    buffer = get_like_buffer()
+    if buffer is not None and user is not None:
+        # Cộng phần chênh lệch do sự kiện chưa flush của chính người dùng này
+        buffered = buffer.get(user.pk, post.pk)
+        if buffered is not None:
+            stored = Like.objects.filter(user=user, post=post, active=True).exists()
+            count = max(count + (buffered - stored), 0)
+    return count
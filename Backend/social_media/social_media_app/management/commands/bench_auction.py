@@ -0,0 +1,80 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from social_media_app.auctions import BidRejected, open_auction, place_bid
+from social_media_app.models import Auction, AuctionState, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent bids at a throwaway auction and check that the final winner is exactly the highest bid.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bidders', type=int, default=50)
+        parser.add_argument('--bids', type=int, default=20, help='Bids per bidder.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users, post and bids.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = 'bench_auction_%d' % int(time.time())
+        owner = User.objects.create_user(username='%s_owner' % prefix)
+        bidders = [User.objects.create_user(username='%s_%d' % (prefix, i)) for i in range(options['bidders'])]
+        post = Post.objects.create(user=owner, title=prefix, content='benchmark', active=False)
+        open_auction(post, Decimal('1.00'), timezone.now() + timedelta(hours=1), Decimal('0.01'))
+
+        plans = [sorted(Decimal(rng.randint(100, 10 ** 6)) / 100 for _ in range(options['bids'])) for _ in bidders]
+        accepted, rejected, errors = [0], [0], []
+        lock = threading.Lock()
+
+        def run(user, amounts):
+            ok = ko = 0
+            try:
+                for amount in amounts:
+                    try:
+                        place_bid(post, user, amount)
+                        ok += 1
+                    except BidRejected:
+                        ko += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                with lock:
+                    accepted[0] += ok
+                    rejected[0] += ko
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user, amounts)) for user, amounts in zip(bidders, plans)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        state = AuctionState.objects.get(post=post)
+        best = Auction.objects.filter(post=post).order_by('-bid_price').first()
+        expected = max(max(amounts) for amounts in plans)
+        total = accepted[0] + rejected[0]
+        self.stdout.write('%d bids (%d accepted, %d rejected) in %.2fs: %.0f bids/s' % (
+            total, accepted[0], rejected[0], elapsed, total / elapsed if elapsed else 0))
+
+        try:
+            if errors:
+                raise CommandError('%d bidder threads failed: %r' % (len(errors), errors[0]))
+            if state.current_price != expected or best.bid_price != expected or state.leader_id != best.participant_id:
+                raise CommandError('Wrong winner: state=%s/%s best=%s/%s expected=%s' % (
+                    state.current_price, state.leader_id, best.bid_price, best.participant_id, expected))
+            if state.bid_count != accepted[0]:
+                raise CommandError('bid_count %d != %d accepted bids' % (state.bid_count, accepted[0]))
+            self.stdout.write(self.style.SUCCESS('Winner %s at %s is correct' % (state.leader_id, state.current_price)))
+        finally:
+            if not options['keep']:
+                post.delete()
+                User.objects.filter(username__startswith=prefix).delete()
@@ -0,0 +1,90 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.middleware import OAuth2TokenMiddleware
+from oauth2_provider.models import AccessToken, Application
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from social_media_app.authentication import CachedOAuth2Authentication, get_token_cache
+from social_media_app.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request authentication cost of OAuth2TokenMiddleware + OAuth2Authentication with the cached ' \
+           'authenticator.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Distinct users, one access token each.')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--body-kb', type=int, default=4, help='Size of the JSON body sent with each request.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = 'bench_auth_%d' % int(time.time())
+        User.objects.bulk_create([User(username='%s_%d' % (prefix, i)) for i in range(options['users'])])
+        users = list(User.objects.filter(username__startswith=prefix))
+        application = Application.objects.create(name=prefix, client_type=Application.CLIENT_PUBLIC,
+                                                 authorization_grant_type=Application.GRANT_PASSWORD)
+        expires = timezone.now() + timedelta(hours=1)
+        AccessToken.objects.bulk_create([AccessToken(user=u, application=application, token='%s_%d' % (prefix, u.pk),
+                                                     scope='read write', expires=expires) for u in users])
+        tokens = ['%s_%d' % (prefix, u.pk) for u in users]
+        body = json.dumps({'content': 'x' * options['body_kb'] * 1024})
+        factory = APIRequestFactory()
+
+        try:
+            get_token_cache().clear()
+            plan = [rng.choice(tokens) for _ in range(options['requests'])]
+            results = {}
+            for label, run in [('middleware + OAuth2Authentication', self.stock),
+                               ('CachedOAuth2Authentication', self.cached)]:
+                timings, queries = [], []
+                for token in plan:
+                    request = factory.post('/bench/', body, content_type='application/json',
+                                           HTTP_AUTHORIZATION='Bearer %s' % token, HTTP_HOST='127.0.0.1')
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        user = run(request)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    if user is None:
+                        self.stderr.write('%s rejected a valid token' % label)
+                        return
+                    queries.append(len(captured))
+                timings.sort()
+                results[label] = statistics.mean(queries)
+                self.stdout.write('%-34s p50 %.3f ms  p95 %.3f ms  %.3f queries/request' % (
+                    label, statistics.median(timings), timings[int(len(timings) * 0.95) - 1], results[label]))
+
+            baseline, cached = results.values()
+            self.stdout.write('%d tokens, %d requests: %.3f queries saved per request (%d cached tokens)' % (
+                len(tokens), len(plan), baseline - cached, len(get_token_cache())))
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+            application.delete()
+            get_token_cache().clear()
+
+    def stock(self, request):
+        # Đường cũ: middleware gọi authenticate() của Django, rồi DRF kiểm tra token lần nữa qua oauthlib
+        result = []
+
+        def view(request):
+            result.append(OAuth2Authentication().authenticate(Request(request)))
+            return HttpResponse()
+
+        OAuth2TokenMiddleware(view)(request)
+        return result[0][0] if result[0] else None
+
+    def cached(self, request):
+        result = CachedOAuth2Authentication().authenticate(Request(request))
+        return result[0] if result else None
@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from social_media_app import paginators, serializers
+from social_media_app.models import Category, Hashtag, Like, Post, User
+from social_media_app.timeline import feed_querysets, record_interactions
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency of the personalized /feed/ with the global post list on throwaway data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=5000, help='Historical posts created before the benchmark.')
+        parser.add_argument('--new-posts', type=int, default=200, help='Posts created through fan-out on write.')
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--hashtags', type=int, default=50)
+        parser.add_argument('--likes', type=int, default=20, help='Likes per user on historical posts.')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = 'bench_feed_%d' % int(time.time())
+        try:
+            users, new_post_ms = self.build(prefix, rng, options)
+            self.stdout.write('fan-out on write: %.2f ms per new post (median)' % statistics.median(new_post_ms))
+
+            factory = APIRequestFactory()
+            for label, page_fn in [('global /post-list/', self.global_page), ('personalized /feed/', self.feed_page)]:
+                timings, queries = [], []
+                for _ in range(options['requests']):
+                    request = Request(factory.get('/bench/', HTTP_HOST='127.0.0.1'))
+                    request.user = rng.choice(users)
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        page_fn(request)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries.append(len(captured))
+                timings.sort()
+                self.stdout.write('%-22s p50 %.2f ms  p95 %.2f ms  %.1f queries/request' % (
+                    label, statistics.median(timings), timings[int(len(timings) * 0.95) - 1],
+                    statistics.mean(queries)))
+        finally:
+            if not options['keep']:
+                Post.objects.filter(title__startswith=prefix).delete()
+                User.objects.filter(username__startswith=prefix).delete()
+                Category.objects.filter(name__startswith=prefix).delete()
+                Hashtag.objects.filter(name__startswith=prefix).delete()
+
+    def build(self, prefix, rng, options):
+        User.objects.bulk_create([User(username='%s_%d' % (prefix, i)) for i in range(options['users'])])
+        users = list(User.objects.filter(username__startswith=prefix))
+        Category.objects.bulk_create([Category(name='%s_%d' % (prefix, i)) for i in range(options['categories'])])
+        categories = list(Category.objects.filter(name__startswith=prefix))
+        Hashtag.objects.bulk_create([Hashtag(name='%s_%d' % (prefix, i)) for i in range(options['hashtags'])])
+        hashtags = list(Hashtag.objects.filter(name__startswith=prefix))
+
+        # Bài viết cũ chèn thẳng (không qua signal), sau đó dựng điểm quan tâm từ like
+        Post.objects.bulk_create([Post(user=rng.choice(users), category=rng.choice(categories), title=prefix,
+                                       content='benchmark') for _ in range(options['posts'])], batch_size=1000)
+        post_ids = list(Post.objects.filter(title=prefix).values_list('pk', flat=True))
+        Through = Post.hashtag.through
+        Through.objects.bulk_create([Through(post_id=pk, hashtag_id=h.pk) for pk in post_ids
+                                     for h in rng.sample(hashtags, 2)], batch_size=1000, ignore_conflicts=True)
+        pairs = {(u.pk, pk) for u in users for pk in rng.sample(post_ids, min(options['likes'], len(post_ids)))}
+        Like.objects.bulk_create([Like(user_id=u, post_id=p) for u, p in pairs], batch_size=1000)
+        record_interactions(pairs, 'like')
+
+        new_post_ms = []
+        for _ in range(options['new_posts']):
+            started = time.perf_counter()
+            with transaction.atomic():
+                post = Post.objects.create(user=rng.choice(users), category=rng.choice(categories), title=prefix,
+                                           content='benchmark')
+                post.hashtag.add(*rng.sample(hashtags, 2))
+            new_post_ms.append((time.perf_counter() - started) * 1000)
+        return users, new_post_ms
+
+    def global_page(self, request):
+        queryset = Post.objects.with_details().filter(active=True).order_by('-created_date', '-id')
+        paginator = paginators.PostCursorPaginator()
+        page = paginator.paginate_queryset(queryset, request)
+        return serializers.PostSerializer(page, many=True, context={'request': request}).data
+
+    def feed_page(self, request):
+        paginator = paginators.FeedCursorPaginator()
+        page = paginator.paginate_merged(feed_querysets(request.user), request)
+        return serializers.PostSerializer(page, many=True, context={'request': request}).data
@@ -0,0 +1,70 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from social_media_app.pubsub import InProcessBroker, comments_topic
+
+
+class Command(BaseCommand):
+    help = 'Load-test the push broker with N simulated subscribers and compare the traffic with polling.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000)
+        parser.add_argument('--messages', type=int, default=100, help='Messages published on the post topic.')
+        parser.add_argument('--rate', type=float, default=10, help='Messages published per second.')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between polls in the old client.')
+        parser.add_argument('--queue-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self.run(options))
+        latencies, received, dropped, elapsed = result
+        subscribers, messages = options['subscribers'], options['messages']
+
+        self.stdout.write('%d subscribers, %d messages, %.2fs' % (subscribers, messages, elapsed))
+        self.stdout.write('delivered %d/%d (dropped %d by backpressure)' % (received, subscribers * messages, dropped))
+        if latencies:
+            latencies.sort()
+            self.stdout.write('latency ms: p50 %.2f, p99 %.2f, max %.2f' % (
+                statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000,
+                latencies[-1] * 1000))
+        polls = subscribers * elapsed / options['poll_interval']
+        self.stdout.write('push: %d frames, 0 DB queries per frame; polling every %.0fs: %d HTTP requests, '
+                          'each hitting the DB, with up to %.0fs staleness' % (
+                              received, options['poll_interval'], polls, options['poll_interval']))
+
+    async def run(self, options):
+        broker = InProcessBroker(queue_size=options['queue_size'])
+        topic = comments_topic(0)
+        messages = options['messages']
+        latencies, received = [], [0]
+
+        subscriptions = [broker.subscribe([topic]) for _ in range(options['subscribers'])]
+
+        async def subscriber(subscription):
+            for _ in range(messages):
+                message = await subscription.get()
+                latencies.append(time.perf_counter() - message['sent_at'])
+                received[0] += 1
+
+        tasks = [asyncio.ensure_future(subscriber(subscription)) for subscription in subscriptions]
+
+        def publish():
+            for i in range(messages):
+                broker.publish(topic, {'type': 'comment', 'id': i, 'sent_at': time.perf_counter()})
+                time.sleep(1 / options['rate'])
+
+        started = time.perf_counter()
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        await asyncio.wait(tasks, timeout=messages / options['rate'] + 10)
+        publisher.join()
+        elapsed = time.perf_counter() - started
+
+        for task in tasks:
+            task.cancel()
+        for subscription in subscriptions:
+            subscription.close()
+        return latencies, received[0], sum(s.dropped for s in subscriptions), elapsed
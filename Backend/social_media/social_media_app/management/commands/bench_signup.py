@@ -0,0 +1,79 @@
+import io
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory
+
+from social_media_app import views
+from social_media_app.models import MediaFile, User
+
+
+class Command(BaseCommand):
+    help = 'Compare signup latency with an avatar when variants are rendered in the request vs. in the worker pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--width', type=int, default=3000)
+        parser.add_argument('--height', type=int, default=2000)
+        parser.add_argument('--wait-for-pool', action='store_true',
+                            help='Let the pool finish after each signup so it does not compete with the next request '
+                                 'for CPU (closer to a multi-core server).')
+
+    def handle(self, *args, **options):
+        # Ảnh nhiễu để JPEG không nén quá nhỏ, gần với ảnh chụp từ điện thoại
+        image = Image.effect_noise((options['width'], options['height']), 64).convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        payload = buffer.getvalue()
+        self.stdout.write('avatar %dx%d, %.1f MB' % (options['width'], options['height'], len(payload) / 2 ** 20))
+
+        prefix = 'bench_signup_%d' % int(time.time())
+        media_root = tempfile.mkdtemp(prefix='bench_signup_media_')
+        factory = APIRequestFactory()
+        view = views.UserViewSet.as_view({'post': 'create'})
+        try:
+            for label, is_async in [('variants in request', False), ('variants in worker pool', True)]:
+                pipeline = {**getattr(settings, 'MEDIA_PIPELINE', {}), 'ASYNC': is_async}
+                with override_settings(MEDIA_PIPELINE=pipeline, MEDIA_ROOT=media_root, THROTTLE={'RATES': {}}):
+                    timings = []
+                    for i in range(options['requests']):
+                        upload = io.BytesIO(payload)
+                        upload.name = 'avatar.jpg'
+                        request = factory.post('/users/', {'username': '%s_%d_%d' % (prefix, is_async, i),
+                                                           'password': 'secret', 'avatar': upload},
+                                               format='multipart', HTTP_HOST='127.0.0.1')
+                        started = time.perf_counter()
+                        response = view(request)
+                        timings.append((time.perf_counter() - started) * 1000)
+                        if response.status_code != 201:
+                            self.stderr.write('signup failed: %s %s' % (response.status_code, response.data))
+                            return
+                        if options['wait_for_pool']:
+                            self.wait_for_pool(prefix)
+
+                    started = time.perf_counter()
+                    self.wait_for_pool(prefix)
+                    drained = (time.perf_counter() - started) * 1000
+                timings.sort()
+                self.stdout.write('%-24s p50 %7.2f ms  p99 %7.2f ms  max %7.2f ms%s' % (
+                    label, statistics.median(timings), timings[max(int(len(timings) * 0.99) - 1, 0)], timings[-1],
+                    '  (pool drained %.0f ms later)' % drained if is_async else ''))
+
+            statuses = MediaFile.objects.filter(owner__username__startswith=prefix).values_list('status', flat=True)
+            self.stdout.write('%d uploads ready, %d not ready' % (
+                sum(s == MediaFile.STATUS_READY for s in statuses),
+                sum(s != MediaFile.STATUS_READY for s in statuses)))
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def wait_for_pool(self, prefix):
+        while MediaFile.objects.filter(owner__username__startswith=prefix, status__in=[
+                MediaFile.STATUS_PENDING, MediaFile.STATUS_PROCESSING]).exists():
+            time.sleep(0.01)
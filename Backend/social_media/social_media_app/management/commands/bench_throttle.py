@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from social_media_app.throttling import CacheBucketStore, LocalBucketStore, TokenBucketThrottle, \
+    get_throttle_setting, parse_rate
+
+
+class BenchView:
+    action = 'bench'
+    throttle_scopes = {'bench': 'bench'}
+
+
+class Command(BaseCommand):
+    help = 'Measure what one throttle check costs per request for each token-bucket store.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--clients', type=int, default=100, help='Distinct users/IPs the requests are spread over.')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--rate', default='30/min')
+
+    def handle(self, *args, **options):
+        requests, clients, rate = options['requests'], options['clients'], options['rate']
+        capacity, refill_rate = parse_rate(rate)
+        self.stdout.write('%d checks over %d clients at %s (cache alias "%s")' % (
+            requests, clients, rate, get_throttle_setting('CACHE_ALIAS')))
+
+        for name, store in [('local', LocalBucketStore()), ('cache', CacheBucketStore())]:
+            prefix = 'bench:%s:%d' % (name, time.time_ns())
+            keys = ['%s:%d' % (prefix, i % clients) for i in range(requests)]
+
+            started = time.perf_counter()
+            allowed = sum(store.consume(key, capacity, refill_rate)[0] for key in keys)
+            elapsed = time.perf_counter() - started
+            self.report('%s store, 1 thread' % name, requests, allowed, elapsed)
+
+            prefix += ':mt'
+            counts = []
+
+            def run(part):
+                ok = sum(store.consume('%s:%d' % (prefix, i % clients), capacity, refill_rate)[0] for i in part)
+                counts.append(ok)
+
+            parts = [range(t, requests, options['threads']) for t in range(options['threads'])]
+            threads = [threading.Thread(target=run, args=(part,)) for part in parts]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.report('%s store, %d threads' % (name, options['threads']), requests, sum(counts),
+                        time.perf_counter() - started)
+
+        # Toàn bộ đường đi của DRF: dựng request, tính key theo IP, kiểm tra bucket; so với throttle mặc định của DRF
+        factory = APIRequestFactory()
+        http_requests = []
+        for i in range(requests):
+            client = i % clients
+            request = factory.post('/bench/', REMOTE_ADDR='10.0.%d.%d' % (client // 256 % 256, client % 256))
+            request.user = AnonymousUser()
+            http_requests.append(request)
+
+        with override_settings(THROTTLE={**getattr(settings, 'THROTTLE', {}), 'RATES': {'bench': rate}}):
+            throttle, view = TokenBucketThrottle(), BenchView()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                allowed = sum(throttle.allow_request(r, view) for r in http_requests)
+                elapsed = time.perf_counter() - started
+            self.report('TokenBucketThrottle (DRF path)', requests, allowed, elapsed, len(queries))
+
+        throttle = type('BaselineThrottle', (AnonRateThrottle,), {'THROTTLE_RATES': {'anon': rate}})()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            allowed = sum(throttle.allow_request(r, None) for r in http_requests)
+            elapsed = time.perf_counter() - started
+        self.report('DRF AnonRateThrottle (baseline)', requests, allowed, elapsed, len(queries))
+
+    def report(self, label, requests, allowed, elapsed, queries=None):
+        line = '%-34s %8.1f us/check  %9.0f checks/s  %6d allowed  %6d rejected' % (
+            label, elapsed / requests * 1e6, requests / elapsed if elapsed else 0, allowed, requests - allowed)
+        if queries is not None:
+            line += '  %d DB queries' % queries
+        self.stdout.write(line)
+
@@ -0,0 +1,86 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from social_media_app.models import Comment, Like, Post, TimelineEntry, User, UserInterest
+from social_media_app.timeline import get_timeline_setting, post_sources, refresh_hot_sources, trim_timelines
+
+
+class Command(BaseCommand):
+    help = 'Rebuild interest scores from likes, comments and posts, then backfill and trim materialized timelines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--skip-interests', action='store_true', help='Keep current UserInterest scores.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        weights = get_timeline_setting('WEIGHTS')
+        max_entries = get_timeline_setting('MAX_ENTRIES')
+
+        if not options['skip_interests']:
+            for pks in self.user_batches(batch_size):
+                self.rebuild_interests(pks, weights)
+        # Cờ nóng tính lại sau khi có điểm mới; nguồn hết nóng được bù bài vào timeline ngay bên dưới
+        hot = refresh_hot_sources()
+
+        users = entries = trimmed = 0
+        for pks in self.user_batches(batch_size):
+            users += len(pks)
+            for user_id in pks:
+                condition = Q(user_id=user_id)
+                interests = UserInterest.objects.filter(user_id=user_id, score__gte=get_timeline_setting('MIN_SCORE'))
+                for kind, target_id in interests.values_list('kind', 'target_id'):
+                    if (kind, target_id) in hot:
+                        continue
+                    if kind == UserInterest.KIND_AUTHOR:
+                        condition |= Q(user_id=target_id)
+                    elif kind == UserInterest.KIND_CATEGORY:
+                        condition |= Q(category_id=target_id)
+                    else:
+                        condition |= Q(hashtag__id=target_id)
+
+                post_ids = Post.objects.filter(condition, active=True).order_by('-id') \
+                    .values_list('id', flat=True).distinct()[:max_entries]
+                created = TimelineEntry.objects.bulk_create(
+                    [TimelineEntry(user_id=user_id, post_id=post_id) for post_id in post_ids],
+                    batch_size=1000, ignore_conflicts=True)
+                entries += len(created)
+            trimmed += trim_timelines(pks, max_entries)
+
+        self.stdout.write(self.style.SUCCESS('%d users processed, %d timeline entries written, %d trimmed, '
+                                             '%d hot sources' % (users, entries, trimmed, len(hot))))
+
+    def user_batches(self, batch_size):
+        last_pk = 0
+        while True:
+            pks = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return
+            last_pk = pks[-1]
+            yield pks
+
+    def rebuild_interests(self, user_ids, weights):
+        actions = [
+            ('like', Like.objects.filter(user_id__in=user_ids, active=True)),
+            ('comment', Comment.objects.filter(user_id__in=user_ids, active=True)),
+            ('post', Post.objects.filter(user_id__in=user_ids)),
+        ]
+        pairs = []
+        for action, queryset in actions:
+            post_field = 'id' if action == 'post' else 'post_id'
+            pairs += [(action, user_id, post_id) for user_id, post_id in queryset.values_list('user_id', post_field)]
+
+        sources = post_sources({post_id for _, _, post_id in pairs})
+        scores = Counter()
+        for action, user_id, post_id in pairs:
+            for kind, target_id in sources.get(post_id, []):
+                if not (kind == UserInterest.KIND_AUTHOR and target_id == user_id):
+                    scores[(user_id, kind, target_id)] += weights.get(action, 0)
+
+        with transaction.atomic():
+            UserInterest.objects.filter(user_id__in=user_ids).delete()
+            UserInterest.objects.bulk_create([UserInterest(user_id=u, kind=k, target_id=t, score=score)
+                                              for (u, k, t), score in scores.items()], batch_size=1000)
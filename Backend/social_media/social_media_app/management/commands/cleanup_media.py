@@ -0,0 +1,65 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from social_media_app.media import get_media_setting, get_media_storage, media_key, session_path, variant_name
+from social_media_app.models import MediaFile, PostImage, UploadSession, User
+
+
+class Command(BaseCommand):
+    help = 'Delete expired upload sessions, post images no post uses any more and avatars no user has any more ' \
+           '(row and stored variants).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size, dry_run = options['batch_size'], options['dry_run']
+
+        sessions = 0
+        while True:
+            expired = list(UploadSession.objects.filter(expires_at__lte=now).order_by('pk')[:batch_size])
+            if not expired or dry_run:
+                sessions += len(expired)
+                break
+            for session in expired:
+                if os.path.exists(session_path(session)):
+                    os.remove(session_path(session))
+            sessions += UploadSession.objects.filter(pk__in=[s.pk for s in expired]).delete()[0]
+
+        # Ảnh không còn bài viết nào dùng và không còn phiên tải lên nào có thể gắn nó vào bài viết,
+        # cùng ảnh đại diện không còn là avatar của ai (đã được thay hoặc user đã bị xoá)
+        grace = now - timedelta(hours=get_media_setting('SESSION_TTL_HOURS'))
+        orphans = MediaFile.objects.filter(updated_at__lt=grace).exclude(
+            status__in=[MediaFile.STATUS_PENDING, MediaFile.STATUS_PROCESSING]).filter(
+            ~Exists(User.objects.filter(avatar_media=OuterRef('pk'))),
+            ~Exists(PostImage.objects.filter(media=OuterRef('pk'))),
+            ~Exists(UploadSession.objects.filter(media=OuterRef('pk'))))
+
+        storage = get_media_storage()
+        blobs = variants = 0
+        last_pk = 0
+        while True:
+            batch = list(orphans.filter(pk__gt=last_pk).order_by('pk').prefetch_related('variants')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for media in batch:
+                names = [variant_name(media_key(media.kind, media.pk, media.sha256), v.name, v.format)
+                         for v in media.variants.all()]
+                if dry_run:
+                    blobs, variants = blobs + 1, variants + len(names)
+                    continue
+                # Xoá có điều kiện trước: bỏ qua nếu ảnh vừa được tải lên lại hoặc gắn vào bài viết trong lúc dọn
+                if orphans.filter(pk=media.pk).delete()[0]:
+                    for name in names:
+                        storage.delete(name)
+                    blobs, variants = blobs + 1, variants + len(names)
+
+        self.stdout.write(self.style.SUCCESS('%d expired sessions, %d unused images (%d stored variants) removed%s' % (
+            sessions, blobs, variants, ' (dry run)' if dry_run else '')))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from social_media_app.auctions import close_due_auctions
+
+
+class Command(BaseCommand):
+    help = 'Close expired auctions, record the winner and create the pending Transaction owed by the winner.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep running, polling every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            closed, settled = close_due_auctions(batch_size=options['batch_size'])
+            if closed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS('%d auctions closed, %d pending transactions created in %.2fs' % (
+                    closed, settled, time.perf_counter() - started)))
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
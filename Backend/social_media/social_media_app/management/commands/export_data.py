@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from social_media_app.exports import EXPORT_CHUNK_SIZE, EXPORTS, FORMATS, stream_rows
+
+
+def date_argument(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Stream Transaction, Auction or Post rows as CSV or NDJSON to a file or stdout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--fmt', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--from', dest='date_from', type=date_argument, help='YYYY-MM-DD, inclusive')
+        parser.add_argument('--to', dest='date_to', type=date_argument, help='YYYY-MM-DD, inclusive')
+        parser.add_argument('--user', type=int)
+        parser.add_argument('--output', '-o', help='File path, defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+
+        spec = EXPORTS[options['kind']]
+        queryset = spec.get_queryset(options['date_from'], options['date_to'], options['user'])
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else None
+
+        started = time.perf_counter()
+        written = 0
+        try:
+            for block in stream_rows(spec, queryset, options['fmt'], options['chunk_size']):
+                if output is None:
+                    self.stdout.write(block, ending='')
+                else:
+                    output.write(block)
+                written += len(block)
+        finally:
+            if output is not None:
+                output.close()
+
+        # In thống kê ra stderr để không lẫn vào dữ liệu khi ghi ra stdout
+        self.stderr.write('Exported %s (%d bytes) in %.2fs' % (options['kind'], written, time.perf_counter() - started))
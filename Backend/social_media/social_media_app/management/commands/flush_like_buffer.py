@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from social_media_app.likebuffer import get_like_buffer
+
+
+class Command(BaseCommand):
+    help = 'Replay unflushed write-behind like events left by stopped processes and write them to the database.'
+
+    def handle(self, *args, **options):
+        buffer = get_like_buffer()
+        if buffer is None:
+            raise CommandError('LIKE_WRITE_BEHIND is disabled in settings.')
+
+        written = buffer.flush()
+        self.stdout.write(self.style.SUCCESS('%d like rows written' % written))
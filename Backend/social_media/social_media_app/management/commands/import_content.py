@@ -0,0 +1,254 @@
+import csv
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from social_media_app.caching import invalidate
+from social_media_app.hashtags import normalize_hashtags, resolve_hashtags
+from social_media_app.models import Category, Post, PostStatistics, StatsDirtyDay, User
+from social_media_app.search import index_new_posts
+
+HASHTAG_SPLIT_RE = re.compile(r'[\s,;]+')
+PK_ATTEMPTS = 3
+
+
+class UnmatchedPosts(Exception):
+    pass
+
+
+def init_worker():
+    # Process con (kể cả khi dùng spawn) cần settings để make_password biết PASSWORD_HASHERS
+    django.setup()
+
+
+def read_rows(path, fmt):
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_hashtags(value):
+    if isinstance(value, list):
+        return normalize_hashtags(value)
+    return normalize_hashtags(HASHTAG_SPLIT_RE.split(value or ''))
+
+
+def parse_bool(value, default=True):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users or posts (with categories and hashtags) from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['users', 'posts'])
+        parser.add_argument('path')
+        parser.add_argument('--fmt', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used to hash passwords')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError('File not found: %s' % path)
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+        fmt = options['fmt'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        self.verbosity = options['verbosity']
+        self.skipped = 0
+        started = time.perf_counter()
+        rows = read_rows(path, fmt)
+        if options['kind'] == 'users':
+            created = self.import_users(rows, options['batch_size'], options['workers'])
+        else:
+            created = self.import_posts(rows, options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        total = created + self.skipped
+        self.stdout.write(self.style.SUCCESS('%d %s imported, %d skipped in %.2fs (%.0f rows/sec)' % (
+            created, options['kind'], self.skipped, elapsed, total / elapsed if elapsed else total)))
+
+    def skip(self, row, reason):
+        self.skipped += 1
+        if self.verbosity >= 2:
+            self.stderr.write('Skipped %s: %s' % (json.dumps(row, ensure_ascii=False, default=str), reason))
+
+    def import_users(self, rows, batch_size, workers):
+        created = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            for chunk in chunked(rows, batch_size):
+                chunk = [row for row in chunk if self.valid_user(row)]
+                existing = set(User.objects.filter(username__in=[r['username'] for r in chunk])
+                               .values_list('username', flat=True))
+                new_rows, seen = [], set()
+                for row in chunk:
+                    if row['username'] in existing or row['username'] in seen:
+                        self.skip(row, 'username already exists')
+                        continue
+                    seen.add(row['username'])
+                    new_rows.append(row)
+
+                # PBKDF2 tốn CPU: băm song song trên nhiều process; dòng đã có password_hash thì giữ nguyên
+                plain = [r for r in new_rows if not r.get('password_hash')]
+                hashed = pool.map(make_password, [r.get('password') or None for r in plain],
+                                  chunksize=max(1, len(plain) // (workers * 4)))
+                for row, password in zip(plain, hashed):
+                    row['password_hash'] = password
+
+                users = [User(username=r['username'], email=r.get('email') or '', first_name=r.get('first_name') or '',
+                              last_name=r.get('last_name') or '', password=r['password_hash'],
+                              is_active=parse_bool(r.get('is_active'))) for r in new_rows]
+                # ignore_conflicts bỏ qua cả username vừa được tạo đồng thời: đếm số dòng thực sự được chèn
+                usernames = [u.username for u in users]
+                with transaction.atomic():
+                    before = User.objects.filter(username__in=usernames).count()
+                    User.objects.bulk_create(users, ignore_conflicts=True)
+                    inserted = User.objects.filter(username__in=usernames).count() - before
+                self.skipped += len(users) - inserted
+                created += inserted
+                self.progress(created)
+        return created
+
+    def valid_user(self, row):
+        if not (row.get('username') or '').strip():
+            self.skip(row, 'username is required')
+            return False
+        row['username'] = row['username'].strip()
+        return True
+
+    def import_posts(self, rows, batch_size):
+        # Tên danh mục, hashtag và tác giả được tra một lần rồi giữ trong bộ nhớ cho cả lần nhập
+        categories = {}
+        for pk, name in Category.objects.order_by('-pk').values_list('pk', 'name'):
+            categories[name.strip().lower()] = pk
+        hashtags = {}
+        authors = {}
+
+        created = 0
+        created_category = False
+        for chunk in chunked(rows, batch_size):
+            usernames = {str(r.get('username') or '').strip() for r in chunk} - set(authors)
+            if usernames:
+                authors.update(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+
+            missing_categories = {}
+            for row in chunk:
+                name = str(row.get('category') or '').strip()
+                if name and name.lower() not in categories:
+                    missing_categories.setdefault(name.lower(), name)
+            if missing_categories:
+                Category.objects.bulk_create([Category(name=n) for n in missing_categories.values()])
+                categories.update((name.strip().lower(), pk) for pk, name in Category.objects.filter(
+                    name__in=missing_categories.values()).values_list('pk', 'name'))
+                created_category = True
+
+            posts, post_tags = [], []
+            for row in chunk:
+                user_id = authors.get(str(row.get('username') or '').strip())
+                content = row.get('content') or ''
+                if user_id is None:
+                    self.skip(row, 'unknown username')
+                    continue
+                if not content.strip():
+                    self.skip(row, 'content is required')
+                    continue
+                category = str(row.get('category') or '').strip().lower()
+                posts.append(Post(user_id=user_id, title=row.get('title') or None, content=content,
+                                  category_id=categories.get(category), active=parse_bool(row.get('active'))))
+                post_tags.append(parse_hashtags(row.get('hashtags')))
+
+            names = {n for tags in post_tags for n in tags} - set(hashtags)
+            if names:
+                hashtags.update((h.name, h.pk) for h in resolve_hashtags(names))
+
+            for _ in range(PK_ATTEMPTS):
+                try:
+                    with transaction.atomic():
+                        self.insert_posts(posts, post_tags, hashtags)
+                    break
+                except UnmatchedPosts:
+                    # Cả lô đã được rollback, nhập lại từ đầu
+                    for post in posts:
+                        post.pk = None
+            else:
+                raise CommandError('Could not read back the ids of imported posts after %d attempts; %d posts were '
+                                   'imported before this batch' % (PK_ATTEMPTS, created))
+            created += len(posts)
+            self.progress(created)
+
+        if created:
+            StatsDirtyDay.objects.mark(timezone.now().date())
+            invalidate('posts', 'stats', *(['categories'] if created_category else []))
+        return created
+
+    def insert_posts(self, posts, post_tags, hashtags):
+        if not posts:
+            return
+        max_before = Post.objects.aggregate(m=Max('pk'))['m'] or 0
+        Post.objects.bulk_create(posts)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            self.assign_pks(posts, max_before)
+
+        Through = Post.hashtag.through
+        links, names_by_post = [], {}
+        for post, tags in zip(posts, post_tags):
+            names_by_post[post.pk] = tags
+            links += [Through(post_id=post.pk, hashtag_id=hashtags[n]) for n in tags if n in hashtags]
+        Through.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+        PostStatistics.objects.bulk_create([PostStatistics(post_id=p.pk) for p in posts], ignore_conflicts=True)
+        # Không ghi HashtagUsage: dữ liệu nhập vào không phải xu hướng hiện tại
+        index_new_posts(posts, names_by_post)
+
+    def assign_pks(self, posts, max_before):
+        # MySQL không trả id sau bulk_create: đọc lại các dòng vừa chèn (id > max trước đó) và ghép theo thứ tự.
+        # Bài viết ghi đồng thời cũng có id > max trước đó: nếu số dòng của một khoá ghép khác số bài của lô thì
+        # không biết dòng nào là của lô, báo lỗi để rollback cả lô thay vì ghép nhầm hoặc để bài không có id
+        pending = defaultdict(list)
+        for post in posts:
+            pending[(post.user_id, post.title, post.content)].append(post)
+        found = defaultdict(list)
+        inserted = Post.objects.filter(pk__gt=max_before, user_id__in={p.user_id for p in posts}) \
+            .order_by('pk').values_list('pk', 'user_id', 'title', 'content')
+        for pk, user_id, title, content in inserted.iterator():
+            if (user_id, title, content) in pending:
+                found[(user_id, title, content)].append(pk)
+        for key, batch in pending.items():
+            if len(found[key]) != len(batch):
+                raise UnmatchedPosts()
+            for post, pk in zip(batch, found[key]):
+                post.pk = pk
+
+    def progress(self, count):
+        if self.verbosity >= 2:
+            self.stderr.write('%d rows imported' % count)
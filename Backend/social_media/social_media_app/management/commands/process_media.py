@@ -0,0 +1,48 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from social_media_app.media import incoming_dir, process_media
+from social_media_app.models import MediaFile
+
+
+class Command(BaseCommand):
+    help = 'Process media uploads the worker pool never finished (process restart, crash) and optionally retry failures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=10,
+                            help='Treat uploads stuck in "processing" for longer than this as abandoned.')
+        parser.add_argument('--retry-failed', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        reset = MediaFile.objects.filter(status=MediaFile.STATUS_PROCESSING, updated_at__lt=cutoff) \
+            .update(status=MediaFile.STATUS_PENDING)
+        if options['retry_failed']:
+            reset += MediaFile.objects.filter(status=MediaFile.STATUS_FAILED).update(status=MediaFile.STATUS_PENDING)
+
+        last_pk = 0
+        ready = failed = missing = 0
+        while True:
+            batch = list(MediaFile.objects.filter(pk__gt=last_pk, status=MediaFile.STATUS_PENDING)
+                         .order_by('pk').values_list('pk', 'original')[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            for pk, original in batch:
+                if not os.path.exists(os.path.join(incoming_dir(), original)):
+                    # Ảnh gốc đã mất (thư mục tạm bị dọn): không thể xử lý lại
+                    missing += MediaFile.objects.filter(pk=pk, status=MediaFile.STATUS_PENDING).update(
+                        status=MediaFile.STATUS_FAILED, error='Original upload is missing')
+                    continue
+                if process_media(pk) is not None:
+                    ready += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(self.style.SUCCESS('%d uploads requeued, %d processed, %d failed, %d missing originals' % (
+            reset, ready, failed, missing)))
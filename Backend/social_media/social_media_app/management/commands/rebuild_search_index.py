@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from social_media_app.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the post search index (SearchDocument/SearchPosting) from posts, hashtags and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('%d posts indexed' % indexed))
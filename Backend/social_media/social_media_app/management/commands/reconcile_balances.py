@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from social_media_app.ledger import post_transaction
+from social_media_app.models import LedgerEntry, Transaction, User, UserBalance
+
+ZERO = Decimal('0.00')
+
+
+class Command(BaseCommand):
+    help = 'Check UserBalance snapshots against the ledger in chunks and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Post completed transactions that have no ledger entries yet (created before the ledger).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if options['backfill']:
+            posted = self.backfill(batch_size, dry_run)
+            self.stdout.write('%d transactions posted to the ledger%s' % (posted, ' (dry run)' if dry_run else ''))
+
+        fields = ['balance', 'total_sent', 'total_received']
+        last_pk = 0
+        scanned = created_total = fixed_total = 0
+        while True:
+            pks = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            scanned += len(pks)
+
+            with transaction.atomic():
+                # Khoá snapshot trước khi cộng sổ cái để không ghi đè giao dịch đang được ghi
+                existing = {b.user_id: b for b in UserBalance.objects.select_for_update().filter(user_id__in=pks)}
+                totals = LedgerEntry.objects.filter(user_id__in=pks).order_by().values('user_id').annotate(
+                    balance=Sum('amount'),
+                    sent=Sum('amount', filter=Q(amount__lt=0)),
+                    received=Sum('amount', filter=Q(amount__gt=0)),
+                )
+                real = {row['user_id']: {'balance': row['balance'] or ZERO, 'total_sent': -(row['sent'] or ZERO),
+                                         'total_received': row['received'] or ZERO} for row in totals}
+
+                to_create, to_update = [], []
+                for user_id in pks:
+                    expected = real.get(user_id)
+                    snapshot = existing.get(user_id)
+                    if snapshot is None:
+                        if expected is not None:
+                            to_create.append(UserBalance(user_id=user_id, **expected))
+                        continue
+                    expected = expected or dict.fromkeys(fields, ZERO)
+                    if any(getattr(snapshot, f) != expected[f] for f in fields):
+                        for f in fields:
+                            setattr(snapshot, f, expected[f])
+                        to_update.append(snapshot)
+
+                created_total += len(to_create)
+                fixed_total += len(to_update)
+                if not dry_run:
+                    UserBalance.objects.bulk_create(to_create, ignore_conflicts=True)
+                    UserBalance.objects.bulk_update(to_update, fields)
+
+        self.stdout.write(self.style.SUCCESS(
+            '%d users scanned, %d balance rows created, %d rows corrected%s' % (
+                scanned, created_total, fixed_total, ' (dry run)' if dry_run else '')))
+
+    def backfill(self, batch_size, dry_run):
+        posted = 0
+        last_pk = 0
+        while True:
+            batch = list(Transaction.objects.filter(pk__gt=last_pk, status=Transaction.STATUS_COMPLETED)
+                         .exclude(sender_id=F('receiver_id')).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            missing = set(t.pk for t in batch) - set(
+                LedgerEntry.objects.filter(transaction_id__in=[t.pk for t in batch])
+                .values_list('transaction_id', flat=True))
+            for tx in batch:
+                if tx.pk in missing:
+                    posted += 1
+                    if not dry_run:
+                        post_transaction(tx, tx.created_at)
+        return posted
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from social_media_app.models import Comment, Like, Post, PostStatistics, Report
+from social_media_app.moderation import get_moderation_setting
+
+
+def count_subquery(model, **filters):
+    # Mỗi bộ đếm là một subquery riêng để tránh nhân dòng khi join like x comment
+    rows = model.objects.filter(post=OuterRef('pk'), **filters).order_by() \
+        .values('post').annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def report_score_subquery():
+    weights = get_moderation_setting('REASON_WEIGHTS')
+    weight = Case(*[When(reason=reason, then=Value(w)) for reason, w in weights.items()], default=Value(1),
+                  output_field=IntegerField())
+    rows = Report.objects.filter(post=OuterRef('pk'), active=True).order_by() \
+        .values('post').annotate(total=Sum(weight)).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = 'Recompute PostStatistics counters and report scores from Like, Comment and Report rows and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        fields = ['like_count', 'comment_count', 'report_count', 'report_score']
+
+        posts = Post.objects.order_by('pk').annotate(
+            real_like_count=count_subquery(Like, active=True),
+            real_comment_count=count_subquery(Comment, active=True),
+            real_report_count=count_subquery(Report, active=True),
+            real_report_score=report_score_subquery(),
+        )
+
+        last_pk = 0
+        created_total = fixed_total = scanned = 0
+        while True:
+            pks = list(Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            scanned += len(pks)
+
+            with transaction.atomic():
+                # Khoá các dòng thống kê trước khi đếm để không ghi đè các lượt tăng/giảm đang diễn ra
+                existing = {s.post_id: s for s in PostStatistics.objects.select_for_update().filter(post_id__in=pks)}
+                to_create, to_update = [], []
+                for post in posts.filter(pk__in=pks):
+                    real = {f: getattr(post, 'real_%s' % f) for f in fields}
+                    stats = existing.get(post.pk)
+                    if stats is None:
+                        to_create.append(PostStatistics(post=post, **real))
+                    elif any(getattr(stats, f) != real[f] for f in fields):
+                        for f in fields:
+                            setattr(stats, f, real[f])
+                        to_update.append(stats)
+
+                created_total += len(to_create)
+                fixed_total += len(to_update)
+                if not dry_run:
+                    PostStatistics.objects.bulk_create(to_create, ignore_conflicts=True)
+                    PostStatistics.objects.bulk_update(to_update, fields)
+
+        self.stdout.write(self.style.SUCCESS(
+            '%d posts scanned, %d statistics rows created, %d rows corrected%s' % (
+                scanned, created_total, fixed_total, ' (dry run)' if dry_run else '')))
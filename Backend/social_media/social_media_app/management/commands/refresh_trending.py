@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from social_media_app.trending import prune_hashtag_usage, refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the TrendingHashtag top-K table from hourly HashtagUsage buckets (schedule it periodically).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=int)
+        parser.add_argument('--half-life-hours', type=float)
+        parser.add_argument('--top-k', type=int)
+        parser.add_argument('--prune', action='store_true', help='Delete usage buckets older than the window.')
+
+    def handle(self, *args, **options):
+        trending = refresh_trending(window_hours=options['window_hours'],
+                                    half_life_hours=options['half_life_hours'],
+                                    top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS('%d trending rows written' % len(trending)))
+
+        if options['prune']:
+            pruned = prune_hashtag_usage(window_hours=options['window_hours'])
+            self.stdout.write('%d expired usage buckets deleted' % pruned)
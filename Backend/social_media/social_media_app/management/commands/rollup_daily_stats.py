@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+from social_media_app.caching import bump
+from social_media_app.models import DailyPostStats, Post, StatsDirtyDay
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DailyPostStats rows for the days marked dirty since the last run (schedule it, e.g. every 5 minutes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=31, help='Number of days recomputed per transaction.')
+        parser.add_argument('--all', action='store_true', help='Mark every day that has posts as dirty first.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['all']:
+            dates = Post.objects.order_by().values_list('created_date', flat=True).distinct()
+            StatsDirtyDay.objects.mark(*dates)
+
+        days_total = rows_total = 0
+        while True:
+            with transaction.atomic():
+                dirty = list(StatsDirtyDay.objects.select_for_update().order_by('date')[:batch_size])
+                if not dirty:
+                    break
+                days = [d.date for d in dirty]
+                # Xoá dấu trước khi tính: thay đổi mới xảy ra trong lúc tính sẽ đánh dấu lại cho lần chạy sau
+                StatsDirtyDay.objects.filter(pk__in=[d.pk for d in dirty]).delete()
+
+                rows = Post.objects.filter(active=True, created_date__in=days) \
+                    .values('created_date', 'category').order_by() \
+                    .annotate(post_count=Count('id'),
+                              like_count=Coalesce(Sum('statistics__like_count'), 0),
+                              comment_count=Coalesce(Sum('statistics__comment_count'), 0))
+
+                DailyPostStats.objects.filter(date__in=days).delete()
+                created = DailyPostStats.objects.bulk_create([
+                    DailyPostStats(date=r['created_date'], category_id=r['category'], post_count=r['post_count'],
+                                   like_count=r['like_count'], comment_count=r['comment_count'])
+                    for r in rows
+                ])
+
+            days_total += len(days)
+            rows_total += len(created)
+
+        if days_total:
+            bump('stats')
+        self.stdout.write(self.style.SUCCESS('%d dirty days rebuilt into %d rollup rows' % (days_total, rows_total)))
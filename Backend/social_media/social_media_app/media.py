@@ -0,0 +1,455 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, close_old_connections, transaction
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps, features
+
+from .caching import invalidate
+from .models import MediaFile, MediaVariant, UploadSession, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'STORAGE': 'social_media_app.media.LocalMediaStorage',
+    'INCOMING_DIR': None,
+    'MAX_UPLOAD_SIZE': 10 * 1024 * 1024,
+    'MAX_PIXELS': 40_000_000,
+    'ACCEPTED_FORMATS': ['JPEG', 'PNG', 'WEBP', 'GIF'],
+    'VARIANTS': {
+        MediaFile.KIND_AVATAR: {'thumb': 64, 'small': 160, 'medium': 320},
+        MediaFile.KIND_POST: {'thumb': 320, 'medium': 960, 'large': 1600},
+    },
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 80,
+    'CHUNK_SIZE': 1024 * 1024,
+    'SESSION_TTL_HOURS': 24,
+    'MAX_POST_IMAGES': 10,
+    'SENDFILE_BACKEND': 'django',
+    'SENDFILE_PREFIX': '/protected-media/',
+    'CACHE_MAX_AGE': 365 * 24 * 3600,
+}
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+class MediaError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class UploadConflict(MediaError):
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def get_media_setting(name):
+    return getattr(settings, 'MEDIA_PIPELINE', {}).get(name, DEFAULTS[name])
+
+
+def incoming_dir():
+    return get_media_setting('INCOMING_DIR') or os.path.join(tempfile.gettempdir(), 'social_media_incoming')
+
+
+def output_formats():
+    # Pillow không có libwebp thì chỉ xuất JPEG
+    return [fmt for fmt in get_media_setting('FORMATS') if fmt != 'webp' or features.check('webp')]
+
+
+def media_key(kind, media_id, sha256=None):
+    # Ảnh bài viết nằm theo mã băm nội dung nên ảnh trùng dùng chung một bộ biến thể
+    if sha256:
+        return 'blobs/%s/%s' % (sha256[:2], sha256)
+    return '%ss/%d' % (kind, media_id)
+
+
+def variant_name(key, name, fmt):
+    return '%s/%s.%s' % (key, name, EXTENSIONS[fmt])
+
+
+class LocalMediaStorage:
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+
+    def save(self, name, path):
+        target = self.storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        file_move_safe(path, target, allow_overwrite=True)
+        return self.url(name)
+
+    def url(self, name):
+        return self.storage.url(name)
+
+    def delete(self, name):
+        self.storage.delete(name)
+
+
+class CloudinaryMediaStorage:
+    # Biến thể đã được resize sẵn nên Cloudinary chỉ lưu và phục vụ, không cần transformation
+    def save(self, name, path):
+        import cloudinary.uploader
+
+        public_id, ext = os.path.splitext(name)
+        result = cloudinary.uploader.upload(path, public_id=public_id, format=ext[1:], overwrite=True,
+                                            invalidate=True, resource_type='image')
+        os.remove(path)
+        return result['secure_url']
+
+    def url(self, name):
+        from cloudinary.utils import cloudinary_url
+
+        public_id, ext = os.path.splitext(name)
+        return cloudinary_url(public_id, format=ext[1:], secure=True)[0]
+
+    def delete(self, name):
+        import cloudinary.uploader
+
+        cloudinary.uploader.destroy(os.path.splitext(name)[0], invalidate=True)
+
+
+def get_media_storage():
+    return import_string(get_media_setting('STORAGE'))()
+
+
+def check_upload(upload):
+    # Chỉ đọc header ảnh (Image.open là lazy), việc giải mã để dành cho worker
+    if upload.size > get_media_setting('MAX_UPLOAD_SIZE'):
+        raise MediaError('Image must be at most %d bytes' % get_media_setting('MAX_UPLOAD_SIZE'))
+    try:
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except Exception:
+        raise MediaError('Upload a valid image')
+    finally:
+        upload.seek(0)
+    if image_format not in get_media_setting('ACCEPTED_FORMATS'):
+        raise MediaError('Unsupported image format %s' % image_format)
+    if width * height > get_media_setting('MAX_PIXELS'):
+        raise MediaError('Image is too large (%dx%d)' % (width, height))
+
+
+def accept_upload(owner, upload, kind):
+    # Chuyển file tạm (TemporaryFileUploadHandler) sang thư mục incoming bằng rename, không đọc lại nội dung
+    os.makedirs(incoming_dir(), exist_ok=True)
+    name = uuid.uuid4().hex
+    path = os.path.join(incoming_dir(), name)
+    if hasattr(upload, 'temporary_file_path'):
+        file_move_safe(upload.temporary_file_path(), path)
+        upload.close()  # TemporaryUploadedFile.close() bỏ qua việc file tạm đã bị chuyển đi
+    else:
+        with open(path, 'wb') as out:
+            for chunk in upload.chunks():
+                out.write(chunk)
+
+    media = MediaFile.objects.create(owner=owner, kind=kind, original=name)
+    transaction.on_commit(lambda: submit(media.pk))
+    return media
+
+
+def submit(media_id):
+    if not get_media_setting('ASYNC'):
+        return process_media(media_id)
+    get_media_pool().submit(run_job, media_id)
+
+
+def run_job(media_id):
+    close_old_connections()
+    try:
+        process_media(media_id)
+    except Exception:
+        logger.exception('Processing media %s failed', media_id)
+    finally:
+        close_old_connections()
+
+
+def render_variants(media, storage):
+    sizes = get_media_setting('VARIANTS').get(media.kind, {})
+    key = media_key(media.kind, media.pk, media.sha256)
+    quality = get_media_setting('QUALITY')
+    variants = []
+    with Image.open(os.path.join(incoming_dir(), media.original)) as source:
+        width, height = source.size
+        source.draft('RGB', (max(sizes.values()) * 2,) * 2)  # JPEG: giải mã ở độ phân giải thấp hơn cho nhanh
+        image = ImageOps.exif_transpose(source)
+        transparent = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+        for name, size in sizes.items():
+            if media.kind == MediaFile.KIND_AVATAR:
+                side = min(size, image.width, image.height)
+                resized = ImageOps.fit(image, (side, side), Image.LANCZOS)
+            else:
+                # Giữ tỉ lệ ảnh, không phóng to ảnh nhỏ hơn khung
+                resized = ImageOps.contain(image, (min(size, image.width), min(size, image.height)), Image.LANCZOS)
+            for fmt in output_formats():
+                out = resized if fmt == 'webp' else resized.convert('RGB')
+                fd, path = tempfile.mkstemp(suffix='.' + EXTENSIONS[fmt], dir=incoming_dir())
+                try:
+                    with os.fdopen(fd, 'wb') as tmp:
+                        out.save(tmp, fmt.upper(), quality=quality, optimize=fmt == 'jpeg')
+                    size_bytes = os.path.getsize(path)
+                    url = storage.save(variant_name(key, name, fmt), path)
+                finally:
+                    if os.path.exists(path):
+                        os.remove(path)
+                variants.append(MediaVariant(media=media, name=name, format=fmt, width=out.width,
+                                             height=out.height, size=size_bytes, url=url))
+    return variants, width, height
+
+
+def process_media(media_id):
+    # UPDATE có điều kiện: lệnh process_media chạy lại cùng lúc với pool cũng chỉ một bên xử lý
+    if not MediaFile.objects.filter(pk=media_id, status=MediaFile.STATUS_PENDING) \
+            .update(status=MediaFile.STATUS_PROCESSING):
+        return None
+
+    media = MediaFile.objects.get(pk=media_id)
+    try:
+        variants, media.width, media.height = render_variants(media, get_media_storage())
+    except Exception as e:
+        logger.exception('Rendering variants for media %s failed', media_id)
+        MediaFile.objects.filter(pk=media_id).update(status=MediaFile.STATUS_FAILED, error=str(e)[:255])
+        return None
+
+    with transaction.atomic():
+        MediaVariant.objects.filter(media=media).delete()
+        MediaVariant.objects.bulk_create(variants)
+        media.status = MediaFile.STATUS_READY
+        media.error = ''
+        media.save(update_fields=['status', 'error', 'width', 'height', 'updated_at'])
+        if media.kind == MediaFile.KIND_AVATAR:
+            User.objects.filter(pk=media.owner_id).update(avatar_media=media)
+            invalidate('avatars')  # Danh sách comment đã cache có nhúng avatar của tác giả
+
+    try:
+        os.remove(os.path.join(incoming_dir(), media.original))
+    except FileNotFoundError:
+        pass
+    return media
+
+
+def best_variant_url(key, kind, size, request=None):
+    # Biến thể nhỏ nhất không nhỏ hơn kích thước cần hiển thị, định dạng đầu tiên trong FORMATS (WebP)
+    sizes = get_media_setting('VARIANTS').get(kind, {})
+    if not sizes:
+        return None
+    fitting = [name for name, side in sorted(sizes.items(), key=lambda item: item[1]) if side >= size]
+    name = fitting[0] if fitting else max(sizes, key=sizes.get)
+    url = get_media_storage().url(variant_name(key, name, output_formats()[0]))
+    if request is not None and url.startswith('/'):
+        return request.build_absolute_uri(url)
+    return url
+
+
+def avatar_url(user, size, request=None):
+    if user.avatar_media_id:
+        return best_variant_url(media_key(MediaFile.KIND_AVATAR, user.avatar_media_id), MediaFile.KIND_AVATAR, size,
+                                request)
+    if user.avatar:
+        return user.avatar.url  # Ảnh cũ trên Cloudinary
+    return None
+
+
+def image_data(media, request=None):
+    ready = media.status == MediaFile.STATUS_READY
+    key = media_key(media.kind, media.pk, media.sha256)
+    return {
+        'id': media.pk,
+        'status': media.status,
+        'width': media.width,
+        'height': media.height,
+        'thumbnail': best_variant_url(key, media.kind, 320, request) if ready else None,
+        'url': best_variant_url(key, media.kind, 960, request) if ready else None,
+    }
+
+
+def session_path(session):
+    return os.path.join(incoming_dir(), '%s.part' % session.pk.hex)
+
+
+def open_session(owner, size):
+    if size <= 0 or size > get_media_setting('MAX_UPLOAD_SIZE'):
+        raise MediaError('size must be between 1 and %d bytes' % get_media_setting('MAX_UPLOAD_SIZE'))
+    expires_at = timezone.now() + timedelta(hours=get_media_setting('SESSION_TTL_HOURS'))
+    return UploadSession.objects.create(owner=owner, size=size, expires_at=expires_at)
+
+
+def parse_content_range(header, size):
+    match = CONTENT_RANGE.match(header or '')
+    if match is None:
+        raise MediaError('Content-Range must look like "bytes start-end/total"')
+    start, end, total = (int(g) for g in match.groups())
+    if total != size or end < start or end >= size:
+        raise MediaError('Content-Range does not fit an upload of %d bytes' % size)
+    if end - start + 1 > get_media_setting('CHUNK_SIZE'):
+        raise MediaError('Chunks must be at most %d bytes' % get_media_setting('CHUNK_SIZE'))
+    return start, end - start + 1
+
+
+def write_chunk(session, offset, length, stream):
+    # Trả về MediaFile khi đã nhận đủ byte, None nếu còn thiếu
+    check_offset(session, offset)
+    os.makedirs(incoming_dir(), exist_ok=True)
+    # Nhận cả đoạn vào file tạm trước, không giữ khoá trong lúc client gửi chậm
+    with tempfile.TemporaryFile(dir=incoming_dir()) as chunk:
+        written = 0
+        while written < length:
+            block = stream.read(min(64 * 1024, length - written))
+            if not block:
+                break
+            chunk.write(block)
+            written += len(block)
+        if written < length:
+            raise UploadConflict('Chunk ended after %d of %d bytes, resend it' % (written, length), session.received)
+        chunk.seek(0)
+
+        # Khoá dòng phiên: kiểm tra offset, ghi file và cập nhật received là một bước, hai lần gửi cùng đoạn
+        # (hoặc một lần gửi lại cũ) không ghi đè lên nhau
+        lost = False
+        with transaction.atomic():
+            locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+            session.received, session.media_id = locked.received, locked.media_id
+            check_offset(session, offset)
+            path = session_path(session)
+            if offset and not os.path.exists(path):
+                # Phần đã nhận bị mất (thư mục tạm bị dọn): yêu cầu client gửi lại từ đầu
+                UploadSession.objects.filter(pk=session.pk).update(received=0)
+                session.received, lost = 0, True
+            else:
+                with open(path, 'r+b' if offset else 'wb') as out:
+                    if os.fstat(out.fileno()).st_size > offset:
+                        out.truncate(offset)  # Byte của một lần ghi trước không kịp cập nhật received
+                    out.seek(offset)
+                    shutil.copyfileobj(chunk, out)
+                UploadSession.objects.filter(pk=session.pk).update(received=offset + length)
+                session.received = offset + length
+        if lost:
+            raise UploadConflict('Received bytes were lost, restart from byte 0', 0)
+
+    if session.received == session.size:
+        return complete_session(session)
+    return None
+
+
+def check_offset(session, offset):
+    if session.media_id is not None:
+        raise UploadConflict('Upload is already complete', session.received)
+    if offset != session.received:
+        raise UploadConflict('Expected a chunk starting at byte %d' % session.received, session.received)
+
+
+def complete_session(session):
+    path = session_path(session)
+    if os.path.getsize(path) != session.size:
+        # Không khớp với số byte đã ghi nhận: không băm một file hỏng, bắt đầu lại
+        UploadSession.objects.filter(pk=session.pk).update(received=0)
+        session.received = 0
+        os.remove(path)
+        raise UploadConflict('Received bytes do not match the upload, restart from byte 0', 0)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+        try:
+            check_upload(File(f))
+        except MediaError:
+            session.delete()
+            os.remove(path)
+            raise
+    sha256 = digest.hexdigest()
+
+    media = MediaFile.objects.filter(sha256=sha256).first()
+    # Blob cũ được dùng lại: làm mới updated_at để cleanup_media không xoá nó trước khi được gắn vào bài viết
+    if media is not None and not MediaFile.objects.filter(pk=media.pk).update(updated_at=timezone.now()):
+        media = None  # cleanup_media vừa xoá blob này
+    if media is None:
+        name = '%s.%s' % (sha256, session.pk.hex)
+        os.replace(path, os.path.join(incoming_dir(), name))
+        try:
+            with transaction.atomic():
+                media = MediaFile.objects.create(owner=session.owner, kind=MediaFile.KIND_POST, sha256=sha256,
+                                                 original=name)
+        except IntegrityError:
+            # Một phiên khác vừa hoàn tất cùng nội dung
+            media = MediaFile.objects.get(sha256=sha256)
+            os.remove(os.path.join(incoming_dir(), name))
+        else:
+            transaction.on_commit(lambda: submit(media.pk))
+    elif media.status == MediaFile.STATUS_FAILED:
+        # Lần xử lý trước bị lỗi (vd. storage tạm thời hỏng): xử lý lại bằng file vừa nhận thay vì gắn ảnh lỗi
+        name = '%s.%s' % (sha256, session.pk.hex)
+        os.replace(path, os.path.join(incoming_dir(), name))
+        if MediaFile.objects.filter(pk=media.pk, status=MediaFile.STATUS_FAILED).update(
+                status=MediaFile.STATUS_PENDING, original=name, error='', updated_at=timezone.now()):
+            try:
+                os.remove(os.path.join(incoming_dir(), media.original))
+            except FileNotFoundError:
+                pass
+            media.status, media.original, media.error = MediaFile.STATUS_PENDING, name, ''
+            transaction.on_commit(lambda: submit(media.pk))
+        else:
+            os.remove(os.path.join(incoming_dir(), name))  # Phiên khác vừa đưa ảnh này vào hàng đợi
+            media.refresh_from_db()
+    else:
+        os.remove(path)  # Ảnh đã có: chỉ ghi nhận quyền sở hữu của phiên này, không lưu thêm bản nào
+
+    UploadSession.objects.filter(pk=session.pk).update(media=media)
+    session.media = media
+    return media
+
+
+def media_response(name):
+    # Django chỉ kiểm tra đường dẫn và gắn header; nginx/Apache gửi file bằng sendfile, không đi qua Python
+    try:
+        path = FileSystemStorage(location=settings.MEDIA_ROOT).path(name)
+    except Exception:
+        raise Http404
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    backend = get_media_setting('SENDFILE_BACKEND')
+    if backend == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = get_media_setting('SENDFILE_PREFIX') + quote(name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        if not os.path.isfile(path):
+            raise Http404
+        response = FileResponse(open(path, 'rb'), content_type=content_type)  # wsgi.file_wrapper nếu server hỗ trợ
+    # Tên file gắn với nội dung (mã băm hoặc id không dùng lại) nên có thể cache vĩnh viễn
+    response['Cache-Control'] = 'public, max-age=%d, immutable' % get_media_setting('CACHE_MAX_AGE')
+    return response
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_media_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=get_media_setting('WORKERS'), thread_name_prefix='media')
+    return _pool
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0010_delete_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['active', '-created_date', '-id'], name='post_feed_keyset_idx'),
+        ),
+    ]
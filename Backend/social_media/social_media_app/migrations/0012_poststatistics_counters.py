@@ -0,0 +1,36 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0011_post_feed_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='poststatistics',
+            name='comment_count',
+        ),
+        migrations.RemoveField(
+            model_name='poststatistics',
+            name='like_count',
+        ),
+        migrations.AddField(
+            model_name='poststatistics',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='poststatistics',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='poststatistics',
+            name='report_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
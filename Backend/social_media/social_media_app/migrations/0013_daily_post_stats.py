@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0012_poststatistics_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPostStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='social_media_app.category')),
+            ],
+            options={
+                'unique_together': {('date', 'category')},
+            },
+        ),
+    ]
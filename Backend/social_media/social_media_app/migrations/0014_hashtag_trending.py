@@ -0,0 +1,44 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0013_daily_post_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('usage_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trending_hashtags', to='social_media_app.category')),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='social_media_app.hashtag')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['category', 'rank'], name='trending_category_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HashtagUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hashtag_usages', to='social_media_app.category')),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='social_media_app.hashtag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='hashtag_usage_bucket_idx')],
+                'unique_together': {('hashtag', 'category', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0014_hashtag_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='social_media_app.post')),
+                ('post_length', models.PositiveIntegerField(default=0)),
+                ('comment_length', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('source', models.CharField(choices=[('p', 'Post'), ('c', 'Comment')], max_length=1)),
+                ('tf', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='social_media_app.post')),
+            ],
+            options={
+                'unique_together': {('term', 'post', 'source')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0015_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_date', 'id'], name='comment_post_keyset_idx'),
+        ),
+    ]
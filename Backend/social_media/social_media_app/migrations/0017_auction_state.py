@@ -0,0 +1,49 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0016_comment_post_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateField(auto_now_add=True, null=True)),
+                ('updated_date', models.DateField(auto_now=True, null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('open', 'Đang đấu giá'), ('closed', 'Đã kết thúc')], default='open', max_length=10)),
+                ('starting_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('min_increment', models.DecimalField(decimal_places=2, default=1, max_digits=10)),
+                ('current_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('opens_at', models.DateTimeField()),
+                ('closes_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['post', '-bid_price'], name='auction_post_bid_idx'),
+        ),
+        migrations.AddField(
+            model_name='auctionstate',
+            name='leader',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_auctions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='auctionstate',
+            name='post',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='auction_state', to='social_media_app.post'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0017_auction_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='auction',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='settlement', to='social_media_app.auctionstate'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Chờ thanh toán'), ('completed', 'Đã thanh toán')], default='completed', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='auctionstate',
+            index=models.Index(fields=['status', 'closes_at'], name='auction_state_due_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import F
+
+
+def backfill_ledger(apps, schema_editor):
+    # Giao dịch có trước sổ cái (0018 đánh dấu là completed) được ghi sổ ngay, để số dư đúng sau khi migrate
+    Transaction = apps.get_model('social_media_app', 'Transaction')
+    LedgerEntry = apps.get_model('social_media_app', 'LedgerEntry')
+    UserBalance = apps.get_model('social_media_app', 'UserBalance')
+    totals = defaultdict(lambda: {'balance': Decimal('0'), 'total_sent': Decimal('0'),
+                                  'total_received': Decimal('0')})
+    completed = Transaction.objects.filter(status='completed').exclude(sender_id=F('receiver_id')).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(completed.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        entries = []
+        for tx in batch:
+            entries += [
+                LedgerEntry(user_id=tx.sender_id, transaction_id=tx.pk, amount=-tx.amount, created_at=tx.created_at),
+                LedgerEntry(user_id=tx.receiver_id, transaction_id=tx.pk, amount=tx.amount, created_at=tx.created_at),
+            ]
+            totals[tx.sender_id]['balance'] -= tx.amount
+            totals[tx.sender_id]['total_sent'] += tx.amount
+            totals[tx.receiver_id]['balance'] += tx.amount
+            totals[tx.receiver_id]['total_received'] += tx.amount
+        LedgerEntry.objects.bulk_create(entries)
+    UserBalance.objects.bulk_create([UserBalance(user_id=user_id, **values) for user_id, values in totals.items()],
+                                    batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0018_auction_settlement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBalance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_sent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_received', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='social_media_app.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='ledger_user_created_idx')],
+                'unique_together': {('transaction', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.6 on 2026-10-17 21:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+import django.db.models.deletion
+
+
+def dedupe_reports(apps, schema_editor):
+    # Giữ báo cáo đầu tiên của mỗi cặp (user, post), xoá các bản trùng trước khi thêm ràng buộc unique
+    Report = apps.get_model('social_media_app', 'Report')
+    duplicates = Report.objects.values('user_id', 'post_id').annotate(n=Count('id'), keep=Min('id')) \
+        .filter(n__gt=1).order_by()
+    for row in duplicates.iterator():
+        Report.objects.filter(user_id=row['user_id'], post_id=row['post_id']).exclude(pk=row['keep']).delete()
+
+
+def fill_report_counts(apps, schema_editor):
+    Report = apps.get_model('social_media_app', 'Report')
+    PostReportCount = apps.get_model('social_media_app', 'PostReportCount')
+    rows = Report.objects.filter(active=True).values('post_id', 'reason').annotate(n=Count('id')).order_by()
+    PostReportCount.objects.bulk_create([PostReportCount(post_id=r['post_id'], reason=r['reason'], count=r['n'])
+                                         for r in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0019_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostReportCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('inappropriate_language', 'Ngôn ngữ không phù hợp'), ('spam', 'Spam'), ('no_payment_after_auction', 'Người dùng đấu giá nhưng không thanh toán'), ('other', 'Lý do khác')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='poststatistics',
+            name='report_score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(dedupe_reports, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='report',
+            unique_together={('user', 'post')},
+        ),
+        migrations.AddIndex(
+            model_name='poststatistics',
+            index=models.Index(fields=['report_score', 'post'], name='stats_report_queue_idx'),
+        ),
+        migrations.AddField(
+            model_name='postreportcount',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_counts', to='social_media_app.post'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='postreportcount',
+            unique_together={('post', 'reason')},
+        ),
+        migrations.RunPython(fill_report_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.6 on 2026-10-17 21:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0023_media_pipeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='mediafile',
+            name='kind',
+            field=models.CharField(choices=[('avatar', 'Ảnh đại diện'), ('post', 'Ảnh bài viết')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+                ('media', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='social_media_app.mediafile')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'media'], name='upload_owner_media_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('media', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='attachments', to='social_media_app.mediafile')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='social_media_app.post')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'unique_together': {('post', 'media')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-17 21:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0024_post_images'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediafile',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_files', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
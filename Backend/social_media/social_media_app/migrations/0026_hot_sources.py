@@ -0,0 +1,25 @@
+# Generated by Django 4.2.6 on 2026-10-17 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0025_media_owner_set_null'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('c', 'Danh mục'), ('h', 'Hashtag'), ('u', 'Tác giả')], max_length=1)),
+                ('target_id', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'target_id')},
+            },
+        ),
+    ]
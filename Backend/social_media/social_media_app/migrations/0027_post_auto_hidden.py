@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-17 22:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0026_hot_sources'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='auto_hidden',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def copy_categories(apps, schema_editor):
+    HashtagUsage = apps.get_model('social_media_app', 'HashtagUsage')
+    HashtagUsage.objects.filter(category__isnull=False).update(category_key=F('category_id'))
+    # Gộp các dòng trùng (hashtag, bucket) không có danh mục vào dòng có id nhỏ nhất
+    duplicates = HashtagUsage.objects.filter(category_key=0).values('hashtag_id', 'bucket') \
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count')).filter(rows__gt=1)
+    for row in duplicates:
+        group = HashtagUsage.objects.filter(hashtag_id=row['hashtag_id'], bucket=row['bucket'], category_key=0)
+        group.exclude(pk=row['keep']).delete()
+        group.filter(pk=row['keep']).update(count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0027_post_auto_hidden'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='hashtagusage',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='hashtagusage',
+            name='category_key',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(copy_categories, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='hashtagusage',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='hashtagusage',
+            old_name='category_key',
+            new_name='category_id',
+        ),
+        migrations.AlterUniqueTogether(
+            name='hashtagusage',
+            unique_together={('hashtag', 'category_id', 'bucket')},
+        ),
+    ]
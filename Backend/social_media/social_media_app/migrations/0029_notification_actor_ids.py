@@ -0,0 +1,27 @@
+# Generated by Django 4.2.6 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+def fill_actor_ids(apps, schema_editor):
+    # Thông báo chưa đọc của một người: ghi lại người đó để lần tương tác sau không bị đếm thêm
+    Notification = apps.get_model('social_media_app', 'Notification')
+    unread = Notification.objects.filter(read=False, actor_count=1, actor__isnull=False).only('actor_id')
+    for notification in unread.iterator():
+        notification.actor_ids = [notification.actor_id]
+        notification.save(update_fields=['actor_ids'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_media_app', '0028_hashtag_usage_category_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(fill_actor_ids, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,16 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
+from django.db.models import Exists, F, OuterRef
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from cloudinary.models import CloudinaryField
 
 
 class User(AbstractUser):
-    avatar = CloudinaryField('avatar', null=True)
+    avatar = CloudinaryField('avatar', null=True)  # Ảnh đại diện cũ, tải lên Cloudinary ngay trong request
+    # Chỉ được gán khi các biến thể đã xử lý xong; URL suy ra từ id nên serialize không cần join
+    avatar_media = models.ForeignKey('MediaFile', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
 
 class BaseModel(models.Model):
@@ -30,12 +36,74 @@ class Hashtag(BaseModel):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def with_details(self, user=None):
+        # Gom các truy vấn phụ của PostSerializer: thống kê (JOIN), hashtag và ảnh (mỗi loại 1 truy vấn), liked (subquery)
+        queryset = self.select_related('statistics').prefetch_related(
+            'hashtag', models.Prefetch('images', queryset=PostImage.objects.select_related('media')))
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(liked=Exists(
+                Like.objects.filter(post=OuterRef('pk'), user=user, active=True)))
+        return queryset
+
+
 class Post(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts_user')
     title = models.CharField(max_length=255, null=True)
     content = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.RESTRICT, related_name='posts', null=True)
     hashtag = models.ManyToManyField(Hashtag)
+    auto_hidden = models.BooleanField(default=False)  # Bị ẩn tự động vì báo cáo; chỉ bài này mới được 'restore'
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['active', '-created_date', '-id'], name='post_feed_keyset_idx'),
+        ]
+
+
+class UserInterest(models.Model):
+    # Mức quan tâm của người dùng tới một danh mục, hashtag hoặc tác giả, cộng dồn từ like/comment/bài viết
+    KIND_CATEGORY = 'c'
+    KIND_HASHTAG = 'h'
+    KIND_AUTHOR = 'u'
+    KIND_CHOICES = [
+        (KIND_CATEGORY, 'Danh mục'),
+        (KIND_HASHTAG, 'Hashtag'),
+        (KIND_AUTHOR, 'Tác giả'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='interests')
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    target_id = models.PositiveIntegerField()
+    score = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'kind', 'target_id')
+        indexes = [
+            models.Index(fields=['kind', 'target_id', 'score'], name='interest_audience_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    # Timeline dựng sẵn (fan-out khi ghi); unique (user, post) cũng là index cho truy vấn khoảng theo post_id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'post')
+
+
+class HotSource(models.Model):
+    # Nguồn có hơn FANOUT_LIMIT người quan tâm: bài của nó không fan-out khi ghi mà được đọc trực tiếp khi xem feed
+    kind = models.CharField(max_length=1, choices=UserInterest.KIND_CHOICES)
+    target_id = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('kind', 'target_id')
 
 
 class Interaction(BaseModel):
@@ -46,9 +114,21 @@ class Interaction(BaseModel):
         abstract = True
 
 
+class CommentQuerySet(models.QuerySet):
+    def with_author(self):
+        return self.select_related('user')
+
+
 class Comment(Interaction):
     content = models.CharField(max_length=255, null=False)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_date', 'id'], name='comment_post_keyset_idx'),
+        ]
+
 
 class Like(Interaction):
     active = models.BooleanField(default=True)
@@ -66,14 +146,165 @@ class Report(Interaction):
     ]
     reason = models.CharField(max_length=50, choices=REASON_CHOICES)
 
+    class Meta:
+        unique_together = ('user', 'post')  # Mỗi người chỉ báo cáo một bài viết một lần
+
     def __str__(self):
         return f"Báo cáo về bài viết {self.post} bởi người dùng {self.user}"
 
 
+class PostReportCount(models.Model):
+    # Bộ đếm báo cáo theo lý do cho từng bài viết, chỉ tính các báo cáo chưa được xử lý
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='report_counts')
+    reason = models.CharField(max_length=50, choices=Report.REASON_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'reason')
+
+
+class PostStatisticsManager(models.Manager):
+    # Các bộ đếm được DailyPostStats tổng hợp; report_count, report_score đổi thì không cần tính lại ngày
+    ROLLUP_FIELDS = ('like_count', 'comment_count')
+
+    def increment(self, post, field, delta=1):
+        # Cập nhật nguyên tử bằng F(), không đọc-sửa-ghi trong Python
+        post_id = getattr(post, 'pk', post)
+        queryset = self.filter(post_id=post_id)
+        if delta < 0:
+            queryset = queryset.filter(**{'%s__gte' % field: -delta})
+        updated = queryset.update(**{field: F(field) + delta})
+        if not updated and delta > 0:
+            stats, updated = self.get_or_create(post_id=post_id, defaults={field: delta})
+            if not updated:
+                updated = self.filter(pk=stats.pk).update(**{field: F(field) + delta})
+        if not updated or field not in self.ROLLUP_FIELDS:
+            return
+
+        created_date = getattr(post, 'created_date', None)
+        if created_date is None:
+            created_date = Post.objects.filter(pk=post_id).values_list('created_date', flat=True).first()
+        StatsDirtyDay.objects.mark(created_date)
+
+
 class PostStatistics(BaseModel):
     post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='statistics')
-    comment_count = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='post_comments')
-    like_count = models.ForeignKey(Like, on_delete=models.CASCADE, related_name='post_likes')
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    report_count = models.PositiveIntegerField(default=0)
+    report_score = models.PositiveIntegerField(default=0)  # Tổng trọng số theo lý do của các báo cáo chưa xử lý
+
+    objects = PostStatisticsManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['report_score', 'post'], name='stats_report_queue_idx'),
+        ]
+
+
+class DailyPostStats(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, related_name='daily_stats')
+    post_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'category')
+
+
+class StatsDirtyDayManager(models.Manager):
+    def mark(self, *dates):
+        # INSERT IGNORE: đánh dấu ngày cần tổng hợp lại, không đọc trước
+        dates = {d for d in dates if d is not None}
+        if dates:
+            self.bulk_create([self.model(date=d) for d in dates], ignore_conflicts=True)
+
+
+class StatsDirtyDay(models.Model):
+    date = models.DateField(unique=True)
+
+    objects = StatsDirtyDayManager()
+
+
+class HashtagUsage(models.Model):
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='usages')
+    # 0 là bài viết không có danh mục: unique_together không chặn trùng khi cột là NULL nên không dùng FK null
+    category_id = models.PositiveIntegerField(default=0)
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hashtag', 'category_id', 'bucket')
+        indexes = [
+            models.Index(fields=['bucket'], name='hashtag_usage_bucket_idx'),
+        ]
+
+
+class TrendingHashtag(models.Model):
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='trending')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, related_name='trending_hashtags')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    usage_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['category', 'rank'], name='trending_category_rank_idx'),
+        ]
+
+
+class SearchDocument(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    post_length = models.PositiveIntegerField(default=0)
+    comment_length = models.PositiveIntegerField(default=0)
+
+
+class SearchPosting(models.Model):
+    SOURCE_POST = 'p'
+    SOURCE_COMMENT = 'c'
+    SOURCE_CHOICES = [
+        (SOURCE_POST, 'Post'),
+        (SOURCE_COMMENT, 'Comment'),
+    ]
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_postings')
+    source = models.CharField(max_length=1, choices=SOURCE_CHOICES)
+    tf = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('term', 'post', 'source')
+
+
+class AuctionState(BaseModel):
+    STATUS_OPEN = 'open'
+    STATUS_CLOSED = 'closed'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Đang đấu giá'),
+        (STATUS_CLOSED, 'Đã kết thúc'),
+    ]
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='auction_state')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    starting_price = models.DecimalField(max_digits=10, decimal_places=2)
+    min_increment = models.DecimalField(max_digits=10, decimal_places=2, default=1)
+    current_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    leader = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='leading_auctions')
+    bid_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    opens_at = models.DateTimeField()
+    closes_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'closes_at'], name='auction_state_due_idx'),
+        ]
+
+    def minimum_bid(self):
+        if self.current_price is None:
+            return self.starting_price
+        return self.current_price + self.min_increment
 
 
 class Auction(BaseModel):
@@ -83,20 +314,154 @@ class Auction(BaseModel):
     created_at = models.DateTimeField(auto_now_add=True)
     winner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='won_auctions')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-bid_price'], name='auction_post_bid_idx'),
+        ]
+
 
 class Transaction(BaseModel):
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Chờ thanh toán'),
+        (STATUS_COMPLETED, 'Đã thanh toán'),
+    ]
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sender_transactions')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='receiver_transactions')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    auction = models.OneToOneField(AuctionState, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='settlement')
+
 
-#
-# class Notification(models.Model):
-#     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
-#     content = models.TextField()
-#     created_at = models.DateTimeField(auto_now_add=True)
-#     interaction = models.ForeignKey(Interaction, on_delete=models.CASCADE, related_name='notifications')
-#
-#     def __str__(self):
-#         return self.content
+class LedgerEntry(models.Model):
+    # Sổ cái chỉ ghi thêm: mỗi giao dịch đã thanh toán sinh một dòng âm cho người gửi và một dòng dương cho người nhận
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries')
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='ledger_entries')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        unique_together = ('transaction', 'user')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='ledger_user_created_idx'),
+        ]
+
+
+class UserBalance(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_sent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_received = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class Notification(models.Model):
+    VERB_LIKE = 'like'
+    VERB_COMMENT = 'comment'
+    VERB_BID = 'bid'
+    VERB_REPORT = 'report'
+    VERB_CHOICES = [
+        (VERB_LIKE, 'Thích bài viết'),
+        (VERB_COMMENT, 'Bình luận'),
+        (VERB_BID, 'Đặt giá'),
+        (VERB_REPORT, 'Báo cáo'),
+    ]
+    # Các sự kiện giống nhau (user, verb, post) chưa đọc được gộp vào một dòng: "12 người đã thích bài viết"
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='notifications')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    actor_count = models.PositiveIntegerField(default=1)
+    actor_ids = models.JSONField(default=list)  # Những người đã được đếm vào actor_count (trừ người ẩn danh)
+    read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'read', '-updated_at', '-id'], name='notification_unread_idx'),
+        ]
+
+
+class NotificationCounter(models.Model):
+    # Số thông báo chưa đọc được cập nhật cùng lúc ghi thông báo, đọc một dòng thay vì COUNT(*)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+
+
+class MediaFile(models.Model):
+    KIND_AVATAR = 'avatar'
+    KIND_POST = 'post'
+    KIND_CHOICES = [
+        (KIND_AVATAR, 'Ảnh đại diện'),
+        (KIND_POST, 'Ảnh bài viết'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Chờ xử lý'),
+        (STATUS_PROCESSING, 'Đang xử lý'),
+        (STATUS_READY, 'Sẵn sàng'),
+        (STATUS_FAILED, 'Lỗi'),
+    ]
+    # Người tải lên đầu tiên; ảnh bài viết dùng chung giữa nhiều người nên không xoá theo user (cleanup_media dọn sau)
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='media_files')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    original = models.CharField(max_length=255)  # Tên file gốc trong thư mục incoming, xoá sau khi xử lý
+    # Ảnh bài viết được đánh địa chỉ theo nội dung: cùng một ảnh chỉ được lưu và xử lý một lần
+    sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='media_status_idx'),
+        ]
+
+
+class MediaVariant(models.Model):
+    media = models.ForeignKey(MediaFile, on_delete=models.CASCADE, related_name='variants')
+    name = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    url = models.CharField(max_length=500)
+
+    class Meta:
+        unique_together = ('media', 'name', 'format')
+
+
+class PostImage(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='images')
+    media = models.ForeignKey(MediaFile, on_delete=models.PROTECT, related_name='attachments')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'media')
+        ordering = ['position', 'id']
+
+
+class UploadSession(models.Model):
+    # Tải ảnh theo từng đoạn, nối tiếp được khi mất kết nối: client hỏi offset rồi gửi tiếp phần còn thiếu
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    media = models.ForeignKey(MediaFile, on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions')
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'media'], name='upload_owner_media_idx'),
+        ]
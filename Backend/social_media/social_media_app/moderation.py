@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import search, timeline
+from .caching import invalidate
+from .models import Notification, Post, PostReportCount, PostStatistics, Report, StatsDirtyDay
+from .notifications import notify
+
+DEFAULTS = {
+    'REASON_WEIGHTS': {
+        'inappropriate_language': 3,
+        'spam': 2,
+        'no_payment_after_auction': 3,
+        'other': 1,
+    },
+    'AUTO_HIDE_SCORE': 30,
+}
+
+
+def get_moderation_setting(name):
+    return getattr(settings, 'MODERATION', {}).get(name, DEFAULTS[name])
+
+
+def reason_weight(reason):
+    return get_moderation_setting('REASON_WEIGHTS').get(reason, 1)
+
+
+def submit_report(user, post, reason):
+    # Trả về (report, hidden); report là None nếu người dùng đã báo cáo bài viết này và chưa được xử lý
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                report = Report.objects.create(user=user, post=post, reason=reason)
+        except IntegrityError:
+            # Báo cáo cũ đã được xử lý (active=False) thì mở lại, còn đang chờ thì là trùng
+            report = Report.objects.filter(user=user, post=post).first()
+            if report is None or not Report.objects.filter(pk=report.pk, active=False).update(active=True,
+                                                                                              reason=reason):
+                return None, False
+            report.active, report.reason = True, reason
+
+        updated = PostReportCount.objects.filter(post=post, reason=reason).update(count=F('count') + 1)
+        if not updated:
+            counter, created = PostReportCount.objects.get_or_create(post=post, reason=reason,
+                                                                     defaults={'count': 1})
+            if not created:
+                PostReportCount.objects.filter(pk=counter.pk).update(count=F('count') + 1)
+
+        PostStatistics.objects.increment(post, 'report_count')
+        PostStatistics.objects.increment(post, 'report_score', reason_weight(reason))
+        hidden = hide_if_over_threshold(post)
+        notify(Notification.VERB_REPORT, post.pk)  # Không gửi actor: người báo cáo được giữ ẩn danh
+    return report, hidden
+
+
+def hide_if_over_threshold(post):
+    # Tra cứu một dòng theo khoá chính; UPDATE có điều kiện active=True nên chỉ ẩn đúng một lần
+    threshold = get_moderation_setting('AUTO_HIDE_SCORE')
+    score = PostStatistics.objects.filter(post_id=post.pk).values_list('report_score', flat=True).first() or 0
+    if not threshold or score < threshold:
+        return False
+    hidden = Post.objects.filter(pk=post.pk, active=True).update(active=False, auto_hidden=True) > 0
+    if hidden:
+        # update() không phát post_save: tự gỡ bài khỏi index tìm kiếm, timeline và cache
+        unpublish(post.pk)
+    return hidden
+
+
+def unpublish(post_id):
+    # Bài bị ẩn không còn được tính vào DailyPostStats
+    StatsDirtyDay.objects.mark(Post.objects.filter(pk=post_id).values_list('created_date', flat=True).first())
+    search.unindex_post(post_id)
+    timeline.remove_from_timelines(post_id)
+    invalidate('posts', 'comments:%s' % post_id)
+
+
+def republish(post_id):
+    post = Post.objects.prefetch_related('hashtag').get(pk=post_id)
+    StatsDirtyDay.objects.mark(post.created_date)
+    search.reindex_post(post)
+    transaction.on_commit(lambda: timeline.fan_out_post(post_id))
+    invalidate('posts', 'comments:%s' % post_id)
+
+
+def resolve_reports(post, decision):
+    # decision: 'dismiss' giữ nguyên bài viết, 'hide' ẩn bài viết, 'restore' hiện lại bài đã bị ẩn tự động.
+    # Trả về True nếu bài viết đổi trạng thái hiển thị
+    with transaction.atomic():
+        Report.objects.filter(post=post, active=True).update(active=False)
+        PostReportCount.objects.filter(post=post).delete()
+        PostStatistics.objects.filter(post_id=post.pk).update(report_count=0, report_score=0)
+        if decision == 'hide':
+            # Ẩn theo quyết định của người kiểm duyệt: không còn là ẩn tự động nên 'restore' không mở lại được
+            posts = Post.objects.filter(pk=post.pk)
+            changed = posts.filter(active=True).update(active=False) > 0
+            posts.update(auto_hidden=False)
+            if changed:
+                unpublish(post.pk)
+            return changed
+        if decision == 'restore':
+            # Bài do tác giả hoặc admin ẩn vì lý do khác thì giữ nguyên
+            restored = Post.objects.filter(pk=post.pk, active=False, auto_hidden=True) \
+                .update(active=True, auto_hidden=False) > 0
+            if restored:
+                republish(post.pk)
+            return restored
+    return False
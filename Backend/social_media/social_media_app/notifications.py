@@ -0,0 +1,208 @@
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter, Post
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_BATCH': 500,
+    'QUEUE_SIZE': 10000,
+}
+
+
+def get_notification_setting(name):
+    return getattr(settings, 'NOTIFICATIONS', {}).get(name, DEFAULTS[name])
+
+
+def notify(verb, post_id, actor_id=None):
+    notify_many(verb, [(actor_id, post_id)])
+
+
+def notify_many(verb, pairs):
+    # pairs: [(actor_id, post_id)]; chỉ đẩy sự kiện vào hàng đợi sau khi transaction commit, việc ghi DB do worker làm
+    now = timezone.now()
+    events = [(verb, post_id, actor_id, now) for actor_id, post_id in pairs]
+    if not events:
+        return
+    if not get_notification_setting('ASYNC'):
+        deliver_events(events)  # Ghi ngay trong transaction của người gọi
+        return
+    transaction.on_commit(lambda: get_dispatcher().submit_many(events))
+
+
+def deliver_events(events):
+    # Gộp sự kiện theo (người nhận, verb, post), cộng vào thông báo chưa đọc sẵn có hoặc tạo mới bằng bulk_create
+    if not events:
+        return 0
+
+    authors = dict(Post.objects.filter(pk__in={post_id for _, post_id, _, _ in events}).values_list('pk', 'user_id'))
+    groups = OrderedDict()
+    for verb, post_id, actor_id, when in events:
+        user_id = authors.get(post_id)
+        if user_id is None or user_id == actor_id:
+            continue  # Bài viết đã xoá hoặc tự tương tác với bài của mình
+        group = groups.setdefault((user_id, verb, post_id), {'actors': [], 'anonymous': 0, 'last': None, 'when': when})
+        if actor_id is None:
+            group['anonymous'] += 1  # Báo cáo ẩn danh: mỗi sự kiện là một người khác nhau
+        elif actor_id not in group['actors']:
+            group['actors'].append(actor_id)
+        group['last'] = actor_id
+        group['when'] = max(group['when'], when)
+    if not groups:
+        return 0
+
+    with transaction.atomic():
+        existing = {}
+        unread = Notification.objects.select_for_update().filter(
+            user_id__in={k[0] for k in groups}, post_id__in={k[2] for k in groups}, read=False)
+        for notification in unread:
+            existing.setdefault((notification.user_id, notification.verb, notification.post_id), notification)
+
+        to_create, to_update, new_unread = [], [], Counter()
+        for (user_id, verb, post_id), group in groups.items():
+            notification = existing.get((user_id, verb, post_id))
+            if notification is None:
+                to_create.append(Notification(user_id=user_id, verb=verb, post_id=post_id, actor_id=group['last'],
+                                              actor_ids=group['actors'],
+                                              actor_count=len(group['actors']) + group['anonymous'],
+                                              created_at=group['when'], updated_at=group['when']))
+                new_unread[user_id] += 1
+                continue
+            # Chỉ đếm người chưa có trong thông báo: một người tương tác lại không làm tăng số người
+            added = [a for a in group['actors'] if a not in notification.actor_ids]
+            if not added and not group['anonymous']:
+                continue
+            notification.actor_id = group['last']
+            notification.actor_ids = notification.actor_ids + added
+            notification.actor_count += len(added) + group['anonymous']
+            notification.updated_at = group['when']
+            to_update.append(notification)
+
+        Notification.objects.bulk_create(to_create, batch_size=1000)
+        Notification.objects.bulk_update(to_update, ['actor', 'actor_ids', 'actor_count', 'updated_at'],
+                                         batch_size=1000)
+        adjust_unread(new_unread)
+    return len(to_create) + len(to_update)
+
+
+def adjust_unread(deltas):
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    NotificationCounter.objects.bulk_create([NotificationCounter(user_id=u) for u in deltas], ignore_conflicts=True)
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        counters = NotificationCounter.objects.filter(user_id__in=user_ids)
+        if delta < 0:
+            counters.filter(unread__lt=-delta).update(unread=0)
+            counters = counters.filter(unread__gte=-delta)
+        counters.update(unread=F('unread') + delta)
+
+
+def mark_read(user, ids=None):
+    with transaction.atomic():
+        notifications = Notification.objects.filter(user=user, read=False)
+        if ids is not None:
+            notifications = notifications.filter(pk__in=ids)
+        updated = notifications.update(read=True)
+        if ids is None:
+            NotificationCounter.objects.filter(user=user).update(unread=0)
+        else:
+            adjust_unread({user.pk: -updated})
+    return updated
+
+
+def get_unread_count(user):
+    return NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first() or 0
+
+
+class NotificationDispatcher:
+    # Một thread nền cho mỗi process: gom sự kiện trong FLUSH_INTERVAL_MS rồi ghi một lô
+    def __init__(self, flush_interval_ms=200, max_batch=500, queue_size=10000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit_many(self, events):
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1  # Thông báo là best-effort: hàng đợi đầy thì bỏ, không làm chậm request
+        self._start_worker()
+
+    def drain(self, block=True):
+        events = []
+        try:
+            events.append(self.queue.get(timeout=self.flush_interval) if block else self.queue.get_nowait())
+            while len(events) < self.max_batch:
+                events.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def flush(self):
+        delivered = 0
+        while True:
+            events = self.drain(block=False)
+            if not events:
+                return delivered
+            delivered += deliver_events(events)
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            events = self.drain()
+            if not events:
+                continue
+            try:
+                close_old_connections()
+                deliver_events(events)
+            except Exception:
+                logger.exception('Delivering %d notification events failed', len(events))
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher(get_notification_setting('FLUSH_INTERVAL_MS'),
+                                                     get_notification_setting('MAX_BATCH'),
+                                                     get_notification_setting('QUEUE_SIZE'))
+                atexit.register(_flush_at_exit)
+    return _dispatcher
+
+
+def _flush_at_exit():
+    try:
+        if _dispatcher is not None:
+            _dispatcher.flush()
+    except Exception:
+        logger.exception('Flushing notification events at exit failed')
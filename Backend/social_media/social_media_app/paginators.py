@@ -1,5 +1,171 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class PostPaginator(PageNumberPagination):
     page_size = 30
+
+
+class KeysetPagination(BasePagination):
+    # Phân trang theo con trỏ (keyset) trên một thứ tự ổn định, không dùng OFFSET và không COUNT(*)
+    page_size = 30
+    cursor_query_param = 'cursor'
+    ordering = ('-created_date', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+
+        position = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.next_position = self.get_position(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_fields(self):
+        return [(f[1:], True) if f.startswith('-') else (f, False) for f in self.ordering]
+
+    def get_position(self, obj):
+        return [getattr(obj, name) for name, _ in self.get_fields()]
+
+    def get_keyset_filter(self, position):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.get_fields(), position):
+            lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, position):
+        raw = json.dumps([str(value) for value in position]).encode('utf-8')
+        return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            values = json.loads(raw.decode('utf-8'))
+            fields = self.get_fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return self.to_position(values, model)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_position(self, values, model):
+        return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(self.get_fields(), values)]
+
+
+class PostCursorPaginator(KeysetPagination):
+    page_size = 30
+    ordering = ('-created_date', '-id')
+
+
+class CommentCursorPaginator(KeysetPagination):
+    page_size = 50
+    ordering = ('created_date', 'id')
+
+
+class LedgerCursorPaginator(KeysetPagination):
+    page_size = 50
+    ordering = ('-created_at', '-id')
+
+
+class ModerationQueuePaginator(KeysetPagination):
+    page_size = 50
+    ordering = ('-report_score', '-post_id')
+
+
+class NotificationCursorPaginator(KeysetPagination):
+    page_size = 30
+    ordering = ('-updated_at', '-id')
+
+
+class FeedCursorPaginator(KeysetPagination):
+    # Gộp nhiều nguồn (timeline dựng sẵn + nguồn "nóng" đọc trực tiếp), mỗi nguồn là một truy vấn khoảng theo id
+    page_size = 30
+    ordering = ('-id',)
+
+    def paginate_merged(self, querysets, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+
+        position = self.decode_cursor(request, querysets[0].model)
+        merged = {}
+        for queryset in querysets:
+            queryset = queryset.order_by(*self.ordering)
+            if position is not None:
+                queryset = queryset.filter(self.get_keyset_filter(position))
+            for obj in queryset[:self.page_size + 1]:
+                merged.setdefault(obj.pk, obj)
+
+        results = [merged[pk] for pk in sorted(merged, reverse=True)[:self.page_size + 1]]
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.next_position = self.get_position(self.page[-1]) if self.has_next else None
+        return self.page
+
+
+class RankedCursorPaginator(KeysetPagination):
+    # Phân trang kết quả đã xếp hạng trong bộ nhớ [(score, id)], giảm dần theo (score, id)
+    page_size = 20
+    ordering = ('-score', '-id')
+
+    def paginate_ranked(self, ranked, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+
+        position = self.decode_cursor(request, None)
+        if position is not None:
+            position = tuple(position)
+            ranked = [item for item in ranked if tuple(item) < position]
+
+        self.has_next = len(ranked) > self.page_size
+        self.page = ranked[:self.page_size]
+        self.next_position = list(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def encode_cursor(self, position):
+        score, pk = position
+        return super().encode_cursor([repr(float(score)), pk])
+
+    def to_position(self, values, model):
+        score, pk = values
+        return [float(score), int(pk)]
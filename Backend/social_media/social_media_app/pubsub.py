@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BROKER': 'social_media_app.pubsub.InProcessBroker',
+    'QUEUE_SIZE': 100,
+}
+
+
+def get_push_setting(name):
+    return getattr(settings, 'PUSH', {}).get(name, DEFAULTS[name])
+
+
+def comments_topic(post_id):
+    return 'post:%s:comments' % post_id
+
+
+def bids_topic(post_id):
+    return 'post:%s:bids' % post_id
+
+
+class Subscription:
+    # Hàng đợi gửi riêng cho mỗi kết nối; đầy thì bỏ tin cũ nhất để client chậm không chặn người khác
+    def __init__(self, broker, topics, queue_size):
+        self.broker = broker
+        self.topics = set(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def deliver(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    # Pub/sub trong process; publish() gọi được từ code đồng bộ (signal, view) ở bất kỳ thread nào
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or get_push_setting('QUEUE_SIZE')
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics):
+        subscription = Subscription(self, topics, self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscriptions.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[topic]
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscriptions.get(topic, ()))
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(topic, ()))
+
+        # Mỗi event loop chỉ nhận một callback cho cả nhóm subscriber của nó
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, group, message)
+            except RuntimeError:
+                pass  # Event loop đã đóng
+        return len(subscribers)
+
+
+def _deliver_all(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(get_push_setting('BROKER'))()
+    return _broker
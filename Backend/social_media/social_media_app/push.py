@@ -0,0 +1,71 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import JSONRenderer
+
+from .authentication import load_access_token
+from .models import Post
+from .pubsub import bids_topic, comments_topic, get_broker
+
+POST_CHANNEL_RE = re.compile(r'^/ws/posts/(?P<post_id>\d+)/$')
+
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+
+
+@sync_to_async
+def authenticate(scope):
+    # Token OAuth2 lấy từ ?token=... hoặc header Authorization: Bearer ...
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization' and value.lower().startswith(b'bearer '):
+            token = value[7:].decode()
+    if not token:
+        return None
+
+    access_token, _ = load_access_token(token)
+    return access_token.user if access_token is not None else None
+
+
+@sync_to_async
+def post_exists(post_id):
+    return Post.objects.filter(pk=post_id, active=True).exists()
+
+
+async def websocket_application(scope, receive, send):
+    # ws/posts/<id>/ : đẩy comment mới và giá đấu mới của bài viết, không giữ thread worker cho mỗi client
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    match = POST_CHANNEL_RE.match(scope['path'])
+    if not match or not await post_exists(match['post_id']):
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    if await authenticate(scope) is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+    post_id = match['post_id']
+    subscription = get_broker().subscribe([comments_topic(post_id), bids_topic(post_id)])
+
+    async def forward():
+        while True:
+            message = await subscription.get()
+            await send({'type': 'websocket.send', 'text': JSONRenderer().render(message).decode()})
+
+    sender = asyncio.ensure_future(forward())
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] == 'websocket.receive' and event.get('text') == 'ping':
+                await send({'type': 'websocket.send', 'text': json.dumps({'type': 'pong'})})
+    finally:
+        sender.cancel()
+        subscription.close()
@@ -0,0 +1,218 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Sum
+
+from .models import Comment, Post, SearchDocument, SearchPosting
+
+TERM_MAX_LENGTH = SearchPosting._meta.get_field('term').max_length
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_RESULTS = 1000
+CORPUS_CACHE_KEY = 'search:corpus'
+CORPUS_CACHE_TIMEOUT = 300
+
+
+def fold(text):
+    # Bỏ dấu tiếng Việt: "Đấu giá" -> "dau gia"
+    text = unicodedata.normalize('NFD', str(text or '').lower().replace('đ', 'd'))
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+
+
+def tokenize(text):
+    return [token[:TERM_MAX_LENGTH] for token in TOKEN_RE.findall(fold(text))]
+
+
+def post_tokens(post, hashtag_names=None):
+    if hashtag_names is None:
+        hashtag_names = [h.name for h in post.hashtag.all()]
+    return tokenize(post.title) + tokenize(post.content) + tokenize(' '.join(hashtag_names))
+
+
+def comment_tokens(comment):
+    return tokenize(comment.content) if comment.active else []
+
+
+def index_post(post, hashtag_names=None):
+    # Thay toàn bộ posting nguồn "post" (tiêu đề, nội dung, hashtag); posting của comment giữ nguyên
+    tokens = post_tokens(post, hashtag_names)
+    with transaction.atomic():
+        SearchPosting.objects.filter(post=post, source=SearchPosting.SOURCE_POST).delete()
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, post=post, source=SearchPosting.SOURCE_POST, tf=tf)
+            for term, tf in Counter(tokens).items()
+        ])
+        updated = SearchDocument.objects.filter(post=post).update(post_length=len(tokens))
+        if not updated:
+            SearchDocument.objects.get_or_create(post=post, defaults={'post_length': len(tokens)})
+
+
+def schedule_index(post, created=False):
+    # post_save, m2m_changed và attach_hashtags của cùng một bài trong một transaction chỉ đánh chỉ mục một lần,
+    # sau khi commit, với trạng thái cuối cùng của bài viết (đã có hashtag)
+    post._search_index_created = created or getattr(post, '_search_index_created', False)
+    if getattr(post, '_search_index_scheduled', False):
+        return
+    post._search_index_scheduled = True
+
+    def run():
+        created = post._search_index_created
+        post._search_index_scheduled = post._search_index_created = False
+        if not post.active:
+            unindex_post(post.pk)
+        elif created:
+            index_new_posts([post], {post.pk: [h.name for h in post.hashtag.all()]})  # Chưa có posting nào để xoá
+        else:
+            index_post(post)
+
+    transaction.on_commit(run)
+
+
+def index_new_posts(posts, hashtag_names):
+    # Nhập hàng loạt: bài viết mới chưa có comment nên chỉ cần posting nguồn "post", ghi một lần cho cả lô
+    postings, documents = [], []
+    for post in posts:
+        terms = Counter(post_tokens(post, hashtag_names.get(post.pk, [])))
+        postings += [SearchPosting(term=t, post=post, source=SearchPosting.SOURCE_POST, tf=n) for t, n in terms.items()]
+        documents.append(SearchDocument(post=post, post_length=sum(terms.values())))
+
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(documents, ignore_conflicts=True)
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+    cache.delete(CORPUS_CACHE_KEY)
+
+
+def update_comment_postings(post_id, old_tokens, new_tokens):
+    # Cộng/trừ tf theo phần chênh lệch, không phải quét lại các comment khác của bài viết
+    delta = Counter(new_tokens)
+    delta.subtract(Counter(old_tokens))
+    delta = {term: n for term, n in delta.items() if n}
+    if not delta:
+        return
+
+    postings = SearchPosting.objects.filter(post_id=post_id, source=SearchPosting.SOURCE_COMMENT)
+    with transaction.atomic():
+        existing = set(postings.filter(term__in=delta).values_list('term', flat=True))
+        for term, n in delta.items():
+            if term in existing:
+                postings.filter(term=term).update(tf=F('tf') + n)
+            elif n > 0:
+                try:
+                    with transaction.atomic():
+                        SearchPosting.objects.create(term=term, post_id=post_id,
+                                                     source=SearchPosting.SOURCE_COMMENT, tf=n)
+                except IntegrityError:
+                    postings.filter(term=term).update(tf=F('tf') + n)
+        postings.filter(tf__lte=0).delete()
+
+        length_delta = len(new_tokens) - len(old_tokens)
+        documents = SearchDocument.objects.filter(post_id=post_id)
+        if length_delta < 0:
+            documents = documents.filter(comment_length__gte=-length_delta)
+        if not documents.update(comment_length=F('comment_length') + length_delta) and length_delta > 0:
+            SearchDocument.objects.get_or_create(post_id=post_id, defaults={'comment_length': length_delta})
+
+
+def index_posts(posts):
+    # Dựng posting (bài viết và comment) cho các bài chưa có trong index, ghi một lần cho cả lô
+    comment_terms = defaultdict(Counter)
+    comments = Comment.objects.filter(post__in=posts, active=True).values_list('post_id', 'content')
+    for post_id, content in comments.iterator():
+        comment_terms[post_id].update(tokenize(content))
+
+    postings, documents = [], []
+    for post in posts:
+        terms = Counter(post_tokens(post))
+        postings += [SearchPosting(term=t, post=post, source=SearchPosting.SOURCE_POST, tf=n)
+                     for t, n in terms.items()]
+        postings += [SearchPosting(term=t, post=post, source=SearchPosting.SOURCE_COMMENT, tf=n)
+                     for t, n in comment_terms[post.pk].items()]
+        documents.append(SearchDocument(post=post, post_length=sum(terms.values()),
+                                        comment_length=sum(comment_terms[post.pk].values())))
+
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(documents)
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+def unindex_post(post_id):
+    # Bài bị ẩn: bỏ khỏi index và khỏi thống kê corpus (số tài liệu, độ dài trung bình)
+    with transaction.atomic():
+        SearchPosting.objects.filter(post_id=post_id).delete()
+        SearchDocument.objects.filter(post_id=post_id).delete()
+    cache.delete(CORPUS_CACHE_KEY)
+
+
+def reindex_post(post):
+    with transaction.atomic():
+        SearchPosting.objects.filter(post=post).delete()
+        SearchDocument.objects.filter(post=post).delete()
+        index_posts([post])
+    cache.delete(CORPUS_CACHE_KEY)
+
+
+def rebuild_index(batch_size=500):
+    SearchPosting.objects.all().delete()
+    SearchDocument.objects.all().delete()
+
+    indexed = 0
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk, active=True).order_by('pk')
+                     .prefetch_related('hashtag')[:batch_size])
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        index_posts(posts)
+        indexed += len(posts)
+
+    cache.delete(CORPUS_CACHE_KEY)
+    return indexed
+
+
+def get_corpus_stats():
+    stats = cache.get(CORPUS_CACHE_KEY)
+    if stats is None:
+        stats = SearchDocument.objects.aggregate(
+            count=Count('pk'), avg_length=Avg(F('post_length') + F('comment_length')))
+        stats = (stats['count'] or 0, float(stats['avg_length'] or 0))
+        cache.set(CORPUS_CACHE_KEY, stats, CORPUS_CACHE_TIMEOUT)
+    return stats
+
+
+def search_posts(query, limit=MAX_RESULTS):
+    # Trả về [(điểm BM25, post_id)] giảm dần, chỉ đọc posting của các từ trong truy vấn
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    doc_count, avg_length = get_corpus_stats()
+    if not doc_count:
+        return []
+
+    postings = SearchPosting.objects.filter(term__in=terms, post__active=True) \
+        .values('term', 'post_id').annotate(tf=Sum('tf')).order_by()
+    tf_by_post = defaultdict(dict)
+    for row in postings.iterator():
+        tf_by_post[row['post_id']][row['term']] = row['tf']
+    if not tf_by_post:
+        return []
+
+    df = Counter(term for by_term in tf_by_post.values() for term in by_term)
+    idf = {term: math.log(1 + (doc_count - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+    lengths = dict(SearchDocument.objects.filter(post_id__in=tf_by_post)
+                   .values_list('post_id', F('post_length') + F('comment_length')))
+
+    scored = []
+    for post_id, by_term in tf_by_post.items():
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(post_id, 0) / (avg_length or 1))
+        score = sum(idf[t] * tf * (BM25_K1 + 1) / (tf + norm) for t, tf in by_term.items())
+        scored.append((score, post_id))
+    return heapq.nlargest(limit, scored)
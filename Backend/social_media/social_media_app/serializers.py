@@ -1,6 +1,12 @@
 from .models import User
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from rest_framework import serializers
-from .models import Category, Post, Hashtag, Comment, PostStatistics, Report
+from .hashtags import attach_hashtags
+from .likes import get_liked_resolver
+from .media import MediaError, accept_upload, avatar_url, check_upload, get_media_setting, image_data
+from .models import Category, Post, Hashtag, Comment, PostStatistics, Report, TrendingHashtag, Auction, AuctionState, \
+    Transaction, LedgerEntry, UserBalance, Notification, MediaFile, PostImage, UploadSession
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,58 +19,155 @@ class HashtagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hashtag
         fields = ['id', 'name']
+        # Chỉ dùng lồng trong PostSerializer: hashtag đã tồn tại vẫn hợp lệ
+        extra_kwargs = {
+            'name': {
+                'validators': []
+            }
+        }
+
+
+class TrendingHashtagSerializer(serializers.ModelSerializer):
+    hashtag = HashtagSerializer()
+
+    class Meta:
+        model = TrendingHashtag
+        fields = ['rank', 'hashtag', 'category', 'score', 'usage_count', 'computed_at']
 
 
 class BaseSerializer(serializers.ModelSerializer):
-    image = serializers.SerializerMethodField(source='image')
     hashtag = HashtagSerializer(many=True)
 
-    def get_image(self, avatar):
-        if avatar.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri('/static/%s' % avatar.image.name)
-            return '/static/%s' % avatar.image.name
+
+class PostImagesField(serializers.Field):
+    # Ghi: danh sách id ảnh đã tải lên qua /uploads/; đọc: kích thước gốc và URL biến thể của từng ảnh
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not all(str(pk).isdigit() for pk in data):
+            raise serializers.ValidationError('images must be a list of upload media ids')
+        ids = list(dict.fromkeys(int(pk) for pk in data))
+        if len(ids) > get_media_setting('MAX_POST_IMAGES'):
+            raise serializers.ValidationError('A post can have at most %d images' %
+                                              get_media_setting('MAX_POST_IMAGES'))
+
+        # Ảnh lưu theo nội dung nên dùng chung giữa nhiều người: chỉ được gắn ảnh mà chính mình đã tải lên
+        request = self.context.get('request')
+        allowed = set()
+        if request is not None:
+            allowed.update(UploadSession.objects.filter(owner=request.user, media_id__in=ids)
+                           .values_list('media_id', flat=True))
+        if self.parent.instance is not None:
+            allowed.update(self.parent.instance.images.values_list('media_id', flat=True))
+        unknown = [pk for pk in ids if pk not in allowed]
+        if unknown:
+            raise serializers.ValidationError('Unknown uploads: %s' % ', '.join(map(str, unknown)))
+        return ids
+
+    def to_representation(self, images):
+        request = self.context.get('request')
+        return [image_data(image.media, request) for image in images.all()]
 
 
 class PostSerializer(BaseSerializer):
     hashtag = HashtagSerializer(many=True, required=False)
+    images = PostImagesField(required=False)
+    like_count = serializers.IntegerField(source='statistics.like_count', read_only=True)
+    comment_count = serializers.IntegerField(source='statistics.comment_count', read_only=True)
+    liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'category', 'hashtag']
+        fields = ['id', 'title', 'content', 'category', 'hashtag', 'images', 'like_count', 'comment_count', 'liked']
 
-    def create(self, validated_data):
-        hashtag_data = validated_data.pop('hashtag')  # Lấy dữ liệu của trường hashtags
-        post = Post.objects.create(**validated_data)  # Tạo đối tượng Post
+    def get_liked(self, post):
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return getattr(post, 'liked', None)
 
-        for hashtag_data in hashtag_data:
-            hashtag, created = Hashtag.objects.get_or_create(**hashtag_data)
-            post.hashtag.add(hashtag)  # Thêm hashtag vào bài viết
+        resolver = get_liked_resolver(request)
+        if hasattr(post, 'liked'):
+            return resolver.overlay(post.pk, post.liked)
+        if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+            # Tra một lần (IN) cho cả trang thay vì một truy vấn cho mỗi bài viết
+            resolver.prime(p.pk for p in self.parent.instance)
+        return resolver.is_liked(post.pk)
+
+    def create(self, validated_data):
+        hashtag_data = validated_data.pop('hashtag', [])  # Lấy dữ liệu của trường hashtags
+        image_ids = validated_data.pop('images', [])
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)  # Tạo đối tượng Post
+            attach_hashtags(post, [h['name'] for h in hashtag_data], created=True)
+            self.attach_images(post, image_ids)
 
         return post
 
+    def update(self, instance, validated_data):
+        hashtag_data = validated_data.pop('hashtag', None)
+        image_ids = validated_data.pop('images', None)
+        with transaction.atomic():
+            post = super().update(instance, validated_data)
+            if hashtag_data is not None:
+                attach_hashtags(post, [h['name'] for h in hashtag_data], replace=True)
+                getattr(post, '_prefetched_objects_cache', {}).pop('hashtag', None)
+            if image_ids is not None:
+                post.images.all().delete()
+                self.attach_images(post, image_ids)
+                getattr(post, '_prefetched_objects_cache', {}).pop('images', None)
 
-class PostDetailsSerializer(PostSerializer):
-    liked = serializers.SerializerMethodField()
+        return post
 
-    def get_liked(self, post):
-        request = self.context.get('request')
-        if request.user.is_authenticated:
-            return post.like_set.filter(active=True).exists()
+    def attach_images(self, post, image_ids):
+        PostImage.objects.bulk_create([PostImage(post=post, media_id=media_id, position=position)
+                                       for position, media_id in enumerate(image_ids)])
 
+
+class PostDetailsSerializer(PostSerializer):
     class Meta:
         model = PostSerializer.Meta.model
-        fields = list(PostSerializer.Meta.fields) + ['liked']
+        fields = list(PostSerializer.Meta.fields)
 
 
 class PostStatisticsSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostStatistics
-        fields = ['post', 'comment_count', 'like_count']
+        fields = ['post', 'like_count', 'comment_count', 'report_count']
+
+
+class ModerationQueueSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='post.title', read_only=True)
+    active = serializers.BooleanField(source='post.active', read_only=True)
+    reasons = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PostStatistics
+        fields = ['post', 'title', 'active', 'report_score', 'report_count', 'reasons']
+
+    def get_reasons(self, stats):
+        return self.context.get('reasons', {}).get(stats.post_id, {})
+
+
+class AvatarField(serializers.Field):
+    # Ghi: nhận file ảnh (xử lý sau trong worker); đọc: URL biến thể nhỏ nhất đủ cho kích thước hiển thị
+    def __init__(self, size, **kwargs):
+        self.size = size
+        super().__init__(source='*', **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, UploadedFile):
+            raise serializers.ValidationError('Upload an image file')
+        try:
+            check_upload(data)
+        except MediaError as e:
+            raise serializers.ValidationError(e.message)
+        return {'avatar_upload': data}
+
+    def to_representation(self, user):
+        return avatar_url(user, self.size, self.context.get('request'))
 
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar = AvatarField(size=320, required=False)
+
     class Meta:
         model = User
         fields = ['first_name', 'username', 'email', 'password', 'is_superuser', 'is_staff', 'avatar']
@@ -76,20 +179,84 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         data = validated_data.copy()
+        upload = data.pop('avatar_upload', None)
 
         user = User(**data)
         user.set_password(data['password'])
         user.save()
+        if upload is not None:
+            accept_upload(user, upload, MediaFile.KIND_AVATAR)
 
         return user
 
 
+class CommentAuthorSerializer(serializers.ModelSerializer):
+    avatar = AvatarField(size=64, read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'avatar']
+
+
 class CommentSerializer(serializers.ModelSerializer):
-    user = UserSerializer()
+    user = CommentAuthorSerializer(read_only=True)
 
     class Meta:
         model = Comment
-        fields = ['id', 'content', 'user']
+        fields = ['id', 'content', 'user', 'created_date']
+        read_only_fields = ['created_date']
+
+
+class AuctionStateSerializer(serializers.ModelSerializer):
+    minimum_bid = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = AuctionState
+        fields = ['post', 'status', 'starting_price', 'min_increment', 'current_price', 'minimum_bid', 'leader',
+                  'bid_count', 'version', 'opens_at', 'closes_at']
+
+
+class BidSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Auction
+        fields = ['id', 'post', 'participant', 'bid_price', 'created_at']
+
+
+class TransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = ['id', 'sender', 'receiver', 'amount', 'status', 'auction', 'created_at']
+        read_only_fields = ['sender', 'status', 'auction']
+
+
+class LedgerEntrySerializer(serializers.ModelSerializer):
+    transaction = TransactionSerializer(read_only=True)
+
+    class Meta:
+        model = LedgerEntry
+        fields = ['id', 'amount', 'created_at', 'transaction']
+
+
+class UserBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserBalance
+        fields = ['user', 'balance', 'total_sent', 'total_received', 'updated_at']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'size', 'received', 'chunk_size', 'image', 'expires_at']
+
+    def get_chunk_size(self, session):
+        return get_media_setting('CHUNK_SIZE')
+
+    def get_image(self, session):
+        # Có giá trị khi đã nhận đủ byte; dùng image.id trong trường images khi tạo/sửa bài viết
+        return image_data(session.media, self.context.get('request')) if session.media_id else None
 
 
 class ReportSerializer(serializers.ModelSerializer):
@@ -98,13 +265,36 @@ class ReportSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class NotificationSerializer(serializers.ModelSerializer):
+    MESSAGES = {
+        Notification.VERB_LIKE: 'liked your post',
+        Notification.VERB_COMMENT: 'commented on your post',
+        Notification.VERB_BID: 'bid on your post',
+        Notification.VERB_REPORT: 'reported your post',
+    }
+
+    actor = serializers.CharField(source='actor.username', read_only=True, default=None)
+    title = serializers.CharField(source='post.title', read_only=True)
+    message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'verb', 'post', 'title', 'actor', 'actor_count', 'message', 'read', 'created_at', 'updated_at']
+
+    def get_message(self, notification):
+        # "12 people liked your post"; báo cáo không kèm tên người báo cáo
+        if notification.verb == Notification.VERB_REPORT or notification.actor is None:
+            who = '1 person' if notification.actor_count == 1 else '%d people' % notification.actor_count
+        elif notification.actor_count == 2:
+            who = '%s and 1 other' % notification.actor.username
+        elif notification.actor_count > 2:
+            who = '%s and %d others' % (notification.actor.username, notification.actor_count - 1)
+        else:
+            who = notification.actor.username
+        return '%s %s' % (who, self.MESSAGES.get(notification.verb, notification.verb))
+
+
 # class InteractionSerializer(serializers.ModelSerializer):
 #     class Meta:
 #         model = Interaction
 #         fields = '__all__'
-#
-#
-# class NotificationSerializer(serializers.ModelSerializer):
-#     class Meta:
-#         model = Notification
-#         fields = '__all__'
@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from oauth2_provider.models import get_access_token_model
+
+from . import notifications, search, timeline
+from .authentication import get_token_cache, revoke_user_tokens
+from .caching import invalidate
+from .models import Auction, Category, Comment, Notification, Post, PostStatistics, StatsDirtyDay, User
+from .pubsub import comments_topic, get_broker
+
+
+@receiver(post_save, sender=Post)
+def create_post_statistics(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        PostStatistics.objects.get_or_create(post=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def mark_stats_day_dirty(sender, instance, raw=False, **kwargs):
+    if not raw:
+        StatsDirtyDay.objects.mark(instance.created_date)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        search.schedule_index(instance, created)
+
+
+@receiver(m2m_changed, sender=Post.hashtag.through)
+def index_post_hashtags(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        search.schedule_index(instance)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_indexed_comment(sender, instance, raw=False, **kwargs):
+    instance._search_old_tokens = []
+    if not raw and not instance._state.adding:
+        old = Comment.objects.filter(pk=instance.pk).values_list('content', 'active').first()
+        if old and old[1]:
+            instance._search_old_tokens = search.tokenize(old[0])
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.update_comment_postings(instance.post_id, getattr(instance, '_search_old_tokens', []),
+                                       search.comment_tokens(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.update_comment_postings(instance.post_id, search.comment_tokens(instance), [])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    invalidate('categories')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_posts(sender, **kwargs):
+    invalidate('posts')  # Like và comment chỉ đổi bộ đếm, feed đọc lại bộ đếm khi lấy từ cache
+
+
+@receiver(m2m_changed, sender=Post.hashtag.through)
+def invalidate_post_hashtags(sender, **kwargs):
+    invalidate('posts')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    invalidate('comments:%s' % instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+def push_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from .serializers import CommentSerializer
+
+        message = {'type': 'comment', 'comment': CommentSerializer(instance).data}
+        transaction.on_commit(lambda: get_broker().publish(comments_topic(instance.post_id), message))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    # Chạy sau commit để hashtag đã được gắn (PostSerializer.create gắn trong cùng transaction)
+    if created and not raw:
+        transaction.on_commit(lambda: timeline.on_post_created(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_interest(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: timeline.record_interactions([(instance.user_id, instance.post_id)], 'comment'))
+
+
+@receiver(post_save, sender=Comment)
+def notify_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notifications.notify(Notification.VERB_COMMENT, instance.post_id, instance.user_id)
+
+
+@receiver(post_save, sender=Auction)
+def notify_bid(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notifications.notify(Notification.VERB_BID, instance.post_id, instance.participant_id)
+
+
+@receiver(post_save, sender=get_access_token_model())
+@receiver(post_delete, sender=get_access_token_model())
+def drop_cached_token(sender, instance, **kwargs):
+    # Token bị huỷ (revoke xoá bản ghi) hoặc bị sửa hạn/scope
+    get_token_cache().discard(instance.token)
+
+
+@receiver(post_save, sender=User)
+def drop_cached_user_tokens(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    # set_password() giữ mật khẩu thô trong _password cho tới khi save() xong: đổi mật khẩu thì đăng xuất mọi nơi
+    if instance._password is not None:
+        revoke_user_tokens(instance)
+    get_token_cache().discard_user(instance.pk)
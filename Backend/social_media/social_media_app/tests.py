@@ -1,3 +1,988 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.files import File
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from .authentication import get_token_cache
+from .caching import get_versions
+from .exports import EXPORTS, stream_rows
+from .auctions import BidRejected, open_auction, place_bid, settle_auction
+from .likebuffer import LikeBuffer, apply_like_events, fcntl
+from .likes import set_like
+from .moderation import hide_if_over_threshold, resolve_reports
+from .paginators import FeedCursorPaginator
+from .pubsub import InProcessBroker, comments_topic, get_broker
+from .push import websocket_application
+from .search import search_posts
+from .media import UploadConflict, accept_upload, session_path, write_chunk
+from .models import User, Post, Category, Hashtag, Comment, Like, PostStatistics, Auction, AuctionState, Notification, \
+    MediaFile, PostImage, UploadSession, UserBalance, UserInterest, TimelineEntry, SearchPosting, HashtagUsage, \
+    StatsDirtyDay
+from .timeline import hot_sources, refresh_hot_sources
+from .trending import get_bucket, record_hashtag_usage
+
+
+class QueryCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.other = User.objects.create_user(username='other', password='secret')
+        hashtags = [Hashtag.objects.create(name='tag%d' % i) for i in range(3)]
+        self.posts = []
+        for i in range(30):
+            post = Post.objects.create(user=self.user, title='Post %d' % i, content='Nội dung')
+            post.hashtag.set(hashtags)
+            Like.objects.create(user=self.other, post=post)
+            self.posts.append(post)
+        for i in range(30):
+            Comment.objects.create(user=self.other if i % 2 else self.user, post=self.posts[0], content='c%d' % i)
+        self.client.force_authenticate(self.user)
+
+    def test_feed_page_query_count_is_constant(self):
+        # bài viết + thống kê (1 JOIN), hashtag và ảnh (prefetch), liked (1 truy vấn IN cho cả trang)
+        with self.assertNumQueries(4):
+            response = self.client.get('/post-list/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 30)
+
+    def test_feed_liked_is_scoped_to_request_user(self):
+        Like.objects.create(user=self.user, post=self.posts[5])
+        response = self.client.get('/post-list/')
+        liked = {p['id'] for p in response.data['results'] if p['liked']}
+        self.assertEqual(liked, {self.posts[5].id})
+
+    def test_create_post_indexes_it_once_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(21):
+                response = self.client.post('/posts/', {'title': 'Đấu giá', 'content': 'Tranh',
+                                                        'hashtag': [{'name': 'tag0'}, {'name': 'moi'}]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        with CaptureQueriesContext(connection) as captured:
+            for callback in callbacks:
+                callback()
+        search_writes = [q['sql'] for q in captured.captured_queries if 'social_media_app_search' in q['sql']]
+        self.assertEqual(len(search_writes), 2)  # Một INSERT tài liệu và một INSERT posting
+        self.assertEqual([pk for _, pk in search_posts('dau gia moi')], [response.data['id']])
+
+    def test_comment_list_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/comments/', {'post_id': self.posts[0].id})
+        self.assertEqual(response.status_code, 200)
+
+    def test_like_response_liked_is_scoped_to_request_user(self):
+        url = '/posts/%d/likes/' % self.posts[0].id
+        self.assertTrue(self.client.post(url).data['liked'])
+        # "other" vẫn đang like bài viết này nhưng owner thì đã bỏ like
+        self.assertFalse(self.client.post(url).data['liked'])
+
+    def test_feed_etag_returns_not_modified(self):
+        response = self.client.get('/post-list/')
+        etag = response['ETag']
+        response = self.client.get('/post-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_like_keeps_cached_feed_but_refreshes_counters(self):
+        response = self.client.get('/post-list/')
+        etag, version = response['ETag'], get_versions(['posts'])
+        before = {p['id']: p['like_count'] for p in response.data['results']}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/posts/%d/likes/' % self.posts[0].id)
+        self.assertEqual(get_versions(['posts']), version)
+
+        # Trang lấy từ cache: chỉ đọc lại bộ đếm và liked (2 truy vấn IN)
+        with self.assertNumQueries(2):
+            response = self.client.get('/post-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        liked = {p['id']: (p['like_count'], p['liked']) for p in response.data['results']}
+        self.assertEqual(liked[self.posts[0].id], (before[self.posts[0].id] + 1, True))
+        self.assertEqual(liked[self.posts[1].id], (before[self.posts[1].id], False))
+
+        # Cache dùng chung cho mọi người xem, liked vẫn là của người đang xem
+        self.client.force_authenticate(self.other)
+        response = self.client.get('/post-list/')
+        self.assertEqual({p['id']: p['liked'] for p in response.data['results']}[self.posts[1].id], True)
+
+
+class PostCursorTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.posts = [Post.objects.create(user=self.user, title='Post %d' % i, content='c') for i in range(45)]
+        # Một nửa trùng created_date: thứ tự vẫn ổn định nhờ id
+        Post.objects.filter(pk__in=[p.pk for p in self.posts[10:30]]).update(created_date=self.posts[10].created_date)
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pages_are_stable_across_inserts(self):
+        first = self.client.get('/post-list/').data
+        self.assertEqual(len(first['results']), 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(user=self.user, title='Mới', content='c')
+
+        second = self.client.get(first['next']).data
+        self.assertIsNone(second['next'])
+        ids = [p['id'] for p in first['results'] + second['results']]
+        expected = Post.objects.filter(pk__in=[p.pk for p in self.posts]).order_by('-created_date', '-id')
+        self.assertEqual(ids, list(expected.values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/post-list/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+@override_settings(THROTTLE={'RATES': {}})
+class PostCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.post = Post.objects.create(user=self.user, title='Post', content='c')
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        return PostStatistics.objects.values_list('like_count', 'comment_count').get(post=self.post)
+
+    def test_like_and_comment_keep_counters_and_mark_the_day_dirty(self):
+        StatsDirtyDay.objects.all().delete()
+        url = '/posts/%d/likes/' % self.post.id
+        self.client.post(url)
+        self.client.post(url)
+        self.client.post(url)
+        comment = self.client.post('/posts/%d/comments/' % self.post.id, {'content': 'c'}).data
+        self.client.post('/posts/%d/comments/' % self.post.id, {'content': 'c'})
+        self.assertEqual(self.counters(), (1, 2))
+        self.assertEqual(list(StatsDirtyDay.objects.values_list('date', flat=True)), [self.post.created_date])
+
+        self.assertEqual(self.client.delete('/comments/%d/' % comment['id']).status_code, 204)
+        self.assertEqual(self.counters(), (1, 1))
+
+    def test_reconcile_fixes_drift(self):
+        Like.objects.create(user=self.user, post=self.post)
+        Comment.objects.create(user=self.user, post=self.post, content='c')
+        PostStatistics.objects.filter(post=self.post).update(like_count=7, comment_count=0)
+        call_command('reconcile_post_stats', stdout=io.StringIO())
+        self.assertEqual(self.counters(), (1, 1))
+
+
+class StatsRollupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.other = User.objects.create_user(username='other', password='secret')
+        self.category = Category.objects.create(name='Tranh')
+        self.today = timezone.localdate()
+        self.posts = [Post.objects.create(user=self.user, title='p%d' % i, content='c',
+                                          category=self.category if i else None) for i in range(3)]
+        Post.objects.filter(pk=self.posts[2].pk).update(created_date=self.today - timedelta(days=1))
+        self.posts[2].refresh_from_db()
+        for post in self.posts[:2]:
+            for user in (self.user, self.other):
+                set_like(user, post, True)
+            for i in range(3):
+                Comment.objects.create(user=self.user, post=post, content='c%d' % i)
+                PostStatistics.objects.increment(post, 'comment_count')
+        self.client.force_authenticate(self.user)
+
+    def test_rollup_counts_each_post_once_and_refreshes_dirty_days(self):
+        call_command('rollup_daily_stats', all=True, stdout=io.StringIO())
+        self.assertFalse(StatsDirtyDay.objects.exists())
+        data = self.client.get('/post-list/stats/').data
+        self.assertEqual([(row['created_date'], row['post_count'], row['likes_count'], row['comments_count'])
+                          for row in data['stats_by_time']],
+                         [(self.today - timedelta(days=1), 1, 0, 0), (self.today, 2, 4, 6)])
+        self.assertEqual({row['category']: row['post_count'] for row in data['stats_by_category']},
+                         {None: 1, self.category.pk: 2})
+
+        # Chỉ ngày bị đánh dấu được tính lại, và cache 'stats' được làm mới sau lần chạy
+        set_like(self.other, self.posts[2], True)
+        self.assertEqual(list(StatsDirtyDay.objects.values_list('date', flat=True)), [self.today - timedelta(days=1)])
+        call_command('rollup_daily_stats', stdout=io.StringIO())
+        data = self.client.get('/post-list/stats/', {'to': (self.today - timedelta(days=1)).isoformat()}).data
+        self.assertEqual([row['likes_count'] for row in data['stats_by_time']], [1])
+
+
+@override_settings(THROTTLE={'RATES': {}})
+class SearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.weak = Post.objects.create(user=self.user, title='Tranh sơn dầu',
+                                            content='Bức tranh này sẽ được đưa ra đấu giá vào cuối tháng tới')
+            self.strong = Post.objects.create(user=self.user, title='Đấu giá', content='Phiên đấu giá tranh')
+            self.other = Post.objects.create(user=self.user, title='Quyên góp', content='Ủng hộ trẻ em vùng cao')
+        self.client.force_authenticate(self.user)
+
+    def search(self, query):
+        return [post['id'] for post in self.client.get('/posts/search/', {'q': query}).data['results']]
+
+    def test_bm25_ranks_denser_matches_first_and_folds_accents(self):
+        self.assertEqual(self.search('dau gia'), [self.strong.id, self.weak.id])
+        self.assertEqual(self.search('ĐẤU GIÁ'), [self.strong.id, self.weak.id])
+        self.assertEqual(self.search('tre em'), [self.other.id])
+        self.assertEqual(self.search('khong co'), [])
+
+    def test_comments_are_searchable_until_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = self.client.post('/posts/%d/comments/' % self.weak.id, {'content': 'Tuyệt vời'}).data
+        self.assertEqual(self.search('tuyet voi'), [self.weak.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/comments/%d/' % comment['id'])
+        self.assertEqual(self.search('tuyet voi'), [])
+
+
+@override_settings(THROTTLE={'RATES': {}})
+class CommentPagingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.post = Post.objects.create(user=self.user, title='Post', content='c')
+        other = Post.objects.create(user=self.user, title='Other', content='c')
+        Comment.objects.create(user=self.user, post=other, content='khác')
+        self.comments = [Comment.objects.create(user=self.user, post=self.post, content='c%d' % i) for i in range(60)]
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pages_in_posting_order(self):
+        first = self.client.get('/comments/', {'post_id': self.post.id}).data
+        second = self.client.get(first['next']).data
+        self.assertIsNone(second['next'])
+        self.assertEqual([c['id'] for c in first['results'] + second['results']], [c.id for c in self.comments])
+
+    def test_since_returns_only_newer_comments(self):
+        since = self.comments[-3].id
+        with self.captureOnCommitCallbacks(execute=True):
+            new = self.client.post('/posts/%d/comments/' % self.post.id, {'content': 'mới'}).data
+        response = self.client.get('/comments/', {'post_id': self.post.id, 'since': since})
+        self.assertEqual([c['id'] for c in response.data['results']],
+                         [self.comments[-2].id, self.comments[-1].id, new['id']])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(self.client.get('/comments/', {'post_id': self.post.id, 'since': 'x'}).status_code, 400)
+
+
+@override_settings(TIMELINE={'FANOUT_LIMIT': 1, 'MAX_ENTRIES': 2, 'TRIM_EVERY': 1})
+class TimelineTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='secret')
+        self.authors = [User.objects.create_user(username='author%d' % i) for i in range(5)]
+
+    def test_hot_flags_are_read_in_one_query(self):
+        UserInterest.objects.bulk_create([UserInterest(user=self.reader, kind=UserInterest.KIND_AUTHOR,
+                                                       target_id=a.pk, score=5) for a in self.authors])
+        UserInterest.objects.create(user=self.authors[1], kind=UserInterest.KIND_AUTHOR, target_id=self.authors[0].pk,
+                                    score=5)
+        refresh_hot_sources()
+        with self.assertNumQueries(1):
+            _, hot = hot_sources(self.reader)
+        self.assertEqual(hot[UserInterest.KIND_AUTHOR], [self.authors[0].pk])
+
+    def test_fan_out_trims_recipient_timelines(self):
+        UserInterest.objects.create(user=self.reader, kind=UserInterest.KIND_AUTHOR, target_id=self.authors[0].pk,
+                                    score=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(user=self.authors[0], title='p%d' % i, content='c') for i in range(4)]
+        self.assertEqual(list(TimelineEntry.objects.filter(user=self.reader).order_by('post_id')
+                              .values_list('post_id', flat=True)), [posts[2].pk, posts[3].pk])
+
+    def test_feed_merges_timeline_with_hot_sources(self):
+        for author in self.authors[:2]:
+            UserInterest.objects.create(user=self.reader, kind=UserInterest.KIND_AUTHOR, target_id=author.pk, score=5)
+        UserInterest.objects.create(user=self.authors[2], kind=UserInterest.KIND_AUTHOR, target_id=self.authors[1].pk,
+                                    score=5)
+        refresh_hot_sources()
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(user=self.authors[i % 3], title='p%d' % i, content='c') for i in range(9)]
+        # authors[0] qua timeline (đã cắt còn 2 bài), authors[1] là nguồn nóng đọc trực tiếp, authors[2] không theo dõi
+        expected = [posts[7].pk, posts[6].pk, posts[4].pk, posts[3].pk, posts[1].pk]
+
+        self.client.force_authenticate(self.reader)
+        ids, url = [], '/feed/'
+        with mock.patch.object(FeedCursorPaginator, 'page_size', 2):
+            while url:
+                data = self.client.get(url).data
+                ids += [post['id'] for post in data['results']]
+                url = data['next']
+        self.assertEqual(ids, expected)
+
+
+class TrendingTests(TransactionTestCase):
+    def test_usage_insert_conflict_keeps_every_increment(self):
+        tags = [Hashtag.objects.create(name='a'), Hashtag.objects.create(name='b')]
+        create = HashtagUsage.objects.bulk_create
+
+        def insert_a():
+            try:
+                HashtagUsage.objects.create(hashtag=tags[0], bucket=get_bucket(), count=1)
+            finally:
+                connection.close()
+
+        def racing_bulk_create(objs, *args, **kwargs):
+            # Một request khác tạo dòng của 'a' ngay trước INSERT của request này
+            thread = threading.Thread(target=insert_a)
+            thread.start()
+            thread.join()
+            return create(objs, *args, **kwargs)
+
+        with mock.patch.object(HashtagUsage.objects, 'bulk_create', side_effect=racing_bulk_create):
+            record_hashtag_usage(tags)
+        self.assertEqual(sorted(HashtagUsage.objects.values_list('hashtag__name', 'category_id', 'count')),
+                         [('a', 0, 2), ('b', 0, 1)])
+
+
+class ModerationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(user=self.user, title='Bài viết', content='nội dung')
+
+    def test_restore_keeps_posts_hidden_for_other_reasons(self):
+        Post.objects.filter(pk=self.post.pk).update(active=False)
+        self.assertFalse(resolve_reports(self.post, 'restore'))
+        self.assertFalse(Post.objects.get(pk=self.post.pk).active)
+
+    def test_only_rollup_counters_mark_the_day_dirty(self):
+        StatsDirtyDay.objects.all().delete()
+        PostStatistics.objects.increment(self.post, 'report_score', 3)
+        PostStatistics.objects.increment(self.post, 'report_count')
+        self.assertFalse(StatsDirtyDay.objects.exists())
+        PostStatistics.objects.increment(self.post, 'like_count')
+        self.assertTrue(StatsDirtyDay.objects.filter(date=self.post.created_date).exists())
+
+    @override_settings(THROTTLE={'RATES': {}})
+    def test_duplicate_report_is_a_conflict_until_resolved(self):
+        reporter = User.objects.create_user(username='reporter')
+        other = Post.objects.create(user=self.user, title='Khác', content='c')
+        self.client.force_authenticate(reporter)
+        report = {'post_id': self.post.id, 'reason': 'spam'}
+        self.assertEqual(self.client.post('/reports/', report).status_code, 201)
+        self.assertEqual(self.client.post('/reports/', dict(report, reason='other')).status_code, 409)
+        self.client.post('/reports/', {'post_id': other.id, 'reason': 'other'})
+
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        queue = self.client.get('/reports/queue/').data['results']
+        self.assertEqual([(row['post'], row['report_score'], row['report_count'], row['reasons']) for row in queue],
+                         [(self.post.id, 2, 1, {'spam': 1}), (other.id, 1, 1, {'other': 1})])
+
+        self.client.post('/reports/resolve/', {'post_id': self.post.id, 'decision': 'dismiss'})
+        self.client.force_authenticate(reporter)
+        self.assertEqual(self.client.post('/reports/', report).status_code, 201)
+
+    @override_settings(MODERATION={'AUTO_HIDE_SCORE': 1})
+    def test_auto_hidden_post_leaves_search_and_timelines_until_restored(self):
+        PostStatistics.objects.filter(post_id=self.post.pk).update(report_score=5)
+        self.assertTrue(hide_if_over_threshold(self.post))
+        self.assertFalse(SearchPosting.objects.filter(post=self.post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(post=self.post).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(resolve_reports(self.post, 'restore'))
+        self.assertTrue(Post.objects.get(pk=self.post.pk).active)
+        self.assertTrue(SearchPosting.objects.filter(post=self.post).exists())
+        self.assertTrue(TimelineEntry.objects.filter(post=self.post, user=self.user).exists())
+
+
+class LikeBufferApplyTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner')
+        self.user = User.objects.create_user(username='fan')
+        self.post = Post.objects.create(user=self.owner, title='Bài viết', content='nội dung')
+
+    def test_like_written_by_both_paths_counts_once(self):
+        set_like(self.user, self.post, True)
+        # Đường đồng bộ chèn like ngay sau lúc buffer đọc các dòng đang có
+        with mock.patch.object(Like.objects, 'select_for_update', return_value=Like.objects.none()):
+            self.assertEqual(apply_like_events({(self.user.pk, self.post.pk): True}), 0)
+        self.assertEqual(PostStatistics.objects.get(post=self.post).like_count, 1)
+        self.assertEqual(Notification.objects.filter(user=self.owner).count(), 1)
+
+    def test_decrement_below_zero_is_clamped(self):
+        Like.objects.create(user=self.user, post=self.post)
+        PostStatistics.objects.filter(post=self.post).update(like_count=0)
+        apply_like_events({(self.user.pk, self.post.pk): False})
+        self.assertEqual(PostStatistics.objects.get(post=self.post).like_count, 0)
+
+
+@unittest.skipIf(fcntl is None, 'flock is not available')
+class LikeBufferReplayTests(SimpleTestCase):
+    def test_replays_logs_only_of_processes_that_released_their_lock(self):
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir, ignore_errors=True)
+        live, dead = os.getpid() + 100000, os.getpid() + 100001
+        for pid, event in [(live, [1, 10, True]), (dead, [2, 20, True])]:
+            with open(os.path.join(log_dir, 'likes.%d.log' % pid), 'w') as f:
+                f.write(json.dumps(event) + '\n')
+            open(os.path.join(log_dir, 'likes.%d.lock' % pid), 'w').close()
+        # pid còn tồn tại hay không không quan trọng (có thể đã bị dùng lại), chỉ khoá mới quyết định
+        with open(os.path.join(log_dir, 'likes.%d.lock' % live)) as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            buffer = LikeBuffer(log_dir, flush_interval_ms=100000)
+            buffer.close()
+        self.assertEqual(buffer._pending, {(2, 20): True})
+        buffer._pending.clear()  # Không để thread nền ghi vào DB
+        self.assertTrue(os.path.exists(os.path.join(log_dir, 'likes.%d.log' % live)))
+
+
+@override_settings(THROTTLE={'RATES': {}}, NOTIFICATIONS={'ASYNC': False})  # Chỉ kiểm tra tranh chấp ghi
+class LikeConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    REQUESTS_PER_THREAD = 10
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(username='owner', password='secret')
+        self.post = Post.objects.create(user=owner, title='Đấu giá', content='Nội dung')
+        self.users = [User.objects.create_user(username='u%d' % i, password='secret') for i in range(self.THREADS)]
+
+    def hammer(self, user, methods):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            for method in methods:
+                response = getattr(client, method)('/posts/%d/likes/' % self.post.id)
+                if response.status_code != 200:
+                    self.errors.append(response.status_code)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            connection.close()
+
+    def run_threads(self, plans):
+        self.errors = []
+        threads = [threading.Thread(target=self.hammer, args=plan) for plan in plans]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.errors, [])
+
+    def test_concurrent_put_from_one_user_counts_once(self):
+        user = self.users[0]
+        self.run_threads([(user, ['put'] * self.REQUESTS_PER_THREAD) for _ in range(self.THREADS)])
+
+        self.assertEqual(Like.objects.filter(post=self.post, user=user, active=True).count(), 1)
+        self.assertEqual(PostStatistics.objects.get(post=self.post).like_count, 1)
+
+    def test_counter_matches_likes_under_mixed_put_delete(self):
+        rng = random.Random(2024)
+        plans = [(user, [rng.choice(['put', 'delete']) for _ in range(self.REQUESTS_PER_THREAD)] + ['put'] * (i % 2))
+                 for i, user in enumerate(self.users)]
+        self.run_threads(plans)
+
+        active = Like.objects.filter(post=self.post, active=True).count()
+        self.assertEqual(PostStatistics.objects.get(post=self.post).like_count, active)
+
+
+@override_settings(THROTTLE={'RATES': {'comment': '2/min', 'signup': '1/hour'}})
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.post = Post.objects.create(user=self.user, title='Post', content='Nội dung')
+
+    def test_rejects_after_burst_without_touching_the_database(self):
+        self.client.force_authenticate(self.user)
+        url = '/posts/%d/comments/' % self.post.id
+        self.assertEqual([self.client.post(url, {'content': 'c'}).status_code for _ in range(2)], [201, 201])
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'content': 'c'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        # Bucket tính riêng cho từng user
+        self.client.force_authenticate(User.objects.create_user(username='other', password='secret'))
+        self.assertEqual(self.client.post(url, {'content': 'c'}).status_code, 201)
+
+    def test_anonymous_requests_are_keyed_by_ip(self):
+        data = {'username': 'new', 'password': 'secret'}
+        self.assertEqual(self.client.post('/users/', data, REMOTE_ADDR='10.0.0.1').status_code, 201)
+        self.assertEqual(self.client.post('/users/', data, REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertNotEqual(self.client.post('/users/', data, REMOTE_ADDR='10.0.0.2').status_code, 429)
+        # X-Forwarded-For do client tự đặt không tạo được bucket mới
+        self.assertEqual(self.client.post('/users/', data, REMOTE_ADDR='10.0.0.1',
+                                          HTTP_X_FORWARDED_FOR='203.0.113.7').status_code, 429)
+
+
+@override_settings(THROTTLE={'RATES': {}}, NOTIFICATIONS={'ASYNC': False})
+class NotificationTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='secret')
+        self.post = Post.objects.create(user=self.author, title='Post', content='Nội dung')
+        self.fans = [User.objects.create_user(username='fan%d' % i, password='secret') for i in range(3)]
+
+    def act(self, user, method, url, data=None):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def test_similar_events_are_coalesced_and_counted_without_count_query(self):
+        for fan in self.fans:
+            self.act(fan, 'put', '/posts/%d/likes/' % self.post.id)
+        self.act(self.fans[0], 'post', '/posts/%d/comments/' % self.post.id, {'content': 'c'})
+        self.act(self.author, 'put', '/posts/%d/likes/' % self.post.id)  # Tự like bài của mình thì không báo
+
+        self.client.force_authenticate(self.author)
+        results = self.client.get('/notifications/').data['results']
+        self.assertEqual([(n['verb'], n['actor_count']) for n in results], [('comment', 1), ('like', 3)])
+        self.assertEqual(results[1]['message'], 'fan2 and 2 others liked your post')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/notifications/unread-count/').data['unread'], 2)
+
+    def test_relike_and_repeat_comments_count_each_person_once(self):
+        url = '/posts/%d/likes/' % self.post.id
+        self.act(self.fans[0], 'put', url)
+        self.act(self.fans[0], 'delete', url)
+        self.act(self.fans[0], 'put', url)
+        self.act(self.fans[1], 'put', url)
+        for _ in range(2):
+            self.act(self.fans[2], 'post', '/posts/%d/comments/' % self.post.id, {'content': 'c'})
+
+        self.client.force_authenticate(self.author)
+        results = self.client.get('/notifications/').data['results']
+        self.assertEqual([(n['verb'], n['actor_count']) for n in results], [('comment', 1), ('like', 2)])
+        self.assertEqual(results[1]['message'], 'fan1 and 1 other liked your post')
+
+    def test_mark_read_decrements_unread_counter(self):
+        for fan in self.fans[:2]:
+            self.act(fan, 'put', '/posts/%d/likes/' % self.post.id)
+            self.act(fan, 'post', '/posts/%d/comments/' % self.post.id, {'content': 'c'})
+        like = Notification.objects.get(verb=Notification.VERB_LIKE)
+
+        response = self.act(self.author, 'post', '/notifications/read/', {'ids': [like.id]})
+        self.assertEqual((response.data['updated'], response.data['unread']), (1, 1))
+        self.assertEqual([n['verb'] for n in self.client.get('/notifications/').data['results']], ['comment'])
+        self.assertEqual(self.act(self.author, 'post', '/notifications/read/', {}).data['unread'], 0)
+
+
+@override_settings(THROTTLE={'RATES': {}})
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.app = Application.objects.create(name='app', client_type=Application.CLIENT_PUBLIC,
+                                              authorization_grant_type=Application.GRANT_PASSWORD)
+
+    def login(self, token):
+        AccessToken.objects.create(user=self.user, application=self.app, token=token, scope='read write',
+                                   expires=timezone.now() + timedelta(hours=1))
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % token)
+
+    def test_validated_token_is_served_from_cache_until_logout(self):
+        self.login('t1')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/users/current_user/').data['username'], 'owner')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/users/current_user/').data['username'], 'owner')
+
+        self.assertEqual(self.client.post('/users/logout/').status_code, 204)
+        response = self.client.get('/users/current_user/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('invalid_token', response['WWW-Authenticate'])
+
+    def test_password_change_revokes_cached_tokens(self):
+        self.login('t2')
+        self.assertEqual(self.client.get('/users/current_user/').status_code, 200)
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(self.client.get('/users/current_user/').status_code, 401)
+        self.assertFalse(AccessToken.objects.filter(user=self.user).exists())
+
+
+class PushTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='secret')
+        self.post = Post.objects.create(user=self.user, title='Post', content='c')
+        app = Application.objects.create(name='app', client_type=Application.CLIENT_PUBLIC,
+                                         authorization_grant_type=Application.GRANT_PASSWORD)
+        AccessToken.objects.create(user=self.user, application=app, token='push-token', scope='read write',
+                                   expires=timezone.now() + timedelta(hours=1))
+
+    def connect(self, path, query_string=b''):
+        return ApplicationCommunicator(websocket_application, {'type': 'websocket', 'path': path,
+                                                               'query_string': query_string, 'headers': []})
+
+    def comment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Comment.objects.create(user=self.user, post=self.post, content='Mới')
+
+    def test_subscriber_receives_comments_after_commit(self):
+        async def scenario():
+            communicator = self.connect('/ws/posts/%d/' % self.post.id, b'token=push-token')
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+            comment = await sync_to_async(self.comment)()
+            message = json.loads((await communicator.receive_output(1))['text'])
+            self.assertEqual((message['type'], message['comment']['id']), ('comment', comment.id))
+            await communicator.send_input({'type': 'websocket.disconnect'})
+            await communicator.wait(1)
+            self.assertEqual(get_broker().subscriber_count(comments_topic(self.post.id)), 0)
+
+        async_to_sync(scenario)()
+
+    def test_rejects_unknown_posts_and_missing_tokens(self):
+        async def close_code(path, query_string=b''):
+            communicator = self.connect(path, query_string)
+            await communicator.send_input({'type': 'websocket.connect'})
+            return (await communicator.receive_output(1))['code']
+
+        self.assertEqual(async_to_sync(close_code)('/ws/posts/%d/' % self.post.id), 4401)
+        self.assertEqual(async_to_sync(close_code)('/ws/posts/0/', b'token=push-token'), 4404)
+
+    def test_slow_subscriber_drops_oldest_messages(self):
+        async def scenario():
+            broker = InProcessBroker(queue_size=2)
+            subscription = broker.subscribe(['topic'])
+            for i in range(3):
+                broker.publish('topic', i)
+            await asyncio.sleep(0)
+            self.assertEqual([await subscription.get(), await subscription.get(), subscription.dropped], [1, 2, 1])
+
+        async_to_sync(scenario)()
+
+
+class AvatarPipelineTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root, THROTTLE={'RATES': {}}, MEDIA_PIPELINE={
+            'ASYNC': False, 'INCOMING_DIR': self.media_root + '/incoming'})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, fmt='PNG'):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (400, 300), (255, 0, 0, 128)).save(buffer, fmt)
+        buffer.seek(0)
+        buffer.name = 'avatar.%s' % fmt.lower()
+        return buffer
+
+    def test_signup_returns_before_variants_exist(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/users/', {'username': 'u', 'password': 'secret', 'avatar': self.upload()})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['avatar'])
+
+        for callback in callbacks:
+            callback()
+        user = User.objects.get(username='u')
+        media = MediaFile.objects.get(owner=user)
+        self.assertEqual((media.status, media.width, media.height, media.variants.count()), ('ready', 400, 300, 6))
+        self.assertEqual(user.avatar_media_id, media.id)
+
+        # Mỗi serializer lấy biến thể nhỏ nhất đủ cho kích thước hiển thị của nó
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/users/current_user/').data['avatar'],
+                         '/media/avatars/%d/medium.webp' % media.id)
+        post = Post.objects.create(user=user, title='Post', content='Nội dung')
+        Comment.objects.create(user=user, post=post, content='c')
+        comments = self.client.get('/comments/', {'post_id': post.id}).data['results']
+        self.assertEqual(comments[0]['user']['avatar'], '/media/avatars/%d/thumb.webp' % media.id)
+
+    def test_new_avatar_refreshes_cached_comment_list(self):
+        user = User.objects.create_user(username='u')
+        post = Post.objects.create(user=user, title='Post', content='Nội dung')
+        Comment.objects.create(user=user, post=post, content='c')
+        self.client.force_authenticate(user)
+        self.assertIsNone(self.client.get('/comments/', {'post_id': post.id}).data['results'][0]['user']['avatar'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            media = accept_upload(user, File(self.upload()), MediaFile.KIND_AVATAR)
+        comments = self.client.get('/comments/', {'post_id': post.id}).data['results']
+        self.assertEqual(comments[0]['user']['avatar'], '/media/avatars/%d/thumb.webp' % media.id)
+
+    def test_replaced_avatar_is_cleaned_up(self):
+        user = User.objects.create_user(username='u')
+        with self.captureOnCommitCallbacks(execute=True):
+            old = accept_upload(user, File(self.upload()), MediaFile.KIND_AVATAR)
+        with self.captureOnCommitCallbacks(execute=True):
+            new = accept_upload(user, File(self.upload()), MediaFile.KIND_AVATAR)
+        self.assertEqual(User.objects.get(pk=user.pk).avatar_media_id, new.pk)
+        MediaFile.objects.update(updated_at=timezone.now() - timedelta(days=30))
+
+        call_command('cleanup_media', stdout=io.StringIO())
+        self.assertEqual(list(MediaFile.objects.values_list('pk', flat=True)), [new.pk])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'avatars', str(old.pk))), [])
+        self.assertTrue(os.listdir(os.path.join(self.media_root, 'avatars', str(new.pk))))
+
+    def test_rejects_files_that_are_not_images(self):
+        upload = io.BytesIO(b'not an image')
+        upload.name = 'avatar.png'
+        response = self.client.post('/users/', {'username': 'u', 'password': 'secret', 'avatar': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username='u').exists())
+
+
+class PostImageTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root, THROTTLE={'RATES': {}}, MEDIA_PIPELINE={
+            'ASYNC': False, 'INCOMING_DIR': self.media_root + '/incoming', 'CHUNK_SIZE': 1024,
+            'SENDFILE_BACKEND': 'x-accel'})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        buffer = io.BytesIO()
+        Image.effect_noise((120, 80), 50).save(buffer, 'PNG')
+        self.payload = buffer.getvalue()
+        self.user = User.objects.create_user(username='author', password='secret')
+
+    def upload(self, user):
+        self.client.force_authenticate(user)
+        session = self.client.post('/uploads/', {'size': len(self.payload)}).data
+        url = '/uploads/%s/' % session['id']
+        for start in range(0, len(self.payload), 1024):
+            chunk = self.payload[start:start + 1024]
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.put(url, chunk, content_type='application/octet-stream',
+                                           HTTP_CONTENT_RANGE='bytes %d-%d/%d' % (
+                                               start, start + len(chunk) - 1, len(self.payload)))
+            self.assertEqual(response.status_code, 200, response.data)
+        return url, response.data
+
+    def test_chunked_upload_resumes_and_dedups_identical_images(self):
+        url, session = self.upload(self.user)
+        self.assertEqual((session['received'], session['image']['status']), (len(self.payload), 'pending'))
+        self.assertEqual(self.client.get(url).data['image']['width'], 120)  # Biến thể tạo sau khi trả response
+
+        # Gửi lại một đoạn cũ (client mất phản hồi): 409 kèm offset để gửi tiếp từ đúng chỗ
+        response = self.client.put(url, self.payload[:1024], content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE='bytes 0-1023/%d' % len(self.payload))
+        self.assertEqual((response.status_code, response.data['received']), (409, len(self.payload)))
+
+        # Người khác tải cùng nội dung: dùng chung một blob, không xử lý lại
+        _, other = self.upload(User.objects.create_user(username='other', password='secret'))
+        self.assertEqual(other['image']['id'], session['image']['id'])
+        self.assertEqual(MediaFile.objects.filter(kind=MediaFile.KIND_POST).count(), 1)
+
+        # Blob xử lý lỗi không được dùng lại nguyên trạng: lần tải lên sau đưa nó vào xử lý lại
+        MediaFile.objects.filter(kind=MediaFile.KIND_POST).update(status=MediaFile.STATUS_FAILED)
+        _, third = self.upload(User.objects.create_user(username='third', password='secret'))
+        self.assertEqual((third['image']['id'], third['image']['status']), (session['image']['id'], 'pending'))
+        self.assertEqual(MediaFile.objects.get(kind=MediaFile.KIND_POST).status, MediaFile.STATUS_READY)
+
+    def test_reused_old_blob_is_not_cleaned_up_before_attach(self):
+        _, first = self.upload(self.user)
+        MediaFile.objects.filter(pk=first['image']['id']).update(updated_at=timezone.now() - timedelta(days=30))
+        UploadSession.objects.all().delete()
+        _, second = self.upload(User.objects.create_user(username='other'))
+        self.assertEqual(second['image']['id'], first['image']['id'])
+
+        UploadSession.objects.all().delete()  # Phiên hết hạn trước khi ảnh được gắn vào bài viết
+        call_command('cleanup_media', stdout=io.StringIO())
+        self.assertTrue(MediaFile.objects.filter(pk=first['image']['id']).exists())
+
+    def test_stale_chunk_retry_does_not_overwrite_newer_bytes(self):
+        self.client.force_authenticate(self.user)
+        session_id = self.client.post('/uploads/', {'size': len(self.payload)}).data['id']
+        stale = UploadSession.objects.get(pk=session_id)  # Request gửi lại đoạn 0 đọc phiên trước khi đoạn 1 tới
+        write_chunk(UploadSession.objects.get(pk=session_id), 0, 1024, io.BytesIO(self.payload[:1024]))
+        write_chunk(UploadSession.objects.get(pk=session_id), 1024, 1024, io.BytesIO(self.payload[1024:2048]))
+
+        with self.assertRaises(UploadConflict) as conflict:
+            write_chunk(stale, 0, 1024, io.BytesIO(b'x' * 1024))
+        self.assertEqual(conflict.exception.offset, 2048)
+        with open(session_path(stale), 'rb') as f:
+            self.assertEqual(f.read(), self.payload[:2048])
+
+    def test_attach_images_and_serve_with_x_accel(self):
+        _, session = self.upload(self.user)
+        media_id = session['image']['id']
+        response = self.client.post('/posts/', {'title': 'Quyên góp', 'content': 'Ảnh', 'images': [media_id]},
+                                    format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(PostImage.objects.get().media_id, media_id)
+
+        image = self.client.get('/post-list/').data['results'][0]['images'][0]
+        sha256 = MediaFile.objects.get(pk=media_id).sha256
+        self.assertTrue(image['url'].endswith('/media/blobs/%s/%s/medium.webp' % (sha256[:2], sha256)))
+        served = self.client.get('/media/blobs/%s/%s/thumb.webp' % (sha256[:2], sha256))
+        self.assertEqual(served['X-Accel-Redirect'], '/protected-media/blobs/%s/%s/thumb.webp' % (sha256[:2], sha256))
+        self.assertIn('immutable', served['Cache-Control'])
+
+        # Không gắn được ảnh mình chưa từng tải lên
+        self.client.force_authenticate(User.objects.create_user(username='other', password='secret'))
+        response = self.client.post('/posts/', {'title': 't', 'content': 'c', 'images': [media_id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleting_first_uploader_keeps_blob_shared_with_other_posts(self):
+        _, first = self.upload(self.user)
+        other = User.objects.create_user(username='other', password='secret')
+        _, session = self.upload(other)
+        self.assertEqual(session['image']['id'], first['image']['id'])
+        response = self.client.post('/posts/', {'title': 't', 'content': 'c', 'images': [session['image']['id']]},
+                                    format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        self.user.delete()
+        self.assertEqual(PostImage.objects.get(post__user=other).media.owner_id, None)
+
+
+@override_settings(THROTTLE={'RATES': {}})
+class TransferTests(APITestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username='sender', password='secret')
+        self.receiver = User.objects.create_user(username='receiver', password='secret')
+        self.client.force_authenticate(self.sender)
+
+    def test_transfer_is_pending_until_the_sender_pays(self):
+        response = self.client.post('/transactions/', {'receiver': self.receiver.pk, 'amount': '1e12'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/transactions/', {'receiver': self.receiver.pk, 'amount': '25'}, format='json')
+        self.assertEqual((response.status_code, response.data['status']), (201, 'pending'))
+        self.assertFalse(UserBalance.objects.filter(user=self.receiver, total_received__gt=0).exists())
+
+        self.assertEqual(self.client.post('/transactions/%d/pay/' % response.data['id']).status_code, 200)
+        self.assertEqual(UserBalance.objects.get(user=self.receiver).total_received, Decimal('25.00'))
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        self.author = User.objects.create_user(username='author', password='secret')
+        self.posts = [Post.objects.create(user=self.author if i % 2 else self.admin, title='Post %d' % i, content='c')
+                      for i in range(5)]
+        self.client.force_authenticate(self.admin)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_every_row_across_chunks(self):
+        spec = EXPORTS['posts']
+        chunks = list(stream_rows(spec, spec.get_queryset(), 'csv', chunk_size=2))
+        self.assertEqual(len(chunks), 4)  # Tiêu đề + 3 lô
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(rows[0][:4], ['id', 'user_id', 'user', 'title'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [post.pk for post in self.posts])
+
+    def test_csv_escapes_formula_cells(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(title='=HYPERLINK("http://x")')
+        Post.objects.filter(pk=self.posts[1].pk).update(title='-1+2')
+        response = self.client.get('/exports/posts/', {'fmt': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        titles = [row[3] for row in csv.reader(io.StringIO(self.read(response)))][1:3]
+        self.assertEqual(titles, ['\'=HYPERLINK("http://x")', "'-1+2"])
+
+    def test_ndjson_filters_by_user_and_date(self):
+        Post.objects.filter(pk=self.posts[1].pk).update(created_date=timezone.now() - timedelta(days=10))
+        today = timezone.localdate().isoformat()
+        response = self.client.get('/exports/posts/', {'fmt': 'ndjson', 'user': self.author.pk, 'from': today})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.posts[3].pk])
+        self.assertEqual(rows[0]['user'], 'author')
+
+    def test_export_requires_staff_and_known_name(self):
+        self.assertEqual(self.client.get('/exports/users/').status_code, 404)
+        self.assertEqual(self.client.get('/exports/posts/', {'fmt': 'xml'}).status_code, 400)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get('/exports/posts/').status_code, 403)
+
+
+@override_settings(THROTTLE={'RATES': {}}, NOTIFICATIONS={'ASYNC': False})
+class AuctionApiTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='secret')
+        self.bidder = User.objects.create_user(username='bidder', password='secret')
+        self.post = Post.objects.create(user=self.owner, title='Tranh từ thiện', content='Đấu giá')
+
+    def test_naive_closes_at_is_read_in_server_time_zone(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post('/posts/%d/auction/' % self.post.id,
+                                    {'starting_price': '10', 'closes_at': '2030-01-01T10:00:00'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(AuctionState.objects.get(post=self.post).closes_at,
+                         timezone.make_aware(datetime(2030, 1, 1, 10)))
+
+    def test_oversized_bid_is_rejected_with_400(self):
+        open_auction(self.post, Decimal('10.00'), timezone.now() + timedelta(hours=1))
+        self.client.force_authenticate(self.bidder)
+        response = self.client.post('/posts/%d/bids/' % self.post.id, {'bid_price': '1e12'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Auction.objects.filter(post=self.post).exists())
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False})
+class AuctionConcurrencyTests(TransactionTestCase):
+    BIDDERS = 8
+    BIDS_PER_BIDDER = 10
+
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='secret')
+        self.post = Post.objects.create(user=owner, title='Tranh từ thiện', content='Đấu giá')
+        self.bidders = [User.objects.create_user(username='b%d' % i, password='secret') for i in range(self.BIDDERS)]
+        open_auction(self.post, Decimal('10.00'), timezone.now() + timedelta(hours=1), Decimal('1.00'))
+
+    def bid(self, user, amounts):
+        try:
+            for amount in amounts:
+                try:
+                    place_bid(self.post, user, amount)
+                except BidRejected:
+                    pass
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            connection.close()
+
+    def test_concurrent_bids_elect_the_highest_bidder(self):
+        rng = random.Random(7)
+        plans = [(user, sorted(Decimal(rng.randint(10, 500)) for _ in range(self.BIDS_PER_BIDDER)))
+                 for user in self.bidders]
+        self.errors = []
+        threads = [threading.Thread(target=self.bid, args=plan) for plan in plans]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.errors, [])
+
+        state = AuctionState.objects.get(post=self.post)
+        best = Auction.objects.filter(post=self.post).order_by('-bid_price').first()
+        self.assertEqual(state.current_price, max(max(amounts) for _, amounts in plans))
+        self.assertEqual(state.current_price, best.bid_price)
+        self.assertEqual(state.leader_id, best.participant_id)
+        self.assertEqual(state.bid_count, Auction.objects.filter(post=self.post).count())
+        # Các giá được chấp nhận tăng dần đúng bằng thứ tự ghi nhận
+        prices = list(Auction.objects.filter(post=self.post).order_by('id').values_list('bid_price', flat=True))
+        self.assertEqual(prices, sorted(prices))
+        self.assertEqual(len(set(prices)), len(prices))
+
+    def test_bid_checked_before_settlement_is_rejected_after_close(self):
+        state = AuctionState.objects.get(post=self.post)
+        place_bid(self.post, self.bidders[0], Decimal('20.00'))
+        minimum_bid = AuctionState.minimum_bid
+
+        def settle_during_check(state):
+            # Phiên bị đóng ngay sau khi bid đã qua bước kiểm tra, trước compare-and-set
+            settle_auction(state.pk, now=state.closes_at + timedelta(seconds=1))
+            return minimum_bid(state)
+
+        with mock.patch.object(AuctionState, 'minimum_bid', autospec=True, side_effect=settle_during_check):
+            with self.assertRaises(BidRejected):
+                place_bid(self.post, self.bidders[1], Decimal('50.00'))
+
+        state.refresh_from_db()
+        self.assertEqual((state.status, state.leader_id, state.current_price),
+                         (AuctionState.STATUS_CLOSED, self.bidders[0].pk, Decimal('20.00')))
+        self.assertEqual(Auction.objects.filter(post=self.post).count(), 1)
+        self.assertEqual(state.settlement.sender_id, self.bidders[0].pk)
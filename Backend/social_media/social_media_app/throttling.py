@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+DEFAULTS = {
+    'STORE': 'social_media_app.throttling.CacheBucketStore',
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'tb',
+    'RATES': {},
+    'BURST': {},
+    'LOCAL_MAX_KEYS': 10000,
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Chạy nguyên tử trên Redis: đọc bucket, nạp thêm token theo thời gian, trừ một token nếu còn
+REDIS_CONSUME_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def get_throttle_setting(name):
+    return getattr(settings, 'THROTTLE', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    # '30/min' -> (30, 0.5 token/giây); chữ cái đầu của đơn vị quyết định chu kỳ như DRF
+    num, period = rate.split('/')
+    num = int(num)
+    return num, num / PERIODS[period.strip()[0]]
+
+
+def refill(tokens, ts, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - ts) * rate)
+
+
+def wait_for(tokens, rate):
+    return (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    # Bucket trong bộ nhớ của process: nhanh nhất nhưng mỗi worker có giới hạn riêng
+    def __init__(self):
+        self.max_keys = get_throttle_setting('LOCAL_MAX_KEYS')
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (capacity, now))
+            tokens = refill(tokens, ts, now, capacity, rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # Bucket lâu không dùng gần như đã đầy, bỏ đi không sai lệch nhiều
+        return allowed, 0 if allowed else wait_for(tokens, rate)
+
+
+class CacheBucketStore:
+    # Bucket lưu trong Django cache dùng chung giữa các worker (Redis, Memcached, file...)
+    def __init__(self):
+        self.cache = caches[get_throttle_setting('CACHE_ALIAS')]
+        self._redis_script = None
+        try:
+            from django.core.cache.backends.redis import RedisCache
+            self.use_redis = isinstance(self.cache, RedisCache)
+        except ImportError:
+            self.use_redis = False
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        if self.use_redis:
+            return self.consume_redis(key, capacity, rate, now)
+
+        # Backend khác không có compare-and-set: đọc-ghi không nguyên tử, khi tranh chấp có thể lọt thêm vài request
+        tokens, ts = self.cache.get(key) or (capacity, now)
+        tokens = refill(tokens, ts, now, capacity, rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.cache.set(key, (tokens, now), int(capacity / rate) + 1)
+        return allowed, 0 if allowed else wait_for(tokens, rate)
+
+    def consume_redis(self, key, capacity, rate, now):
+        client = self.cache._cache.get_client(key, write=True)
+        if self._redis_script is None:
+            self._redis_script = client.register_script(REDIS_CONSUME_SCRIPT)
+        allowed, tokens = self._redis_script(keys=[self.cache.make_key(key)], args=[capacity, rate, now], client=client)
+        return bool(allowed), 0 if allowed else wait_for(float(tokens), rate)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(get_throttle_setting('STORE'))()
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # Scope lấy theo action: view khai báo throttle_scopes = {'add_comment': 'comment', ...}
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        return scopes.get(getattr(view, 'action', None), getattr(view, 'throttle_scope', None))
+
+    def get_cache_key(self, request, scope):
+        user = request.user
+        if user and user.is_authenticated:
+            ident = 'u%s' % user.pk
+        else:
+            ident = 'ip%s' % self.get_ident(request)
+        return '%s:%s:%s' % (get_throttle_setting('KEY_PREFIX'), scope, ident)
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = self.get_scope(view)
+        rate = get_throttle_setting('RATES').get(scope) if scope else None
+        if rate is None:
+            return True
+
+        num, refill_rate = parse_rate(rate)
+        capacity = get_throttle_setting('BURST').get(scope, num)
+        allowed, self.wait_time = get_bucket_store().consume(self.get_cache_key(request, scope), capacity,
+                                                             refill_rate)
+        return allowed
+
+    def wait(self):
+        return self.wait_time
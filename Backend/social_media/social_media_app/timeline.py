@@ -0,0 +1,172 @@
+import random
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import HotSource, Post, TimelineEntry, UserInterest
+
+DEFAULTS = {
+    'WEIGHTS': {'post': 3, 'comment': 2, 'like': 1},
+    'MIN_SCORE': 1,
+    'FANOUT_LIMIT': 5000,
+    'MAX_ENTRIES': 1000,
+    'TRIM_EVERY': 100,
+}
+
+
+def get_timeline_setting(name):
+    return getattr(settings, 'TIMELINE', {}).get(name, DEFAULTS[name])
+
+
+def post_sources(post_ids):
+    # {post_id: [(kind, target_id), ...]}: tác giả, danh mục và các hashtag của bài viết
+    sources = defaultdict(list)
+    for pk, user_id, category_id in Post.objects.filter(pk__in=post_ids).values_list('pk', 'user_id', 'category_id'):
+        sources[pk].append((UserInterest.KIND_AUTHOR, user_id))
+        if category_id is not None:
+            sources[pk].append((UserInterest.KIND_CATEGORY, category_id))
+    for pk, hashtag_id in Post.hashtag.through.objects.filter(post_id__in=post_ids) \
+            .values_list('post_id', 'hashtag_id'):
+        sources[pk].append((UserInterest.KIND_HASHTAG, hashtag_id))
+    return sources
+
+
+def record_interactions(pairs, action):
+    # pairs: [(user_id, post_id)]; cộng trọng số của hành động vào mọi nguồn của bài viết
+    weight = get_timeline_setting('WEIGHTS').get(action, 0)
+    pairs = list(pairs)
+    if not pairs or not weight:
+        return
+
+    sources = post_sources({post_id for _, post_id in pairs})
+    deltas = Counter()
+    for user_id, post_id in pairs:
+        for kind, target_id in sources.get(post_id, []):
+            if not (kind == UserInterest.KIND_AUTHOR and target_id == user_id):
+                deltas[(user_id, kind, target_id)] += weight
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        UserInterest.objects.bulk_create([UserInterest(user_id=u, kind=k, target_id=t) for u, k, t in deltas],
+                                         ignore_conflicts=True)
+        groups = defaultdict(list)
+        for (user_id, kind, target_id), delta in deltas.items():
+            groups[(user_id, kind, delta)].append(target_id)
+        for (user_id, kind, delta), target_ids in groups.items():
+            UserInterest.objects.filter(user_id=user_id, kind=kind, target_id__in=target_ids) \
+                .update(score=F('score') + delta)
+
+
+def audience(kind, target_id):
+    return UserInterest.objects.filter(kind=kind, target_id=target_id, score__gte=get_timeline_setting('MIN_SCORE'))
+
+
+def probe_hot(kind, target_id):
+    # Chỉ quét tới FANOUT_LIMIT + 1 dòng của index, không đếm hết
+    limit = get_timeline_setting('FANOUT_LIMIT')
+    return audience(kind, target_id).order_by()[limit:limit + 1].exists()
+
+
+def mark_hot_sources(sources):
+    # Khi ghi: nguồn vừa vượt ngưỡng được đánh dấu nóng. Bỏ đánh dấu chỉ làm trong refresh_hot_sources,
+    # vì bài cũ của nguồn nóng không có trong timeline và build_timelines bù lại cùng lúc
+    condition = Q(pk__in=[])
+    for kind, target_id in sources:
+        condition |= Q(kind=kind, target_id=target_id)
+    hot = set(HotSource.objects.filter(condition).values_list('kind', 'target_id'))
+    new = [source for source in sources if source not in hot and probe_hot(*source)]
+    HotSource.objects.bulk_create([HotSource(kind=k, target_id=t) for k, t in new], ignore_conflicts=True)
+    return hot.union(new)
+
+
+def refresh_hot_sources():
+    # Tính lại toàn bộ cờ nóng bằng một truy vấn GROUP BY trên index (kind, target_id, score)
+    hot = set(UserInterest.objects.filter(score__gte=get_timeline_setting('MIN_SCORE')).values('kind', 'target_id')
+              .annotate(n=Count('id')).filter(n__gt=get_timeline_setting('FANOUT_LIMIT'))
+              .values_list('kind', 'target_id'))
+    with transaction.atomic():
+        stale = [pk for pk, kind, target_id in HotSource.objects.values_list('pk', 'kind', 'target_id')
+                 if (kind, target_id) not in hot]
+        HotSource.objects.filter(pk__in=stale).delete()
+        HotSource.objects.bulk_create([HotSource(kind=k, target_id=t) for k, t in hot], ignore_conflicts=True)
+    return hot
+
+
+def fan_out_post(post_id):
+    sources = post_sources([post_id]).get(post_id)
+    if not sources:
+        return 0
+
+    author_id = sources[0][1]
+    users = {author_id}
+    hot = mark_hot_sources(sources)
+    for kind, target_id in sources:
+        if (kind, target_id) not in hot:
+            users.update(audience(kind, target_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create([TimelineEntry(user_id=user_id, post_id=post_id) for user_id in users],
+                                      batch_size=1000, ignore_conflicts=True)
+    # Mỗi người nhận được cắt timeline khoảng một lần sau TRIM_EVERY bài, để timeline không phình ra giữa
+    # hai lần chạy build_timelines mà không phải cắt cho mọi người ở mỗi bài viết
+    every = get_timeline_setting('TRIM_EVERY')
+    trim_timelines([user_id for user_id in users if random.randrange(every) == 0])
+    return len(users)
+
+
+def remove_from_timelines(post_id):
+    return TimelineEntry.objects.filter(post_id=post_id).delete()[0]
+
+
+def on_post_created(post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list('user_id', flat=True).first()
+    if author_id is not None:
+        record_interactions([(author_id, post_id)], 'post')
+        fan_out_post(post_id)
+
+
+def hot_sources(user):
+    # Các nguồn "nóng" mà người dùng quan tâm: đọc trực tiếp từ Post khi xem feed (fan-out khi đọc).
+    # Một truy vấn cho mọi nguồn quan tâm, cờ nóng lấy từ HotSource
+    hot = defaultdict(list)
+    interests = UserInterest.objects.filter(user=user, score__gte=get_timeline_setting('MIN_SCORE')).annotate(
+        hot=Exists(HotSource.objects.filter(kind=OuterRef('kind'), target_id=OuterRef('target_id')))
+    ).values_list('kind', 'target_id', 'hot')
+    has_interests = False
+    for kind, target_id, is_hot in interests:
+        has_interests = True
+        if is_hot:
+            hot[kind].append(target_id)
+    return has_interests, hot
+
+
+def feed_querysets(user):
+    base = Post.objects.with_details(user).filter(active=True)
+    has_interests, hot = hot_sources(user)
+    if not hot and (not has_interests or not TimelineEntry.objects.filter(user=user).exists()):
+        return [base]  # Chưa có tương tác hoặc timeline còn trống: dùng feed chung
+
+    querysets = [base.filter(timeline_entries__user=user)]
+    if hot[UserInterest.KIND_AUTHOR]:
+        querysets.append(base.filter(user_id__in=hot[UserInterest.KIND_AUTHOR]))
+    if hot[UserInterest.KIND_CATEGORY]:
+        querysets.append(base.filter(category_id__in=hot[UserInterest.KIND_CATEGORY]))
+    if hot[UserInterest.KIND_HASHTAG]:
+        querysets.append(base.filter(pk__in=Post.hashtag.through.objects.filter(
+            hashtag_id__in=hot[UserInterest.KIND_HASHTAG]).values('post_id')))
+    return querysets
+
+
+def trim_timelines(user_ids, max_entries=None):
+    # Giữ max_entries bài mới nhất của mỗi người: một truy vấn đánh số theo post_id, một lệnh DELETE
+    max_entries = max_entries or get_timeline_setting('MAX_ENTRIES')
+    if not user_ids:
+        return 0
+    extra = list(TimelineEntry.objects.filter(user_id__in=user_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('user_id'), order_by=F('post_id').desc())
+    ).filter(rank__gt=max_entries).values_list('pk', flat=True))
+    if not extra:
+        return 0
+    return TimelineEntry.objects.filter(pk__in=extra).delete()[0]
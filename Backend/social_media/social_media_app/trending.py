@@ -0,0 +1,101 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Category, HashtagUsage, TrendingHashtag
+
+DEFAULTS = {
+    'WINDOW_HOURS': 72,
+    'HALF_LIFE_HOURS': 12,
+    'TOP_K': 20,
+}
+
+
+def get_trending_setting(name):
+    return getattr(settings, 'HASHTAG_TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def get_bucket(when=None):
+    when = when or timezone.now()
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def record_hashtag_usage(hashtags, category_id=None, when=None):
+    ids = sorted({getattr(h, 'pk', h) for h in hashtags})
+    if not ids:
+        return
+
+    bucket = get_bucket(when)
+    category_id = category_id or 0
+    rows = HashtagUsage.objects.filter(hashtag_id__in=ids, category_id=category_id, bucket=bucket)
+    existing = set(rows.values_list('hashtag_id', flat=True))
+    if existing:
+        rows.filter(hashtag_id__in=existing).update(count=F('count') + 1)
+
+    missing = [pk for pk in ids if pk not in existing]
+    if not missing:
+        return
+    try:
+        with transaction.atomic():
+            HashtagUsage.objects.bulk_create([
+                HashtagUsage(hashtag_id=pk, category_id=category_id, bucket=bucket, count=1) for pk in missing
+            ])
+        return
+    except IntegrityError:
+        pass
+    # Một request khác vừa tạo vài dòng trong số này và cả lô INSERT đã rollback: ghi lại từng dòng,
+    # dòng nào trùng thì cộng dồn vào dòng đã có
+    for pk in missing:
+        try:
+            with transaction.atomic():
+                HashtagUsage.objects.create(hashtag_id=pk, category_id=category_id, bucket=bucket, count=1)
+        except IntegrityError:
+            rows.filter(hashtag_id=pk).update(count=F('count') + 1)
+
+
+def compute_trending(now=None, window_hours=None, half_life_hours=None, top_k=None):
+    now = now or timezone.now()
+    window_hours = window_hours or get_trending_setting('WINDOW_HOURS')
+    half_life_hours = half_life_hours or get_trending_setting('HALF_LIFE_HOURS')
+    top_k = top_k or get_trending_setting('TOP_K')
+
+    # Chỉ đọc các bucket trong cửa sổ trượt, điểm giảm dần theo thời gian (half-life)
+    scores = defaultdict(lambda: defaultdict(float))
+    counts = defaultdict(lambda: defaultdict(int))
+    usages = HashtagUsage.objects.filter(bucket__gte=now - timedelta(hours=window_hours)) \
+        .values_list('hashtag_id', 'category_id', 'bucket', 'count')
+    categories = set(Category.objects.values_list('pk', flat=True))
+    for hashtag_id, category_id, bucket, count in usages.iterator():
+        age_hours = max((now - bucket).total_seconds() / 3600, 0)
+        score = count * 0.5 ** (age_hours / half_life_hours)
+        # Danh mục đã bị xoá chỉ còn được tính vào bảng xếp hạng chung
+        for key in {None, category_id if category_id in categories else None}:
+            scores[key][hashtag_id] += score
+            counts[key][hashtag_id] += count
+
+    trending = []
+    for category_id, by_hashtag in scores.items():
+        top = heapq.nlargest(top_k, by_hashtag.items(), key=lambda item: (item[1], -item[0]))
+        for rank, (hashtag_id, score) in enumerate(top, start=1):
+            trending.append(TrendingHashtag(hashtag_id=hashtag_id, category_id=category_id, rank=rank, score=score,
+                                            usage_count=counts[category_id][hashtag_id], computed_at=now))
+    return trending
+
+
+def refresh_trending(**kwargs):
+    trending = compute_trending(**kwargs)
+    with transaction.atomic():
+        TrendingHashtag.objects.all().delete()
+        TrendingHashtag.objects.bulk_create(trending)
+    return trending
+
+
+def prune_hashtag_usage(now=None, window_hours=None):
+    now = now or timezone.now()
+    window_hours = window_hours or get_trending_setting('WINDOW_HOURS')
+    return HashtagUsage.objects.filter(bucket__lt=now - timedelta(hours=window_hours)).delete()[0]
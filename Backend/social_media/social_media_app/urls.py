@@ -10,11 +10,18 @@ router.register(r'users', views.UserViewSet, basename='user')
 router.register(r'posts', views.PostDetailsViewSet, basename='post')
 router.register(r'comments', views.CommentViewSet, basename='comment')
 router.register(r'post-list', views.PostStatsViewSet, basename='post-stats')
+router.register(r'feed', views.FeedViewSet, basename='feed')
 router.register(r'reports', views.ReportViewSet, basename='report')
+router.register(r'notifications', views.NotificationViewSet, basename='notification')
 router.register(r'categories', views.CategoryViewSet, basename='category')
+router.register(r'hashtags', views.HashtagViewSet, basename='hashtag')
+router.register(r'transactions', views.TransactionViewSet, basename='transaction')
+router.register(r'exports', views.ExportViewSet, basename='export')
+router.register(r'uploads', views.UploadViewSet, basename='upload')
 
 # Thêm các đường dẫn đã đăng ký với router vào urlpatterns
 urlpatterns = [
     path('', include(router.urls)),
+    path('media/<path:name>', views.serve_media, name='media'),
 ]
 
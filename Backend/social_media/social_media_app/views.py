@@ -1,39 +1,77 @@
-from django.db.models import Sum, Count
+from django.db import transaction
+from django.db.models import F, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from rest_framework import viewsets, generics, status, permissions, parsers
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
 from . import serializers, paginators
 from .models import Category, Post, User, Comment, Like, Auction, Hashtag, PostStatistics, Report, \
-    Transaction
+    Transaction, DailyPostStats, TrendingHashtag, AuctionState, LedgerEntry, PostReportCount, Notification, UploadSession
 from . import perms
+from .authentication import revoke_access_token
+from .auctions import MAX_AMOUNT, BidRejected, open_auction, place_bid, to_amount
+from .caching import cache_response
+from .exports import EXPORTS, FORMATS, stream_rows
+from .hashtags import attach_hashtags
+from .ledger import LedgerError, complete_transaction, get_balance, record_transaction
+from .likes import get_like_count, get_liked_resolver, set_like, toggle_like
+from .media import MediaError, UploadConflict, media_response, open_session, parse_content_range, write_chunk
+from .moderation import resolve_reports, submit_report
+from .notifications import get_unread_count, mark_read
+from .search import search_posts
+from .timeline import feed_querysets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
 
+def parse_date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Expected a date in YYYY-MM-DD format.'})
+    return parsed
+
+
 class CategoryViewSet(viewsets.ViewSet, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
 
+    @cache_response('categories')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class PostDetailsViewSet(viewsets.ViewSet):
     queryset = Post.objects.filter(active=True).all()
     serializer_class = serializers.PostSerializer
     permission_classes = [IsAuthenticated]  # Sử dụng IsAuthenticated
+    throttle_scopes = {'create': 'post', 'add_comment': 'comment', 'like': 'like', 'bids': 'bid'}
 
     def create(self, request):
-        serializer = serializers.PostSerializer(data=request.data)
+        serializer = serializers.PostSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def get_queryset(self):
+        return self.queryset.with_details(self.request.user)
+
     def get_object(self, pk=None):
         if pk is None:
             pk = self.kwargs.get('pk')
-        return get_object_or_404(self.queryset, pk=pk)
+        return get_object_or_404(self.get_queryset(), pk=pk)
 
     def get_permissions(self):
         if self.action in ['update_post', 'delete_post', 'add_hashtag', 'add_comment', 'like']:
@@ -44,7 +82,7 @@ class PostDetailsViewSet(viewsets.ViewSet):
     @action(methods=['patch'], detail=True)
     def update_post(self, request, pk=None):
         post = self.get_object(pk)
-        serializer = serializers.PostSerializer(post, data=request.data, partial=True)
+        serializer = serializers.PostSerializer(post, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -63,75 +101,187 @@ class PostDetailsViewSet(viewsets.ViewSet):
     def add_comment(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
         content = request.data.get('content')
-        c = Comment.objects.create(user=request.user, post=post, content=content)
+        with transaction.atomic():
+            c = Comment.objects.create(user=request.user, post=post, content=content)
+            PostStatistics.objects.increment(post, 'comment_count')
 
         return Response(serializers.CommentSerializer(c).data, status=status.HTTP_201_CREATED)
 
-    @action(methods=['post'], url_path='likes', detail=True)
+    @action(methods=['post', 'put', 'delete'], url_path='likes', detail=True)
     def like(self, request, pk):
+        # PUT: like, DELETE: bỏ like (idempotent); POST: đảo trạng thái như trước
+        post = get_object_or_404(self.queryset.only('id', 'created_date'), pk=pk)
+        if request.method == 'PUT':
+            liked = True
+            set_like(request.user, post, liked)
+        elif request.method == 'DELETE':
+            liked = False
+            set_like(request.user, post, liked)
+        else:
+            liked = toggle_like(request.user, post)
+
+        return Response({'liked': liked, 'like_count': get_like_count(post, request.user)}, status=status.HTTP_200_OK)
+
+    @action(methods=['get', 'post'], detail=True)
+    def auction(self, request, pk=None):
+        post = get_object_or_404(self.queryset, pk=pk)
+        if request.method == 'GET':
+            state = get_object_or_404(AuctionState, post=post)
+            return Response(serializers.AuctionStateSerializer(state).data)
+
+        # Chỉ chủ bài viết mới được mở đấu giá
+        if post.user_id != request.user.pk:
+            return Response({'message': 'Only the post owner can open an auction'}, status=status.HTTP_403_FORBIDDEN)
+
+        starting_price = to_amount(request.data.get('starting_price'))
+        min_increment = to_amount(request.data.get('min_increment', 1))
+        closes_at = parse_datetime(str(request.data.get('closes_at', '')))
+        if closes_at is not None and timezone.is_naive(closes_at):
+            closes_at = timezone.make_aware(closes_at)  # Không có múi giờ: hiểu theo TIME_ZONE của server
+        if starting_price is None or min_increment is None or closes_at is None:
+            return Response({'message': 'starting_price, min_increment and closes_at (ISO 8601) are required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            post = self.queryset.get(pk=pk)
-            like, created = Like.objects.get_or_create(user=request.user, post=post)
-            if not created:
-                like.active = not like.active
-                like.save()
-            return Response(serializers.PostDetailsSerializer(post, context={'request': request}).data,
-                            status=status.HTTP_200_OK)
-        except Post.DoesNotExist:
-            return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
+            state = open_auction(post, starting_price, closes_at, min_increment)
+        except BidRejected as e:
+            return Response({'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializers.AuctionStateSerializer(state).data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=True)
+    def bids(self, request, pk=None):
+        post = get_object_or_404(self.queryset, pk=pk)
+        amount = to_amount(request.data.get('bid_price'))
+        if amount is None:
+            return Response({'message': 'bid_price must be a positive amount up to %s' % MAX_AMOUNT},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            bid, state = place_bid(post, request.user, amount)
+        except BidRejected as e:
+            data = {'message': e.message}
+            if e.state is not None:
+                data['auction'] = serializers.AuctionStateSerializer(e.state).data
+            return Response(data, status=status.HTTP_409_CONFLICT)
+
+        return Response({'bid': serializers.BidSerializer(bid).data,
+                         'auction': serializers.AuctionStateSerializer(state).data}, status=status.HTTP_201_CREATED)
+
+    @action(methods=['get'], detail=False)
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'message': 'Parameter q is missing.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = paginators.RankedCursorPaginator()
+        page = paginator.paginate_ranked(search_posts(query), request)
+        posts = self.queryset.with_details().in_bulk([post_id for _, post_id in page])
+        # Giữ đúng thứ tự xếp hạng BM25
+        posts = [posts[post_id] for _, post_id in page if post_id in posts]
+
+        serializer = serializers.PostSerializer(posts, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
     @action(methods=['post'], detail=True)
     def add_hashtag(self, request, pk=None):
-        post = self.get_object()  # Lấy bài viết dựa trên pk
+        post = get_object_or_404(self.queryset, pk=pk)  # Lấy bài viết dựa trên pk
         hashtag_names = request.data.get('hashtags', [])  # Lấy danh sách hashtag từ dữ liệu yêu cầu
+        if isinstance(hashtag_names, str):
+            hashtag_names = [hashtag_names]
+
+        hashtags = attach_hashtags(post, hashtag_names)
+
+        return Response({'message': 'Hashtags added to the post successfully',
+                         'hashtags': serializers.HashtagSerializer(hashtags, many=True).data},
+                        status=status.HTTP_200_OK)
+
+
+class HashtagViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
 
-        for hashtag_name in hashtag_names:
-            # Kiểm tra xem hashtag đã tồn tại hay chưa, nếu chưa thì tạo mới
-            hashtag, created = Hashtag.objects.get_or_create(name=hashtag_name)
-            # Thêm hashtag vào bài viết
-            post.hashtags.add(hashtag)
+    @action(methods=['get'], detail=False)
+    def trending(self, request):
+        # Đọc bảng top-K đã tính sẵn (refresh_trending), không quét bảng Post-Hashtag
+        category = request.query_params.get('category')
+        if category and not category.isdigit():
+            return Response({'message': 'category must be an id'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Lưu lại thay đổi
-        post.save()
+        trending = TrendingHashtag.objects.select_related('hashtag').filter(category_id=category or None)
+        return Response(serializers.TrendingHashtagSerializer(trending, many=True).data)
 
-        return Response({'message': 'Hashtags added to the post successfully'}, status=status.HTTP_200_OK)
+
+class FeedViewSet(viewsets.ViewSet):
+    # Feed cá nhân hoá: timeline dựng sẵn khi đăng bài, cộng các nguồn "nóng" đọc trực tiếp
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        paginator = paginators.FeedCursorPaginator()
+        page = paginator.paginate_merged(feed_querysets(request.user), request)
+        serializer = serializers.PostSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+
+def refresh_post_counters(view, request, data):
+    # Trang feed lấy từ cache: đọc lại bộ đếm (một truy vấn) và trạng thái liked của người đang xem
+    results = data['results']
+    ids = [post['id'] for post in results]
+    counters = {post_id: (likes, comments) for post_id, likes, comments in PostStatistics.objects.filter(
+        post_id__in=ids).values_list('post_id', 'like_count', 'comment_count')}
+    resolver = get_liked_resolver(request)
+    resolver.prime(ids)
+    return {**data, 'results': [{**post, 'like_count': counters.get(post['id'], (0, 0))[0],
+                                 'comment_count': counters.get(post['id'], (0, 0))[1],
+                                 'liked': resolver.is_liked(post['id'])} for post in results]}
 
 
 class PostStatsViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
-    pagination_class = paginators.PostPaginator
+    pagination_class = paginators.PostCursorPaginator
+    page_pagination_class = paginators.PostPaginator
     queryset = Post.objects.filter(active=True)
 
+    def get_paginator(self, request):
+        # ?page=N giữ kiểu phân trang cũ (admin), mặc định dùng cursor
+        if request.query_params.get('page'):
+            return self.page_pagination_class()
+        return self.pagination_class()
+
+    @cache_response('posts', overlay=refresh_post_counters)
     def list(self, request):
-        queryset = self.queryset.order_by('-created_date')
-        paginator = self.pagination_class()
+        queryset = self.queryset.with_details().order_by('-created_date', '-id')
+        paginator = self.get_paginator(request)
         page = paginator.paginate_queryset(queryset, request)
 
         serializer = serializers.PostSerializer(page, many=True, context={'request': request})
         return paginator.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cache_response('stats')
     def stats(self, request):
-        try:
-            # Thống kê theo thời gian
-            stats_by_time = Post.objects.filter(active=True).values('created_date').annotate(
-                post_count=Count('id'),
-                likes_count=Sum('like__active'),  # Đếm số lượt like active
-                comments_count=Sum('comment__active')  # Đếm số lượt comment active
-            )
-            # Thống kê theo danh mục
-            stats_by_category = Post.objects.filter(active=True).values('category').annotate(
-                post_count=Count('id'),
-                likes_count=Sum('like__active'),  # Đếm số lượt like active
-                comments_count=Sum('comment__active')  # Đếm số lượt comment active
-            )
-
-            return Response({
-                'stats_by_time': stats_by_time,
-                'stats_by_category': stats_by_category,
-            })
-        except Exception as e:
-            return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        date_from = parse_date_param(request, 'from')
+        date_to = parse_date_param(request, 'to')
+
+        # Đọc từ bảng tổng hợp theo ngày (rollup_daily_stats), không quét Post/Like/Comment
+        rollup = DailyPostStats.objects.order_by()
+        if date_from:
+            rollup = rollup.filter(date__gte=date_from)
+        if date_to:
+            rollup = rollup.filter(date__lte=date_to)
+
+        totals = {
+            'post_count': Sum('post_count'),
+            'likes_count': Sum('like_count'),
+            'comments_count': Sum('comment_count'),
+        }
+        # Thống kê theo thời gian
+        stats_by_time = rollup.values(created_date=F('date')).annotate(**totals).order_by('created_date')
+        # Thống kê theo danh mục
+        stats_by_category = rollup.values('category').annotate(**totals).order_by('category')
+
+        return Response({
+            'stats_by_time': list(stats_by_time),
+            'stats_by_category': list(stats_by_category),
+        })
 
 
 class CommentViewSet(viewsets.ViewSet, generics.DestroyAPIView, generics.UpdateAPIView):
@@ -139,29 +289,39 @@ class CommentViewSet(viewsets.ViewSet, generics.DestroyAPIView, generics.UpdateA
     serializer_class = serializers.CommentSerializer
     permission_classes = [perms.OwnerAuthenticated]
 
-    def list(self, request):
-        try:
-            post_id = request.query_params.get('post_id')  # Lấy post_id từ query parameters
-            if not post_id:
-                return Response({"message": "Parameter post_id is missing."}, status=status.HTTP_400_BAD_REQUEST)
-
-            comments = Comment.objects.filter(post_id=post_id)
-            if not comments:  # Kiểm tra nếu không có comment nào cho post_id này
-                return Response({"message": "No comments found for the specified post."}, status=status.HTTP_200_OK)
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            if instance.active:
+                PostStatistics.objects.increment(instance.post_id, 'comment_count', -1)
 
-            serializer = serializers.CommentSerializer(comments, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    @cache_response('comments:{post_id}', 'avatars')
+    def list(self, request):
+        post_id = request.query_params.get('post_id')  # Lấy post_id từ query parameters
+        if not post_id:
+            return Response({"message": "Parameter post_id is missing."}, status=status.HTTP_400_BAD_REQUEST)
+        since = request.query_params.get('since')  # id comment cuối cùng client đã có ("tải comment mới")
+        if not post_id.isdigit() or (since and not since.isdigit()):
+            return Response({"message": "post_id and since must be ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        comments = Comment.objects.with_author().filter(post_id=post_id)
+        if since:
+            comments = comments.filter(id__gt=since)
+
+        paginator = paginators.CommentCursorPaginator()
+        page = paginator.paginate_queryset(comments, request)
+        serializer = serializers.CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
     queryset = User.objects.filter(is_active=True).all()
     serializer_class = serializers.UserSerializer
     parser_classes = [parsers.MultiPartParser]
+    throttle_scopes = {'create': 'signup'}
 
     def get_permissions(self):
-        if self.action.__eq__('current_user'):
+        if self.action in ['current_user', 'balance', 'logout']:
             return [permissions.IsAuthenticated()]
 
         return [permissions.AllowAny()]
@@ -170,9 +330,131 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
     def current_user(self, request):
         return Response(serializers.UserSerializer(request.user).data)
 
+    @action(methods=['post'], detail=False)
+    def logout(self, request):
+        if request.auth is not None:
+            revoke_access_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=['get'], detail=True)
+    def balance(self, request, pk=None):
+        user = get_object_or_404(self.queryset, pk=pk)
+        if user.pk != request.user.pk and not request.user.is_staff:
+            return Response({'message': 'You can only view your own balance'}, status=status.HTTP_403_FORBIDDEN)
+        # Đọc một dòng số dư đã cập nhật sẵn, không cộng dồn lịch sử giao dịch
+        return Response(serializers.UserBalanceSerializer(get_balance(user.pk)).data)
+
+
+class TransactionViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        user_id = request.user.pk
+        if request.user.is_staff and request.query_params.get('user'):
+            user_id = request.query_params['user']
+            if not user_id.isdigit():
+                return Response({'message': 'user must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = LedgerEntry.objects.select_related('transaction').filter(user_id=user_id)
+        paginator = paginators.LedgerCursorPaginator()
+        page = paginator.paginate_queryset(entries, request)
+        return paginator.get_paginated_response(serializers.LedgerEntrySerializer(page, many=True).data)
+
+    def create(self, request):
+        receiver = User.objects.filter(pk=request.data.get('receiver'), is_active=True).first() \
+            if str(request.data.get('receiver', '')).isdigit() else None
+        amount = to_amount(request.data.get('amount'))
+        if receiver is None or amount is None:
+            return Response({'message': 'receiver and a positive amount up to %s are required' % MAX_AMOUNT},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            tx = record_transaction(request.user, receiver, amount)
+        except LedgerError as e:
+            return Response({'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializers.TransactionSerializer(tx).data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=True)
+    def pay(self, request, pk=None):
+        # Người gửi thanh toán giao dịch đang chờ: chuyển tiền đã tạo hoặc kết quả đấu giá đã thắng
+        tx = get_object_or_404(Transaction, pk=pk, sender=request.user)
+        try:
+            complete_transaction(tx)
+        except LedgerError as e:
+            return Response({'message': e.message}, status=status.HTTP_409_CONFLICT)
+        return Response(serializers.TransactionSerializer(tx).data)
+
+
+class UploadViewSet(viewsets.ViewSet):
+    # Tải ảnh bài viết theo đoạn: POST tạo phiên, PUT gửi một đoạn kèm Content-Range, GET hỏi offset để gửi tiếp
+    permission_classes = [IsAuthenticated]
+    throttle_scopes = {'create': 'upload'}
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession.objects.select_related('media'), pk=pk, owner=request.user,
+                                 expires_at__gt=timezone.now())
+
+    def create(self, request):
+        size = str(request.data.get('size', ''))
+        if not size.isdigit():
+            return Response({'message': 'size (bytes) is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = open_session(request.user, int(size))
+        except MediaError as e:
+            return Response({'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializers.UploadSessionSerializer(session, context={'request': request}).data,
+                        status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        session = self.get_session(request, pk)
+        return Response(serializers.UploadSessionSerializer(session, context={'request': request}).data)
+
+    def update(self, request, pk=None):
+        session = self.get_session(request, pk)
+        try:
+            offset, length = parse_content_range(request.headers.get('Content-Range'), session.size)
+            if request.stream is None:
+                raise MediaError('The request body is empty')
+            # Đọc thẳng từ luồng request theo khối, không qua parser nên không giữ cả đoạn trong bộ nhớ
+            write_chunk(session, offset, length, request.stream)
+        except UploadConflict as e:
+            return Response({'message': e.message, 'received': e.offset}, status=status.HTTP_409_CONFLICT)
+        except MediaError as e:
+            return Response({'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializers.UploadSessionSerializer(session, context={'request': request}).data)
+
+
+def serve_media(request, name):
+    return media_response(name)
+
+
+class ExportViewSet(viewsets.ViewSet):
+    # /exports/<transactions|auctions|posts>/?fmt=csv|ndjson&from=&to=&user= ("format" đã bị DRF dùng)
+    permission_classes = [permissions.IsAdminUser]
+    lookup_value_regex = '[a-z]+'
+
+    def retrieve(self, request, pk=None):
+        spec = EXPORTS.get(pk)
+        if spec is None:
+            return Response({'message': 'Unknown export, expected one of: %s' % ', '.join(EXPORTS)},
+                            status=status.HTTP_404_NOT_FOUND)
+        fmt = request.query_params.get('fmt', 'csv')
+        user_id = request.query_params.get('user')
+        if fmt not in FORMATS or (user_id and not user_id.isdigit()):
+            return Response({'message': 'fmt must be csv or ndjson and user must be an id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = spec.get_queryset(parse_date_param(request, 'from'), parse_date_param(request, 'to'),
+                                     int(user_id) if user_id else None)
+        response = StreamingHttpResponse(stream_rows(spec, queryset, fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (pk, fmt)
+        response['Cache-Control'] = 'no-store'
+        return response
+
 
 class ReportViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scopes = {'create': 'report'}
 
     def create(self, request):
         try:
@@ -195,26 +477,70 @@ class ReportViewSet(viewsets.ViewSet):
             if reason not in valid_reasons:
                 return Response({"message": "Invalid reason"}, status=status.HTTP_400_BAD_REQUEST)
 
-            report_data = {
-                'user': user.id,
-                'post': post_id,
-                'reason': reason
-            }
-
-            serializer = serializers.ReportSerializer(data=report_data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            # Chống trùng theo (user, post), cập nhật bộ đếm theo lý do và tự ẩn bài khi vượt ngưỡng
+            report, _ = submit_report(user, post, reason)
+            if report is None:
+                return Response({"message": "You have already reported this post"}, status=status.HTTP_409_CONFLICT)
+            return Response(serializers.ReportSerializer(report).data, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-# class NotificationViewSet(viewsets.ModelViewSet):
-#     queryset = Notification.objects.all()
-#     serializer_class = serializers.NotificationSerializer
-#
-#
+    @action(methods=['get'], detail=False, permission_classes=[permissions.IsAdminUser])
+    def queue(self, request):
+        # Hàng đợi kiểm duyệt: bài viết có báo cáo chưa xử lý, điểm cao nhất trước (duyệt ngược index report_score)
+        queryset = PostStatistics.objects.select_related('post').filter(report_score__gt=0)
+        paginator = paginators.ModerationQueuePaginator()
+        page = paginator.paginate_queryset(queryset, request)
+
+        reasons = {}
+        for post_id, reason, count in PostReportCount.objects.filter(post_id__in=[s.post_id for s in page]) \
+                .values_list('post_id', 'reason', 'count'):
+            reasons.setdefault(post_id, {})[reason] = count
+        serializer = serializers.ModerationQueueSerializer(page, many=True, context={'reasons': reasons})
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=['post'], detail=False, permission_classes=[permissions.IsAdminUser])
+    def resolve(self, request):
+        post = get_object_or_404(Post, pk=request.data.get('post_id')) \
+            if str(request.data.get('post_id', '')).isdigit() else None
+        decision = request.data.get('decision')
+        if post is None or decision not in ('dismiss', 'hide', 'restore'):
+            return Response({"message": "post_id and decision (dismiss, hide or restore) are required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        resolve_reports(post, decision)
+        return Response({"message": "Reports resolved"}, status=status.HTTP_200_OK)
+
+
+class NotificationViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        # Mặc định chỉ trả thông báo chưa đọc; ?all=1 để xem cả thông báo đã đọc
+        notifications = Notification.objects.select_related('actor', 'post').filter(user=request.user)
+        if not request.query_params.get('all'):
+            notifications = notifications.filter(read=False)
+        paginator = paginators.NotificationCursorPaginator()
+        page = paginator.paginate_queryset(notifications, request)
+        return paginator.get_paginated_response(serializers.NotificationSerializer(page, many=True).data)
+
+    @action(methods=['get'], detail=False, url_path='unread-count')
+    def unread_count(self, request):
+        # Đọc bộ đếm đã duy trì sẵn, không COUNT trên bảng thông báo
+        return Response({'unread': get_unread_count(request.user)}, status=status.HTTP_200_OK)
+
+    @action(methods=['post'], detail=False)
+    def read(self, request):
+        ids = request.data.get('ids')
+        if ids is not None and (not isinstance(ids, list) or not all(str(pk).isdigit() for pk in ids)):
+            return Response({'message': 'ids must be a list of notification ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        updated = mark_read(request.user, [int(pk) for pk in ids] if ids is not None else None)
+        return Response({'message': 'Notifications marked as read', 'updated': updated,
+                         'unread': get_unread_count(request.user)}, status=status.HTTP_200_OK)
+
+
 # class InteractionViewSet(viewsets.ModelViewSet):
 #     queryset = serializers.InteractionSerializer.objects.all()
 #     serializer_class = serializers.InteractionSerializer